@@ -0,0 +1,162 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from football_academy_manager import FootballAcademyManager
+
+# Manager methods that only read. They run on a pool of reader threads, each
+# with its own WAL connection, so they proceed alongside each other and
+# alongside a write.
+READ_METHODS = (
+    'get_all_players', 'get_players_by_age_group', 'get_players_by_type', 'search_players',
+    'fuzzy_search_players', 'player_cohort', 'get_all_age_groups', 'get_academy_statistics',
+    'roster_snapshot', 'verify_statistics', 'get_all_player_types', 'get_all_league_teams',
+    'get_players_with_birthdays_this_month', 'get_upcoming_birthdays', 'get_players_with_idp_meetings',
+    'get_players_with_secondary_age_group', 'export_query', 'export_players', 'export_statistics',
+    'export_birthday_calendar', 'export_birthday_calendars', 'last_change_seq',
+)
+# Manager methods that change data. They run one at a time on a single
+# writer thread, in the order they were awaited, so writers never wait on
+# each other's locks.
+WRITE_METHODS = (
+    'add_player', 'import_players', 'update_player', 'delete_player', 'bulk_update_flags',
+    'add_age_group', 'update_age_group', 'delete_age_group', 'update_statistics', 'update_all_statistics',
+    'add_league_team', 'update_league_team', 'delete_league_team', 'rollover_season',
+    'replay_changes', 'prune_changes',
+)
+# Reads built from an in-memory index the first time they are used. While
+# the index is missing they run on the writer, so it is built once rather
+# than by several readers at a time; an index that a write raced is never
+# installed either way (see FootballAcademyManager.load_index).
+INDEX_BUILDING_METHODS = {'fuzzy_search_players': 'name_index', 'player_cohort': 'flag_bitmaps'}
+
+READ_WORKERS = 8
+# Reads queued beyond the reader threads wait in the event loop rather than
+# in the executor's unbounded queue
+MAX_PENDING_READS = 256
+
+
+def read_method(name):
+    method = getattr(FootballAcademyManager, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        index = INDEX_BUILDING_METHODS.get(name)
+        if index and getattr(self.manager, index) is None:
+            return await self.run_write(method, self.manager, *args, **kwargs)
+        return await self.run_read(method, self.manager, *args, **kwargs)
+    return wrapper
+
+
+def write_method(name):
+    method = getattr(FootballAcademyManager, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self.run_write(method, self.manager, *args, **kwargs)
+    return wrapper
+
+
+class AsyncFootballAcademyManager:
+    """FootballAcademyManager for asyncio code: the same methods, as coroutines
+
+    Blocking SQLite work is handed to threads, so the event loop keeps
+    serving other requests. Reads use a bounded pool of reader threads
+    (each with its own connection); writes are serialized on one writer
+    thread. Results are exactly those of the synchronous methods.
+
+        async with AsyncFootballAcademyManager('football_academy.db') as manager:
+            players = await manager.search_players('Garcia')
+    """
+
+    def __init__(self, db_path='football_academy.db', read_workers=READ_WORKERS, max_pending_reads=MAX_PENDING_READS):
+        self.manager = FootballAcademyManager(db_path)
+        self.readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='academy-read')
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='academy-write')
+        self.max_pending_reads = max_pending_reads
+        self.pending_reads = None
+
+    async def __aenter__(self):
+        if not await self.connect():
+            raise ConnectionError(f"Cannot open {self.manager.db_path}")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        """Connect to the database; the schema is checked on the writer thread"""
+        # Created here so it belongs to the running event loop
+        self.pending_reads = asyncio.Semaphore(self.max_pending_reads)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, self.manager.connect)
+
+    async def close(self):
+        """Wait for queued work, then close every connection"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self.readers.shutdown, wait=True))
+        await loop.run_in_executor(None, functools.partial(self.writer.shutdown, wait=True))
+        self.manager.close()
+
+    async def run_read(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on a reader thread"""
+        loop = asyncio.get_running_loop()
+        async with self.pending_reads:
+            return await loop.run_in_executor(self.readers, functools.partial(func, *args, **kwargs))
+
+    async def run_write(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the writer thread, after the writes queued before it"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, functools.partial(func, *args, **kwargs))
+
+    async def transaction(self, func, *args, **kwargs):
+        """Run func(manager, *args, **kwargs) on the writer inside one manager.transaction()
+
+        Use it for several changes that must be saved together, or for a write
+        whose follow-up needs the writer's connection (such as lastrowid):
+
+            player_id = await manager.transaction(
+                lambda m: m.add_player(*details) and m.cursor.lastrowid)
+
+        Returns func's result. If func raises, every change it made is rolled
+        back and the exception is raised here.
+        """
+        def unit_of_work():
+            with self.manager.transaction():
+                return func(self.manager, *args, **kwargs)
+        return await self.run_write(unit_of_work)
+
+    async def iter_all_players(self, page_size=500):
+        """Yield every player in get_all_players order, one page per reader call"""
+        after = None
+        while True:
+            page = await self.get_all_players(page_size=page_size, after=after)
+            if not page:
+                return
+            for row in page:
+                yield row
+            if len(page) < page_size:
+                return
+            last = page[-1]
+            after = (last['age_group'], last['full_name'], last['player_id'])
+
+    async def changes_since(self, seq=0, chunk_size=500):
+        """Yield every PlayerChange logged after seq, oldest first, one chunk per reader call"""
+        def read_page(after):
+            return list(islice(self.manager.changes_since(after, chunk_size), chunk_size))
+
+        while True:
+            page = await self.run_read(read_page, seq)
+            for change in page:
+                yield change
+            if len(page) < chunk_size:
+                return
+            seq = page[-1].seq
+
+
+for _name in READ_METHODS:
+    setattr(AsyncFootballAcademyManager, _name, read_method(_name))
+for _name in WRITE_METHODS:
+    setattr(AsyncFootballAcademyManager, _name, write_method(_name))
+del _name
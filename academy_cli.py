@@ -0,0 +1,466 @@
+import argparse
+import os
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+
+from academy_export import COMPRESSIONS, EXPORT_FORMATS, write_rows
+from academy_schema import FLAG_COLUMNS
+
+OUTPUT_FORMATS = ('tsv', 'csv', 'jsonl')
+# Milliseconds a one-shot command should add to bare interpreter start-up;
+# --benchmark-startup reports commands over it but does not fail
+STARTUP_BUDGET_MS = 50
+# Read-only one-shot commands timed by --benchmark-startup
+BENCHMARK_COMMANDS = (
+    ('--help',),
+    ('stats',),
+    ('report', 'age-groups'),
+    ('players', 'search', 'a'),
+    ('--format', 'jsonl', 'players', 'search', 'a', '--mode', 'fts'),
+)
+# players update/flags values that are stored as integers
+INTEGER_FIELDS = {
+    'primary_age_group_id', 'secondary_age_group_id', 'birth_day', 'birth_month', 'birth_year',
+    'league_team_id', *FLAG_COLUMNS
+}
+
+
+class BatchError(Exception):
+    """A command in an --atomic batch failed"""
+
+
+def parse_assignments(assignments):
+    """Turn ['photos=1', 'jersey_number=7'] into a dict; 'null' or an empty value means NULL"""
+    values = {}
+    for assignment in assignments:
+        field, separator, value = assignment.partition('=')
+        if not separator:
+            raise ValueError(f"Expected field=value, got '{assignment}'.")
+        if value in ('', 'null'):
+            values[field] = None
+        elif field in INTEGER_FIELDS:
+            values[field] = int(value)
+        else:
+            values[field] = value
+    return values
+
+
+def status(ok, out, message):
+    """Report a write command's outcome; returns the exit code"""
+    if ok:
+        print(message, file=out)
+        return 0
+    return 1
+
+
+# Commands: each takes (manager, args, out) and returns an exit code
+
+def players_list(manager, args, out):
+    if args.age_group:
+        rows = manager.get_players_by_age_group(args.age_group)
+    elif args.type:
+        rows = manager.get_players_by_type(args.type)
+    else:
+        rows = manager.iter_all_players()
+    if rows is None:
+        return 1
+    write_rows(rows, args.format, out, not args.no_header)
+    return 0
+
+
+def players_search(manager, args, out):
+    if args.mode == 'fuzzy':
+        rows = manager.fuzzy_search_players(args.term, k=args.limit)
+    else:
+        rows = manager.search_players(args.term, mode=args.mode)
+    if rows is None:
+        return 1
+    write_rows(rows, args.format, out, not args.no_header)
+    return 0
+
+
+def players_birthdays(manager, args, out):
+    start = None
+    if args.start:
+        import datetime
+        try:
+            start = datetime.date.fromisoformat(args.start)
+        except ValueError:
+            raise ValueError(f"Invalid date '{args.start}'; use YYYY-MM-DD.")
+    rows = manager.get_upcoming_birthdays(args.days, start)
+    if rows is None:
+        return 1
+    write_rows(rows, args.format, out, not args.no_header)
+    return 0
+
+
+def players_add(manager, args, out):
+    ok = manager.add_player(
+        args.name, args.type, args.age_group, args.birth_day, args.birth_month, args.birth_year, args.jersey
+    )
+    return status(ok, out, f"added {manager.cursor.lastrowid}")
+
+
+def players_update(manager, args, out):
+    return status(manager.update_player(args.player_id, **parse_assignments(args.set)), out, f"updated {args.player_id}")
+
+
+def players_delete(manager, args, out):
+    return status(manager.delete_player(args.player_id), out, f"deleted {args.player_id}")
+
+
+def players_flags(manager, args, out):
+    player_filter = {}
+    if args.player_id:
+        player_filter['player_ids'] = args.player_id
+    if args.age_group_id:
+        player_filter['age_group_ids'] = args.age_group_id
+    if args.type_code:
+        player_filter['type_code'] = args.type_code
+    player_filter.update(parse_assignments(args.where))
+    count = manager.bulk_update_flags(player_filter, dry_run=args.dry_run, **parse_assignments(args.set))
+    if count is None:
+        return 1
+    print(f"{'would update' if args.dry_run else 'updated'} {count}", file=out)
+    return 0
+
+
+def stats(manager, args, out):
+    if args.recount:
+        if not manager.update_all_statistics():
+            return 1
+    if args.verify:
+        mismatches = manager.verify_statistics()
+        if mismatches is None:
+            return 1
+        rows = [
+            {'age_group_id': group_id, 'column': column, 'stored': stored, 'expected': expected}
+            for group_id, column, stored, expected in mismatches
+        ]
+        write_rows(rows, args.format, out, not args.no_header)
+        return 1 if mismatches else 0
+    rows = manager.get_academy_statistics()
+    if rows is None:
+        return 1
+    write_rows(rows, args.format, out, not args.no_header)
+    return 0
+
+
+REPORTS = {
+    'birthdays': lambda manager: manager.get_players_with_birthdays_this_month(),
+    'idp-sep': lambda manager: manager.get_players_with_idp_meetings('sep'),
+    'idp-apr': lambda manager: manager.get_players_with_idp_meetings('apr'),
+    'secondary-age-group': lambda manager: manager.get_players_with_secondary_age_group(),
+    'age-groups': lambda manager: manager.get_all_age_groups(),
+    'player-types': lambda manager: manager.get_all_player_types(),
+    'league-teams': lambda manager: manager.get_all_league_teams(),
+}
+
+
+def season_rollover(manager, args, out):
+    cutoff = None
+    if args.cutoff:
+        import datetime
+        try:
+            cutoff = datetime.date.fromisoformat(args.cutoff)
+        except ValueError:
+            raise ValueError(f"Invalid date '{args.cutoff}'; use YYYY-MM-DD.")
+    moves = manager.rollover_season(cutoff, dry_run=args.dry_run)
+    if moves is None:
+        return 1
+    write_rows(moves, args.format, out, not args.no_header)
+    print(f"{'would move' if args.dry_run else 'moved'} {len(moves)}", file=sys.stderr)
+    return 0
+
+
+def report(manager, args, out):
+    rows = REPORTS[args.name](manager)
+    if rows is None:
+        return 1
+    write_rows(rows, args.format, out, not args.no_header)
+    return 0
+
+
+def export(manager, args, out):
+    if args.what == 'players':
+        count = manager.export_players(args.file, args.to, args.compression, args.age_group, not args.no_header)
+    elif args.what == 'birthdays':
+        count = manager.export_birthday_calendar(args.file, args.age_group, args.to, args.compression)
+    else:
+        count = manager.export_statistics(args.file, args.to, args.compression, not args.no_header)
+    if count is None:
+        return 1
+    print(f"exported {count} to {args.file}", file=out)
+    return 0
+
+
+def batch(manager, args, out):
+    """Run one command per line of a file ('-' for stdin) in this process"""
+    try:
+        source = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8')
+    except OSError as e:
+        print(f"Cannot read {args.file}: {e}", file=sys.stderr)
+        return 2
+    parser = build_parser()
+    failures = 0
+    try:
+        if args.atomic:
+            # One transaction for the whole file: the first failure undoes everything
+            with manager.transaction():
+                failures = run_batch(manager, parser, source, args, out, stop_on_error=True)
+        else:
+            failures = run_batch(manager, parser, source, args, out, stop_on_error=args.stop_on_error)
+    except (BatchError, sqlite3.Error) as e:
+        saved = "no changes were saved" if args.atomic else "earlier commands were saved"
+        print(f"Batch aborted at {e}; {saved}.", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 1 if failures else 0
+
+
+def run_batch(manager, parser, source, args, out, stop_on_error):
+    import shlex
+    failures = 0
+    for line_number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            # Lines inherit the batch's output options unless they set their own
+            command = parser.parse_args(['--format', args.format] + (['--no-header'] if args.no_header else []) + shlex.split(line))
+        except SystemExit:
+            command = None
+        if command is None or command.command in (None, 'batch', 'explain', 'query-stats'):
+            code = 2
+        else:
+            try:
+                code = command.func(manager, command, out)
+            except ValueError as e:
+                print(e)
+                code = 2
+        if code:
+            failures += 1
+            print(f"line {line_number}: failed: {line}", file=sys.stderr)
+            if stop_on_error:
+                raise BatchError(f"line {line_number}")
+    return failures
+
+
+def benchmark_startup(db_path, runs=20):
+    """Time one-shot commands in fresh processes and flag any over STARTUP_BUDGET_MS
+
+    The budget is advisory: timings depend on the machine, so commands over
+    it are reported but the exit code is 0 either way.
+    """
+    import statistics
+    import subprocess
+    import time
+
+    # Run as 'python -m academy_cli' so the module is loaded from its cached
+    # bytecode; a script given by path is recompiled on every run
+    directory = os.path.dirname(os.path.abspath(__file__))
+    db_path = os.path.abspath(db_path)
+
+    def median_ms(command):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    # Interpreter start-up is outside our control, so the budget applies to
+    # the time on top of a bare 'python -c pass'
+    baseline = median_ms([sys.executable, '-c', 'pass'])
+    print(f"{'python -c pass':<44} {baseline:7.1f} ms")
+    for arguments in BENCHMARK_COMMANDS:
+        elapsed = median_ms([sys.executable, '-m', 'academy_cli', '--db', db_path, *arguments])
+        overhead = elapsed - baseline
+        flag = '' if overhead <= STARTUP_BUDGET_MS else '  OVER BUDGET'
+        print(f"{' '.join(arguments):<44} {elapsed:7.1f} ms  (+{overhead:.1f} ms){flag}")
+    print(f"Budget (advisory): {STARTUP_BUDGET_MS} ms on top of interpreter start-up, median of {runs} runs.")
+    return 0
+
+
+def query_stats_report(args, out):
+    """Print the heaviest queries (or the slow-query log) from a --query-stats dump"""
+    from query_stats import QueryStats, load_dump
+    path = args.file or args.query_stats
+    if not path:
+        print("No dump file given; pass one or use --query-stats.", file=sys.stderr)
+        return 2
+    try:
+        dump = load_dump(path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read {path}: {e}", file=sys.stderr)
+        return 1
+    if args.slow_queries:
+        rows = [
+            {**entry, 'params': ' '.join(entry['params']), 'plan': '; '.join(entry['plan'])}
+            for entry in dump.get('slow_queries', ())
+        ]
+    else:
+        stats = QueryStats()
+        stats.merge(dump)
+        rows = stats.summary(args.sort)[:args.limit]
+    write_rows(rows, args.format, out, not args.no_header)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scriptable football academy database commands")
+    parser.add_argument('--db', default='football_academy.db', help="database file (default: %(default)s)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='tsv', help="output format (default: %(default)s)")
+    parser.add_argument('--no-header', action='store_true', help="omit the header row of TSV and CSV output")
+    parser.add_argument('--query-stats', metavar='FILE', default=os.environ.get('ACADEMY_QUERY_STATS'),
+                        help="add this run's query timings to a JSON dump (default: $ACADEMY_QUERY_STATS)")
+    parser.add_argument('--slow-ms', type=float, default=None,
+                        help="log queries slower than this many milliseconds with their plan (default: 250)")
+    parser.add_argument('--slow-log', metavar='FILE', help="append slow queries to this JSON Lines file")
+    parser.add_argument('--benchmark-startup', action='store_true',
+                        help="time one-shot commands against --db and report any over the startup budget")
+    # An explicit prog stops argparse from building a help formatter (and
+    # importing shutil) just to name each subcommand parser
+    commands = parser.add_subparsers(dest='command', metavar='command', prog=parser.prog)
+
+    players = commands.add_parser('players', help="list, search and change players")
+    player_commands = players.add_subparsers(dest='action', metavar='action', required=True, prog=players.prog)
+
+    command = player_commands.add_parser('list', help="all players, or one age group or type")
+    group = command.add_mutually_exclusive_group()
+    group.add_argument('--age-group', help="age group name, e.g. 'B 13 & 14'")
+    group.add_argument('--type', help="player type name, e.g. 'Full Time'")
+    command.set_defaults(func=players_list)
+
+    command = player_commands.add_parser('search', help="search players by name")
+    command.add_argument('term')
+    command.add_argument('--mode', choices=('like', 'fts', 'fuzzy'), default='like')
+    command.add_argument('--limit', type=int, default=5, help="matches to return in fuzzy mode")
+    command.set_defaults(func=players_search)
+
+    command = player_commands.add_parser('birthdays', help="players with a birthday in the coming days")
+    command.add_argument('--days', type=int, default=14, help="days to look ahead (default: %(default)s)")
+    command.add_argument('--from', dest='start', metavar='YYYY-MM-DD', help="first day (default: today)")
+    command.set_defaults(func=players_birthdays)
+
+    command = player_commands.add_parser('add', help="add a player")
+    command.add_argument('--name', required=True)
+    command.add_argument('--type', required=True, help="type code: FT, PT, SC or T")
+    command.add_argument('--age-group', required=True, help="age group name")
+    command.add_argument('--birth-day', type=int, required=True)
+    command.add_argument('--birth-month', type=int, required=True)
+    command.add_argument('--birth-year', type=int, required=True)
+    command.add_argument('--jersey', default=None)
+    command.set_defaults(func=players_add)
+
+    command = player_commands.add_parser('update', help="change fields of a player")
+    command.add_argument('player_id', type=int)
+    command.add_argument('--set', action='append', required=True, metavar='FIELD=VALUE')
+    command.set_defaults(func=players_update)
+
+    command = player_commands.add_parser('delete', help="delete a player")
+    command.add_argument('player_id', type=int)
+    command.set_defaults(func=players_delete)
+
+    command = player_commands.add_parser('flags', help="set status flags for many players at once")
+    command.add_argument('--set', action='append', required=True, metavar='FLAG=0|1')
+    command.add_argument('--player-id', type=int, action='append', help="limit to these players")
+    command.add_argument('--age-group-id', type=int, action='append', help="limit to these primary age groups")
+    command.add_argument('--type-code', help="limit to one player type")
+    command.add_argument('--where', action='append', default=[], metavar='FLAG=0|1', help="limit by current flag value")
+    command.add_argument('--dry-run', action='store_true', help="only count the players that would change")
+    command.set_defaults(func=players_flags)
+
+    command = commands.add_parser('stats', help="academy statistics")
+    command.add_argument('--recount', action='store_true', help="recount the statistics from the players table first")
+    command.add_argument('--verify', action='store_true', help="list statistics that differ from a recount")
+    command.set_defaults(func=stats)
+
+    command = commands.add_parser('season', help="move players up to next season's age groups")
+    command.add_argument('action', choices=('rollover',))
+    command.add_argument('--cutoff', metavar='YYYY-MM-DD',
+                         help="players born before its month and day count with the previous year (default: 1 January)")
+    command.add_argument('--dry-run', action='store_true', help="only list the moves")
+    command.set_defaults(func=season_rollover)
+
+    command = commands.add_parser('report', help="built-in reports and lookup tables")
+    command.add_argument('name', choices=sorted(REPORTS))
+    command.set_defaults(func=report)
+
+    command = commands.add_parser('export', help="write players or statistics to a file")
+    command.add_argument('what', choices=('players', 'statistics', 'birthdays'))
+    command.add_argument('file', help="output file; .csv, .tsv, .jsonl, .parquet or (birthdays) .ics, "
+                                      "plus .gz or .zst to compress")
+    command.add_argument('--to', choices=EXPORT_FORMATS, help="file format (default: from the file name)")
+    command.add_argument('--compression', choices=COMPRESSIONS, help="compression (default: from the file name)")
+    command.add_argument('--age-group', help="export only this age group's players or birthdays")
+    command.set_defaults(func=export)
+
+    command = commands.add_parser('batch', help="run one command per line of a file")
+    command.add_argument('file', help="command file, or - for stdin")
+    command.add_argument('--atomic', action='store_true', help="run every command in one transaction")
+    command.add_argument('--stop-on-error', action='store_true', help="stop at the first failing command")
+    command.set_defaults(func=batch)
+
+    commands.add_parser('explain', help="print the query plan of every built-in query")
+
+    command = commands.add_parser('query-stats', help="summarise a --query-stats dump")
+    command.add_argument('file', nargs='?', help="dump file (default: --query-stats)")
+    command.add_argument('--sort', choices=('total_ms', 'calls', 'mean_ms', 'p95_ms', 'max_ms', 'rows'),
+                         default='total_ms')
+    command.add_argument('--limit', type=int, default=20, help="queries to show (default: %(default)s)")
+    command.add_argument('--slow-queries', action='store_true', help="list the logged slow queries instead")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.benchmark_startup:
+        return benchmark_startup(args.db)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    if args.command == 'query-stats':
+        return query_stats_report(args, sys.stdout)
+    # Imported only once the arguments are valid, so --help and usage
+    # errors return without loading the manager
+    from football_academy_manager import FootballAcademyManager, explain_main
+    if args.command == 'explain':
+        return explain_main(args.db)
+
+    # Results go to stdout; the manager's own messages go to stderr so they
+    # never mix with machine-readable output
+    out = sys.stdout
+    with redirect_stdout(sys.stderr):
+        manager = FootballAcademyManager(args.db)
+        if args.slow_ms is not None:
+            manager.query_stats.slow_query_ms = args.slow_ms
+        manager.query_stats.slow_log_path = args.slow_log
+        # The database is opened (and its schema checked) on the first query
+        if not manager.connect(lazy=True):
+            return 1
+        try:
+            return args.func(manager, args, out)
+        except ValueError as e:
+            print(e)
+            return 2
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return 1
+        finally:
+            manager.close()
+            if args.query_stats:
+                manager.query_stats.save(args.query_stats)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Output piped into head and the like: stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
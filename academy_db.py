@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+
+# Applied to every connection. WAL lets readers run alongside a writer, and
+# synchronous=NORMAL is safe in WAL mode (a power loss can lose the last
+# transactions but never corrupts the database).
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -64000),  # negative means KiB, so about 64 MB per connection
+    ('mmap_size', 268435456),  # 256 MB
+    ('temp_store', 'MEMORY'),
+)
+# Seconds a connection waits for another connection's write lock
+BUSY_TIMEOUT = 30
+
+
+def open_connection(db_path, pragmas=CONNECTION_PRAGMAS):
+    """Open a tuned connection that returns sqlite3.Row rows"""
+    # check_same_thread is off only so ConnectionPool.close() can close
+    # connections from whichever thread shuts the pool down; each connection
+    # is otherwise used by the thread that opened it
+    # isolation_level=None: no implicit transactions, statements autocommit
+    # unless they run inside an explicit BEGIN ... COMMIT
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # This enables column access by name
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """Hands out one connection (and cursor) per thread for a database file
+
+    Connections are opened lazily the first time a thread asks for one, so
+    concurrent readers never share a connection with a writer. on_first_connect,
+    if given, is called with the first connection the pool opens (to check the
+    schema, say) before any thread can use it. Connections of threads that
+    have exited are closed whenever another thread opens one, so thread
+    pools that replace their threads do not pile up open connections.
+    """
+
+    def __init__(self, db_path, pragmas=CONNECTION_PRAGMAS, on_first_connect=None):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.on_first_connect = on_first_connect
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # Thread -> the connection it opened
+        self.connections = {}
+        self.prepared = on_first_connect is None
+
+    def connection(self):
+        """The calling thread's connection"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = open_connection(self.db_path, self.pragmas)
+            with self.lock:
+                if not self.prepared:
+                    try:
+                        self.on_first_connect(conn)
+                    except BaseException:
+                        conn.close()
+                        raise
+                    self.prepared = True
+                self.prune()
+                self.connections[threading.current_thread()] = conn
+            self.local.conn = conn
+            self.local.cursor = conn.cursor()
+        return conn
+
+    def cursor(self):
+        """The calling thread's shared cursor"""
+        self.connection()
+        return self.local.cursor
+
+    def prune(self):
+        """Close the connections of threads that have exited (call with the lock held)"""
+        for thread in [thread for thread in self.connections if not thread.is_alive()]:
+            self.connections.pop(thread).close()
+
+    def close(self):
+        """Close every connection the pool has opened"""
+        with self.lock:
+            connections, self.connections = self.connections, {}
+        for conn in connections.values():
+            conn.close()
+        self.local = threading.local()
@@ -0,0 +1,257 @@
+import io
+import os
+from itertools import chain, islice
+
+# csv, json, gzip and the optional zstd and Arrow modules are imported where
+# they are used, so loading this module (every academy_cli.py command does)
+# stays cheap
+
+EXPORT_FORMATS = ('csv', 'tsv', 'jsonl', 'parquet', 'ics')
+COMPRESSIONS = ('gzip', 'zstd')
+# File name suffixes export_rows() recognises, e.g. roster.csv.gz
+SUFFIX_FORMATS = {'.csv': 'csv', '.tsv': 'tsv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet',
+                  '.ics': 'ics'}
+SUFFIX_COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+# gzip's default level 9 is several times slower than 6 for a few percent
+# smaller files; zstd level 3 is its own default
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Rows per Parquet record batch, and so the most rows held in memory at once
+PARQUET_BATCH_ROWS = 65536
+
+
+def detect_format(path):
+    """(format, compression) implied by a file name such as 'roster.csv.gz'; either may be None"""
+    root, suffix = os.path.splitext(os.path.basename(path).lower())
+    compression = SUFFIX_COMPRESSIONS.get(suffix)
+    if compression:
+        root, suffix = os.path.splitext(root)
+    return SUFFIX_FORMATS.get(suffix), compression
+
+
+def detect_name(path):
+    """File name without directory or suffixes: 'exports/b13.ics.gz' -> 'b13'"""
+    return os.path.basename(path).split('.')[0]
+
+
+def resolve_format(path, fmt=None, compression=None):
+    """The (format, compression) to export path with: the ones given, else those its name implies"""
+    detected_format, detected_compression = detect_format(path)
+    fmt = fmt or detected_format
+    compression = compression or detected_compression
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Cannot export '{path}' as {fmt or 'an unknown format'}; "
+                         f"use one of {', '.join(EXPORT_FORMATS)}.")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'; use one of {', '.join(COMPRESSIONS)}.")
+    return fmt, compression
+
+
+def json_object_query(query, columns, order_by=None):
+    """Wrap a SELECT with the given result columns so each row comes back as one JSON object text
+
+    SQLite's json_object() builds the text in C, several times faster than
+    json.dumps() on each row. Pass the rows to write_rows with json_text=True.
+    An ORDER BY inside query does not bind the wrapper, so give the order as
+    order_by, in terms of the result columns.
+    """
+    pairs = ', '.join(
+        "'{}', \"{}\"".format(column.replace("'", "''"), column.replace('"', '""')) for column in columns
+    )
+    query = f"SELECT json_object({pairs}) FROM ({query})"
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    return query
+
+
+def write_rows(rows, fmt, out, header=True, json_text=False):
+    """Stream rows (sqlite3.Row or dicts) to out as TSV, CSV or JSON Lines; returns the row count
+
+    With json_text, each row holds one ready-made JSON object (see
+    json_object_query) and is written as it is.
+    """
+    rows = iter(rows or ())
+    first = next(rows, None)
+    if first is None:
+        return 0
+    if json_text:
+        count = 1
+        out.write(first[0] + '\n')
+        for count, row in enumerate(rows, start=2):
+            out.write(row[0] + '\n')
+        return count
+    keys = list(first.keys())
+    # sqlite3.Row is already a sequence of values; dicts need their values picked
+    if isinstance(first, dict):
+        values = ([row[key] for key in keys] for row in chain((first,), rows))
+    else:
+        values = chain((first,), rows)
+
+    count = 0
+
+    def counted(values):
+        nonlocal count
+        for count, row in enumerate(values, start=1):
+            yield row
+
+    if fmt == 'jsonl':
+        import json
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        out.writelines(encode(dict(zip(keys, row))) + '\n' for row in counted(values))
+    else:
+        import csv
+        writer = csv.writer(out, delimiter='\t' if fmt == 'tsv' else ',', lineterminator='\n')
+        if header:
+            writer.writerow(keys)
+        writer.writerows(counted(values))
+    return count
+
+
+def ics_text(value):
+    """Escape a value for an iCalendar TEXT property"""
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ics_line(line):
+    """Fold a content line into 75-octet pieces, as RFC 5545 requires, ending in CRLF"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    pieces = []
+    start = 0
+    limit = 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # Never split a UTF-8 sequence: back up to the start of a character
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(data[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def write_ics(rows, out, calendar_name):
+    """Write rows as an iCalendar file of all-day events; returns the event count
+
+    Each row needs uid, summary and dtstart (an ISO date) and may have an
+    rrule, such as FREQ=YEARLY for a birthday.
+    """
+    import time
+    stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+    out.write(ics_line('BEGIN:VCALENDAR'))
+    out.write(ics_line('VERSION:2.0'))
+    out.write(ics_line('PRODID:-//Football Academy//Academy Manager//EN'))
+    out.write(ics_line(f'X-WR-CALNAME:{ics_text(calendar_name)}'))
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        keys = row.keys()
+        out.write(ics_line('BEGIN:VEVENT'))
+        out.write(ics_line(f"UID:{row['uid']}"))
+        out.write(ics_line(f'DTSTAMP:{stamp}'))
+        out.write(ics_line(f"DTSTART;VALUE=DATE:{row['dtstart'].replace('-', '')}"))
+        if 'rrule' in keys and row['rrule']:
+            out.write(ics_line(f"RRULE:{row['rrule']}"))
+        out.write(ics_line(f"SUMMARY:{ics_text(row['summary'])}"))
+        out.write(ics_line('TRANSP:TRANSPARENT'))
+        out.write(ics_line('END:VEVENT'))
+    out.write(ics_line('END:VCALENDAR'))
+    return count
+
+
+def open_output(path, compression=None):
+    """Open path for writing UTF-8 text, compressed with gzip or zstd if asked"""
+    if compression is None:
+        return open(path, 'w', encoding='utf-8', newline='')
+    if compression == 'gzip':
+        import gzip
+        binary = gzip.open(path, 'wb', compresslevel=GZIP_LEVEL)
+    elif compression == 'zstd':
+        try:
+            # Python 3.14 and later
+            from compression import zstd
+            binary = zstd.open(path, 'wb', level=ZSTD_LEVEL)
+        except ImportError:
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError("zstd compression needs the zstandard package (pip install zstandard).")
+            binary = zstandard.open(path, 'wb', cctx=zstandard.ZstdCompressor(level=ZSTD_LEVEL))
+    else:
+        raise ValueError(f"Unknown compression '{compression}'; use one of {', '.join(COMPRESSIONS)}.")
+    return io.TextIOWrapper(binary, encoding='utf-8', newline='')
+
+
+def write_parquet(rows, path, compression=None, batch_rows=PARQUET_BATCH_ROWS):
+    """Write rows to a Parquet file one record batch at a time; returns the row count
+
+    compression is the codec used inside the file (gzip, zstd or, by default,
+    snappy). Column types come from the first batch; a column that is empty
+    throughout it is written as text.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow).")
+
+    rows = iter(rows or ())
+    first = next(rows, None)
+    keys = list(first.keys()) if first is not None else []
+    rows = chain((first,), rows) if first is not None else rows
+    schema = None
+    count = 0
+    writer = None
+    try:
+        while True:
+            batch = list(islice(rows, batch_rows))
+            if not batch:
+                break
+            if isinstance(first, dict):
+                batch = [[row[key] for key in keys] for row in batch]
+            arrays = [pa.array(column) for column in zip(*batch)]
+            if schema is None:
+                schema = pa.schema([
+                    pa.field(key, pa.string() if array.type == pa.null() else array.type)
+                    for key, array in zip(keys, arrays)
+                ])
+                writer = pq.ParquetWriter(path, schema, compression=compression or 'snappy')
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [array.cast(field.type) for array, field in zip(arrays, schema)], schema=schema
+            ))
+            count += len(batch)
+        if writer is None:
+            pq.write_table(pa.table({}), path, compression=compression or 'snappy')
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def export_rows(rows, path, fmt=None, compression=None, header=True, json_text=False, calendar_name=None):
+    """Stream rows to a CSV, TSV, JSON Lines or Parquet file; returns the row count
+
+    fmt and compression default to what the file name implies (roster.csv.gz,
+    statistics.parquet, ...). Rows are written as they arrive, so memory use
+    does not grow with the export. The file is written under a temporary name
+    and renamed when complete: a failed export never leaves a partial file.
+    An .ics calendar is titled calendar_name, or else after the file name.
+    """
+    fmt, compression = resolve_format(path, fmt, compression)
+
+    partial_path = f"{path}.partial"
+    try:
+        if fmt == 'parquet':
+            count = write_parquet(rows, partial_path, compression)
+        else:
+            with open_output(partial_path, compression) as out:
+                if fmt == 'ics':
+                    count = write_ics(rows, out, calendar_name or detect_name(path))
+                else:
+                    count = write_rows(rows, fmt, out, header, json_text)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return count
@@ -0,0 +1,214 @@
+import heapq
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, groupby
+from operator import itemgetter
+from urllib.parse import quote
+
+from football_academy_manager import FootballAcademyManager
+
+# academy_statistics of one attached shard; {schema} is the shard's ATTACH name
+SHARD_STATISTICS_QUERY = """
+SELECT
+    ag.group_name AS age_group,
+    s.total AS actual_players,
+    s.budget AS budgeted_players,
+    s.net AS difference,
+    s.ft_players AS full_time,
+    s.pt_players AS part_time,
+    s.sc_players AS scholarship,
+    s.trial_players AS trial
+FROM {schema}.academy_statistics s
+JOIN {schema}.age_groups ag ON s.age_group_id = ag.group_id
+"""
+STATISTICS_COLUMNS = ('actual_players', 'budgeted_players', 'difference', 'full_time', 'part_time', 'scholarship', 'trial')
+
+
+def tagged(academy, rows):
+    """Yield rows as dicts with the academy they came from as the first key"""
+    for row in rows:
+        yield {'academy': academy, **{key: row[key] for key in row.keys()}}
+
+
+def birth_day(row):
+    """Sort key matching each academy's ORDER BY birth_day
+
+    birth_date is NULL when any part of the date is, and SQLite sorts NULL
+    days first, so those rows sort first here too.
+    """
+    if row['birth_date'] is None:
+        return -1
+    return int(row['birth_date'].split('/')[0])
+
+
+class FederatedAcademyManager:
+    """Read-only reports across several academies, each with its own database (a shard)
+
+    shards maps each academy's name, the shard key, to its database file.
+    Every row returned has an 'academy' key naming the shard it came from.
+    Reports run on every shard in parallel on a thread pool and the
+    per-shard results, already sorted, are combined with a k-way merge
+    (heapq.merge) in the same order a single academy would use. Statistics
+    are read in one UNION ALL query over the shards ATTACHed to a single
+    connection. Changes go to one academy: route(academy) returns its
+    FootballAcademyManager.
+    """
+
+    def __init__(self, shards, workers=None):
+        self.managers = {academy: FootballAcademyManager(db_path) for academy, db_path in shards.items()}
+        self.executor = ThreadPoolExecutor(max_workers=workers or len(self.managers) or 1,
+                                           thread_name_prefix='academy-shard')
+        # In-memory connection with every shard ATTACHed read-only, opened on
+        # first use; reports on several threads take turns with it
+        self.attached = None
+        self.attached_lock = threading.Lock()
+
+    def connect(self):
+        """Connect to every shard (bringing each schema up to date); False if any fails"""
+        connected = [manager.connect() for manager in self.managers.values()]
+        return all(connected)
+
+    def close(self):
+        with self.attached_lock:
+            if self.attached is not None:
+                self.attached.close()
+                self.attached = None
+        self.executor.shutdown(wait=True)
+        for manager in self.managers.values():
+            manager.close()
+
+    def route(self, academy):
+        """The FootballAcademyManager of one academy, for changes and single-academy queries"""
+        manager = self.managers.get(academy)
+        if manager is None:
+            print(f"Unknown academy: {academy}")
+        return manager
+
+    # Parallel per-shard queries
+    def fan_out(self, method, *args, **kwargs):
+        """Call a FootballAcademyManager method on every shard in parallel; returns [(academy, result)]"""
+        futures = [
+            (academy, self.executor.submit(getattr(manager, method), *args, **kwargs))
+            for academy, manager in self.managers.items()
+        ]
+        return [(academy, future.result()) for academy, future in futures]
+
+    def merged(self, method, key, *args, **kwargs):
+        """Run a report on every shard and merge the sorted results by key; None if any shard fails"""
+        results = self.fan_out(method, *args, **kwargs)
+        if any(rows is None for _, rows in results):
+            return None
+        return list(heapq.merge(*(tagged(academy, rows) for academy, rows in results), key=key))
+
+    def get_players_by_age_group(self, age_group):
+        return self.merged('get_players_by_age_group', lambda row: row['full_name'], age_group)
+
+    def get_players_by_type(self, player_type):
+        return self.merged('get_players_by_type', lambda row: (row['age_group'], row['full_name']), player_type)
+
+    def search_players(self, search_term, mode='like'):
+        """search_players on every academy: by name, or for fts by each academy's ranking in turn"""
+        if mode == 'fts':
+            # Relevance ranks are per academy, so take each academy's best
+            # match, then each one's second best, and so on
+            results = self.fan_out('search_players', search_term, mode)
+            if any(rows is None for _, rows in results):
+                return None
+            streams = [zip(count(), tagged(academy, rows)) for academy, rows in results]
+            return [row for _, row in heapq.merge(*streams, key=lambda item: item[0])]
+        return self.merged('search_players', lambda row: row['full_name'], search_term, mode)
+
+    def get_players_with_birthdays_this_month(self):
+        return self.merged('get_players_with_birthdays_this_month', birth_day)
+
+    def get_upcoming_birthdays(self, days=14, start=None):
+        return self.merged('get_upcoming_birthdays', lambda row: (row['next_birthday'], row['full_name']), days, start)
+
+    def get_players_with_idp_meetings(self, month='sep'):
+        return self.merged('get_players_with_idp_meetings', lambda row: (row['age_group'], row['full_name']), month)
+
+    def get_players_with_secondary_age_group(self):
+        return self.merged('get_players_with_secondary_age_group',
+                           lambda row: (row['primary_age_group'], row['full_name']))
+
+    def iter_all_players(self, chunk_size=500):
+        """Stream every academy's players merged into one (age group, name) ordered sequence
+
+        Each shard is read lazily, so memory stays at a chunk per academy
+        however large the rosters are.
+        """
+        streams = [
+            tagged(academy, manager.iter_all_players(chunk_size))
+            for academy, manager in self.managers.items()
+        ]
+        return heapq.merge(*streams, key=lambda row: (row['age_group'], row['full_name'], row['player_id']))
+
+    # UNION ALL queries over ATTACHed shards
+    def attach(self):
+        """In-memory connection with every shard ATTACHed read-only as shard0, shard1, ...
+
+        Hold attached_lock while opening and using it.
+        """
+        if self.attached is None:
+            conn = sqlite3.connect(':memory:', uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            try:
+                for number, manager in enumerate(self.managers.values()):
+                    conn.execute(f"ATTACH DATABASE ? AS shard{number}", (f"file:{quote(manager.db_path)}?mode=ro",))
+            except sqlite3.Error:
+                # Typically more shards than SQLITE_MAX_ATTACHED (10 by default)
+                conn.close()
+                raise
+            self.attached = conn
+        return self.attached
+
+    def union_query(self, shard_query, params=(), order_by=None):
+        """Run shard_query against every shard as one UNION ALL query, with an academy column
+
+        shard_query names each table as {schema}.table; params are passed to
+        every shard's copy of the query.
+        """
+        parts = []
+        all_params = []
+        for number, academy in enumerate(self.managers):
+            parts.append(f"SELECT ? AS academy, * FROM ({shard_query.format(schema=f'shard{number}')})")
+            all_params.extend([academy, *params])
+        query = "\nUNION ALL\n".join(parts)
+        if order_by:
+            query += f"\nORDER BY {order_by}"
+        with self.attached_lock:
+            return self.attach().execute(query, all_params).fetchall()
+
+    def get_academy_statistics(self):
+        """Every academy's statistics, ordered by age group and then academy"""
+        try:
+            return self.union_query(SHARD_STATISTICS_QUERY, order_by='age_group, academy')
+        except sqlite3.Error:
+            # Too many shards to ATTACH: fall back to per-shard queries
+            return self.merged('get_academy_statistics', lambda row: row['age_group'])
+
+    def get_combined_statistics(self):
+        """Statistics per age group summed over every academy"""
+        sums = ', '.join(f"SUM({column}) AS {column}" for column in STATISTICS_COLUMNS)
+        parts = " UNION ALL ".join(
+            SHARD_STATISTICS_QUERY.format(schema=f"shard{number}") for number in range(len(self.managers))
+        )
+        query = f"SELECT age_group, {sums} FROM ({parts}) GROUP BY age_group ORDER BY age_group"
+        try:
+            with self.attached_lock:
+                return self.attach().execute(query).fetchall()
+        except sqlite3.Error:
+            pass
+        # Too many shards to ATTACH: add up the per-shard statistics instead
+        rows = self.merged('get_academy_statistics', lambda row: row['age_group'])
+        if rows is None:
+            return None
+        combined = []
+        for age_group, group in groupby(rows, itemgetter('age_group')):
+            group = list(group)
+            combined.append({
+                'age_group': age_group,
+                **{column: sum(row[column] or 0 for row in group) for column in STATISTICS_COLUMNS},
+            })
+        return combined
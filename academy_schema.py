@@ -0,0 +1,460 @@
+import sqlite3
+from contextlib import contextmanager
+
+# Schema migrations applied on top of the tables created by
+# create_football_academy_db.py. PRAGMA user_version records how many have
+# been applied, so each one runs exactly once per database.
+
+STATISTICS_COUNT_COLUMNS = ('total', 'ft_players', 'pt_players', 'sc_players', 'trial_players')
+# players status flags, 0 or 1. Kept here, with no imports beyond sqlite3,
+# so the CLI, the flag bitmaps and the roster snapshot share one definition
+# without loading the manager
+FLAG_COLUMNS = ('veo_member', 'photos', 'idp_meeting_sep', 'idp_meeting_apr', 'chat', 'files')
+
+# Keep academy_statistics up to date with O(1) delta updates on every write
+# to players instead of recounting the whole table
+STATISTICS_TRIGGERS = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_academy_statistics_age_group
+    ON academy_statistics (age_group_id)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_statistics_insert
+    AFTER INSERT ON players
+    BEGIN
+        UPDATE academy_statistics
+        SET total = total + 1,
+            net = net - 1,
+            ft_players = ft_players + (NEW.type_code IS 'FT'),
+            pt_players = pt_players + (NEW.type_code IS 'PT'),
+            sc_players = sc_players + (NEW.type_code IS 'SC'),
+            trial_players = trial_players + (NEW.type_code IS 'T')
+        WHERE age_group_id = NEW.primary_age_group_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_statistics_delete
+    AFTER DELETE ON players
+    BEGIN
+        UPDATE academy_statistics
+        SET total = total - 1,
+            net = net + 1,
+            ft_players = ft_players - (OLD.type_code IS 'FT'),
+            pt_players = pt_players - (OLD.type_code IS 'PT'),
+            sc_players = sc_players - (OLD.type_code IS 'SC'),
+            trial_players = trial_players - (OLD.type_code IS 'T')
+        WHERE age_group_id = OLD.primary_age_group_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_statistics_update
+    AFTER UPDATE OF primary_age_group_id, type_code ON players
+    WHEN OLD.primary_age_group_id IS NOT NEW.primary_age_group_id
+        OR OLD.type_code IS NOT NEW.type_code
+    BEGIN
+        UPDATE academy_statistics
+        SET total = total - 1,
+            net = net + 1,
+            ft_players = ft_players - (OLD.type_code IS 'FT'),
+            pt_players = pt_players - (OLD.type_code IS 'PT'),
+            sc_players = sc_players - (OLD.type_code IS 'SC'),
+            trial_players = trial_players - (OLD.type_code IS 'T')
+        WHERE age_group_id = OLD.primary_age_group_id;
+        UPDATE academy_statistics
+        SET total = total + 1,
+            net = net - 1,
+            ft_players = ft_players + (NEW.type_code IS 'FT'),
+            pt_players = pt_players + (NEW.type_code IS 'PT'),
+            sc_players = sc_players + (NEW.type_code IS 'SC'),
+            trial_players = trial_players + (NEW.type_code IS 'T')
+        WHERE age_group_id = NEW.primary_age_group_id;
+    END
+    """,
+]
+
+
+# Secondary indexes for the access patterns used by FootballAcademyManager;
+# audit_query_plans() checks the built-in queries still use them
+PLAYER_INDEXES = [
+    # Age group listings and the per-type statistics counts
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_age_group_type
+    ON players (primary_age_group_id, type_code)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_type
+    ON players (type_code)
+    """,
+    # Birthday reports
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_birthday
+    ON players (birth_month, birth_day)
+    """,
+    # Sparse columns: only index the rows that are actually set
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_secondary_age_group
+    ON players (secondary_age_group_id)
+    WHERE secondary_age_group_id IS NOT NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_league_team
+    ON players (league_team_id)
+    WHERE league_team_id IS NOT NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_idp_meeting_sep
+    ON players (primary_age_group_id)
+    WHERE idp_meeting_sep = 1
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_players_idp_meeting_apr
+    ON players (primary_age_group_id)
+    WHERE idp_meeting_apr = 1
+    """,
+]
+
+
+# Full-text index over player names, kept in sync with players by triggers.
+# remove_diacritics lets 'Jimenez' match 'Jiménez'; the prefix indexes make
+# short prefix queries ('San*') cheap.
+PLAYER_NAME_SEARCH = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS players_fts USING fts5(
+        full_name,
+        content = 'players',
+        content_rowid = 'player_id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_fts_insert
+    AFTER INSERT ON players
+    BEGIN
+        INSERT INTO players_fts (rowid, full_name) VALUES (NEW.player_id, NEW.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_fts_delete
+    AFTER DELETE ON players
+    BEGIN
+        INSERT INTO players_fts (players_fts, rowid, full_name) VALUES ('delete', OLD.player_id, OLD.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_players_fts_update
+    AFTER UPDATE OF full_name ON players
+    BEGIN
+        INSERT INTO players_fts (players_fts, rowid, full_name) VALUES ('delete', OLD.player_id, OLD.full_name);
+        INSERT INTO players_fts (rowid, full_name) VALUES (NEW.player_id, NEW.full_name);
+    END
+    """,
+    "INSERT INTO players_fts (players_fts) VALUES ('rebuild')",
+]
+
+
+# Append-only log of which players changed, in order. Consumers such as
+# RosterSnapshot remember the last seq they have seen and re-read only the
+# players changed since.
+PLAYER_CHANGE_LOG = [
+    """
+    CREATE TABLE IF NOT EXISTS player_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER NOT NULL,
+        operation TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_player_changes_insert
+    AFTER INSERT ON players
+    BEGIN
+        INSERT INTO player_changes (player_id, operation) VALUES (NEW.player_id, 'INSERT');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_player_changes_update
+    AFTER UPDATE ON players
+    BEGIN
+        INSERT INTO player_changes (player_id, operation) VALUES (NEW.player_id, 'UPDATE');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_player_changes_delete
+    AFTER DELETE ON players
+    BEGIN
+        INSERT INTO player_changes (player_id, operation) VALUES (OLD.player_id, 'DELETE');
+    END
+    """,
+]
+
+
+# players columns recorded in the change log, besides player_id
+LOGGED_PLAYER_COLUMNS = (
+    'full_name', 'type_code', 'primary_age_group_id', 'secondary_age_group_id',
+    'birth_day', 'birth_month', 'birth_year', 'jersey_number', 'league_team_id',
+    'veo_member', 'photos', 'idp_meeting_sep', 'idp_meeting_apr', 'chat', 'files'
+)
+
+
+def _json_row(prefix):
+    return 'json_object({})'.format(', '.join(f"'{column}', {prefix}{column}" for column in LOGGED_PLAYER_COLUMNS))
+
+
+def _changed_columns():
+    # One (name, old_value, new_value) row per logged column, for UPDATE triggers
+    first, *rest = LOGGED_PLAYER_COLUMNS
+    return f"SELECT '{first}' AS name, OLD.{first} AS old_value, NEW.{first} AS new_value " + ' '.join(
+        f"UNION ALL SELECT '{column}', OLD.{column}, NEW.{column}" for column in rest
+    )
+
+
+# Change log entries with the values that changed, as JSON objects: the whole
+# new row for an INSERT, the whole old row for a DELETE, and for an UPDATE
+# only the columns whose value changed, before and after. Updates that
+# change nothing are not logged.
+PLAYER_CHANGE_VALUES = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_player_changes_insert
+    AFTER INSERT ON players
+    BEGIN
+        INSERT INTO player_changes (player_id, operation, new_values)
+        VALUES (NEW.player_id, 'INSERT', {_json_row('NEW.')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_player_changes_update
+    AFTER UPDATE ON players
+    BEGIN
+        INSERT INTO player_changes (player_id, operation, old_values, new_values)
+        SELECT NEW.player_id, 'UPDATE', json_group_object(name, old_value), json_group_object(name, new_value)
+        FROM ({_changed_columns()})
+        WHERE old_value IS NOT new_value
+        HAVING COUNT(*) > 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_player_changes_delete
+    AFTER DELETE ON players
+    BEGIN
+        INSERT INTO player_changes (player_id, operation, old_values)
+        VALUES (OLD.player_id, 'DELETE', {_json_row('OLD.')});
+    END
+    """,
+]
+
+
+def count_statistics(conn, after_player_id=None):
+    """Full recount of the player counts per age group: {age_group_id: (total, ft, pt, sc, trial)}
+
+    With after_player_id, only players with a higher ID (for example the
+    ones just imported) are counted.
+    """
+    rows = conn.execute(f"""
+    SELECT
+        primary_age_group_id,
+        COUNT(*),
+        SUM(type_code IS 'FT'),
+        SUM(type_code IS 'PT'),
+        SUM(type_code IS 'SC'),
+        SUM(type_code IS 'T')
+    FROM players
+    WHERE primary_age_group_id IS NOT NULL
+    {'AND player_id > ?' if after_player_id is not None else ''}
+    GROUP BY primary_age_group_id
+    """, () if after_player_id is None else (after_player_id,)).fetchall()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def recount_statistics(conn):
+    """Overwrite the academy_statistics counts with a full recount (does not commit)"""
+    counts = count_statistics(conn)
+    params = []
+    for (group_id,) in conn.execute("SELECT age_group_id FROM academy_statistics").fetchall():
+        total, ft, pt, sc, trial = counts.get(group_id, (0, 0, 0, 0, 0))
+        params.append((total, ft, pt, sc, trial, total, group_id))
+    conn.executemany("""
+    UPDATE academy_statistics
+    SET total = ?, ft_players = ?, pt_players = ?, sc_players = ?, trial_players = ?,
+        net = budget - ?
+    WHERE age_group_id = ?
+    """, params)
+
+
+def _catch_up_statistics(conn, after_player_id):
+    params = [
+        (total, total, ft, pt, sc, trial, group_id)
+        for group_id, (total, ft, pt, sc, trial) in count_statistics(conn, after_player_id).items()
+    ]
+    conn.executemany("""
+    UPDATE academy_statistics
+    SET total = total + ?, net = net - ?,
+        ft_players = ft_players + ?, pt_players = pt_players + ?,
+        sc_players = sc_players + ?, trial_players = trial_players + ?
+    WHERE age_group_id = ?
+    """, params)
+
+
+def _catch_up_name_search(conn, after_player_id):
+    conn.execute("""
+    INSERT INTO players_fts (rowid, full_name)
+    SELECT player_id, full_name FROM players WHERE player_id > ?
+    """, (after_player_id,))
+
+
+def _catch_up_player_changes(conn, after_player_id):
+    if has_column(conn, 'player_changes', 'new_values'):
+        conn.execute(f"""
+        INSERT INTO player_changes (player_id, operation, new_values)
+        SELECT player_id, 'INSERT', {_json_row('')} FROM players WHERE player_id > ? ORDER BY player_id
+        """, (after_player_id,))
+        return
+    conn.execute("""
+    INSERT INTO player_changes (player_id, operation)
+    SELECT player_id, 'INSERT' FROM players WHERE player_id > ? ORDER BY player_id
+    """, (after_player_id,))
+
+
+# Per-row insert triggers suspended during bulk inserts: trigger name ->
+# set-based catch-up for the rows inserted. The triggers are recreated from
+# their own definitions in sqlite_master, whichever version is installed.
+DEFERRABLE_INSERT_TRIGGERS = {
+    'trg_players_statistics_insert': _catch_up_statistics,
+    'trg_players_fts_insert': _catch_up_name_search,
+    'trg_player_changes_insert': _catch_up_player_changes,
+}
+
+
+@contextmanager
+def suspended_triggers(conn, names):
+    """Drop those of the named players triggers that are installed, and recreate them after the block
+
+    Must be used inside a transaction; the block is responsible for bringing
+    up to date whatever the triggers maintain. Yields the names of the
+    triggers suspended. DDL is transactional in SQLite, so other
+    connections never see the triggers missing.
+    """
+    suspended = [
+        (name, create_trigger) for name, create_trigger in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'players'"
+        ).fetchall()
+        if name in names
+    ]
+    for name, _ in suspended:
+        conn.execute(f"DROP TRIGGER {name}")
+
+    yield [name for name, _ in suspended]
+
+    for _, create_trigger in suspended:
+        conn.execute(create_trigger)
+
+
+@contextmanager
+def deferred_insert_triggers(conn):
+    """Suspend the per-row players insert triggers for a bulk insert
+
+    Must be used inside a transaction that only appends new players. The
+    triggers are dropped for the duration and recreated afterwards, and the
+    tables they maintain are caught up with one set-based statement each
+    for everything inserted in between.
+    """
+    after_player_id = conn.execute("SELECT COALESCE(MAX(player_id), 0) FROM players").fetchone()[0]
+    with suspended_triggers(conn, DEFERRABLE_INSERT_TRIGGERS) as suspended:
+        yield
+        for name in suspended:
+            DEFERRABLE_INSERT_TRIGGERS[name](conn, after_player_id)
+
+
+def _install_statistics_triggers(conn):
+    for statement in STATISTICS_TRIGGERS:
+        conn.execute(statement)
+    # Rebaseline once so the triggers start from correct counts
+    recount_statistics(conn)
+
+
+def _add_player_indexes(conn):
+    for statement in PLAYER_INDEXES:
+        conn.execute(statement)
+
+
+def _add_player_name_search(conn):
+    try:
+        conn.execute(PLAYER_NAME_SEARCH[0])
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search_players falls back to LIKE
+        return
+    for statement in PLAYER_NAME_SEARCH[1:]:
+        conn.execute(statement)
+
+
+def has_table(conn, name):
+    """True if the database has a table (or virtual table) with this name"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def has_column(conn, table, column):
+    """True if table has a column with this name"""
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_roster_order_index(conn):
+    # Lets the full roster be read in (age group, name) order straight off
+    # the index, for streaming and keyset pagination
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_players_age_group_name
+    ON players (primary_age_group_id, full_name)
+    """)
+
+
+def _add_player_change_log(conn):
+    for statement in PLAYER_CHANGE_LOG:
+        conn.execute(statement)
+
+
+def _log_player_change_values(conn):
+    try:
+        conn.execute("SELECT json_object('a', 1)")
+    except sqlite3.OperationalError:
+        # SQLite built without the JSON functions: changes are logged
+        # without their values
+        return
+    conn.execute("ALTER TABLE player_changes ADD COLUMN old_values TEXT")
+    conn.execute("ALTER TABLE player_changes ADD COLUMN new_values TEXT")
+    for name in ('trg_player_changes_insert', 'trg_player_changes_update', 'trg_player_changes_delete'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in PLAYER_CHANGE_VALUES:
+        conn.execute(statement)
+
+
+MIGRATIONS = [
+    _install_statistics_triggers,
+    _add_player_indexes,
+    _add_player_name_search,
+    _add_roster_order_index,
+    _add_player_change_log,
+    _log_player_change_values,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Apply any pending migrations. Returns the schema version, or None if the tables do not exist yet"""
+    if not has_table(conn, 'players'):
+        return None
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return version
+
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return SCHEMA_VERSION
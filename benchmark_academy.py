@@ -0,0 +1,276 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from academy_federation import FederatedAcademyManager
+from budget_planner import BudgetPlanner
+from football_academy_manager import FootballAcademyManager
+from opa_import import import_exports
+from opa_parser import to_player_row
+from synthetic_academy import age_group_names, iter_synthetic_players, write_database, write_opa_export
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# A benchmark regresses when its median is this many times the baseline's
+REGRESSION_RATIO = 1.25
+# Medians below this many milliseconds are too noisy to compare
+MIN_COMPARABLE_MS = 0.5
+# Copies of the benchmark database in the federation benchmarks
+FEDERATION_SHARDS = 3
+
+
+class BenchmarkContext:
+    """State shared by the benchmarks: sample names, ids and import data"""
+
+    def __init__(self, manager, workdir, players, seed):
+        self.manager = manager
+        self.workdir = workdir
+        self.counter = itertools.count(1)
+        first = manager.execute_query(
+            "SELECT p.player_id, ag.group_id, ag.group_name FROM players p "
+            "JOIN age_groups ag ON p.primary_age_group_id = ag.group_id ORDER BY p.player_id LIMIT 1"
+        )[0]
+        self.player_id = first['player_id']
+        self.age_group_id = first['group_id']
+        self.age_group = first['group_name']
+
+        # Imports add a tenth of the roster again on every run
+        age_group_map = {row['group_name']: row['group_id'] for row in manager.get_all_age_groups()}
+        self.import_rows = [
+            to_player_row(record, age_group_map)
+            for record in iter_synthetic_players(max(1, players // 10), list(age_group_map), seed + 1)
+        ]
+        self.export_path = os.path.join(workdir, 'export.txt')
+        write_opa_export(self.export_path, max(1, players // 10), age_group_names(9), seed + 2)
+        self.new_player_ids = []
+        self.new_group_ids = []
+        self.new_team_ids = []
+        self.federation = None
+
+    def unique(self, prefix):
+        return f"{prefix} {next(self.counter)}"
+
+
+def consume(rows):
+    for _ in rows:
+        pass
+
+
+def add_benchmark_player(ctx):
+    manager = ctx.manager
+    manager.add_player(ctx.unique('Benchmark Player'), 'FT', ctx.age_group, 1, 1, 2012, '99')
+    ctx.new_player_ids.append(manager.cursor.lastrowid)
+
+
+def add_benchmark_group(ctx):
+    manager = ctx.manager
+    manager.add_age_group(ctx.unique('B Benchmark'), 10)
+    ctx.new_group_ids.append(manager.execute_query("SELECT MAX(group_id) AS id FROM age_groups")[0]['id'])
+
+
+def add_benchmark_team(ctx):
+    manager = ctx.manager
+    manager.add_league_team(ctx.unique('Benchmark Team'))
+    ctx.new_team_ids.append(manager.execute_query("SELECT MAX(team_id) AS id FROM league_teams")[0]['id'])
+
+
+def reset_name_index(ctx):
+    ctx.manager.reset_indexes('name_index')
+
+
+def reset_flag_bitmaps(ctx):
+    ctx.manager.reset_indexes('flag_bitmaps')
+
+
+def reset_snapshot(ctx):
+    ctx.manager.snapshot = None
+
+
+def touch_player(ctx):
+    ctx.manager.update_player(ctx.player_id, photos=next(ctx.counter) % 2)
+
+
+def open_federation(ctx):
+    """Copy the benchmark database into FEDERATION_SHARDS federated shards on first use; empty their caches"""
+    if ctx.federation is not None:
+        for manager in ctx.federation.managers.values():
+            manager.cache.clear()
+        return
+    shards = {}
+    for number in range(FEDERATION_SHARDS):
+        path = os.path.join(ctx.workdir, f'shard{number}.db')
+        shard = sqlite3.connect(path)
+        try:
+            ctx.manager.conn.backup(shard)
+        finally:
+            shard.close()
+        shards[f'Academy {number}'] = path
+    ctx.federation = FederatedAcademyManager(shards)
+    if not ctx.federation.connect():
+        raise sqlite3.Error("cannot open the federation shards")
+
+
+# (name, setup, run): setup(ctx) runs untimed before every timed run(ctx).
+# Reads are timed with an empty result cache so they measure the query.
+BENCHMARKS = (
+    ('get_all_players', None, lambda ctx: ctx.manager.get_all_players()),
+    ('get_all_players_page', None, lambda ctx: ctx.manager.get_all_players(page_size=25, after=(ctx.age_group, 'M', 0))),
+    ('iter_all_players', None, lambda ctx: consume(ctx.manager.iter_all_players())),
+    ('get_players_by_age_group', None, lambda ctx: ctx.manager.get_players_by_age_group(ctx.age_group)),
+    ('get_players_by_type', None, lambda ctx: ctx.manager.get_players_by_type('Part Time')),
+    ('search_players_like', None, lambda ctx: ctx.manager.search_players('Mora')),
+    ('search_players_fts', None, lambda ctx: ctx.manager.search_players('Mora', mode='fts')),
+    ('fuzzy_search_players_cold', reset_name_index, lambda ctx: ctx.manager.fuzzy_search_players('Alejandro Mroa')),
+    ('fuzzy_search_players', None, lambda ctx: ctx.manager.fuzzy_search_players('Alejandro Mroa')),
+    ('player_cohort_cold', reset_flag_bitmaps, lambda ctx: ctx.manager.player_cohort(photos=True, veo_member=False)),
+    ('player_cohort', None, lambda ctx: ctx.manager.player_cohort(photos=True, veo_member=False).count()),
+    ('roster_snapshot_load', reset_snapshot, lambda ctx: ctx.manager.roster_snapshot()),
+    ('roster_snapshot_refresh', touch_player, lambda ctx: ctx.manager.roster_snapshot()),
+    ('snapshot_count_by', None, lambda ctx: ctx.manager.snapshot.count_by('primary_age_group_id', 'type_code')),
+    ('get_all_age_groups', None, lambda ctx: ctx.manager.get_all_age_groups()),
+    ('get_academy_statistics', None, lambda ctx: ctx.manager.get_academy_statistics()),
+    ('get_all_player_types', None, lambda ctx: ctx.manager.get_all_player_types()),
+    ('get_all_league_teams', None, lambda ctx: ctx.manager.get_all_league_teams()),
+    ('get_players_with_birthdays_this_month', None, lambda ctx: ctx.manager.get_players_with_birthdays_this_month()),
+    ('get_players_with_idp_meetings', None, lambda ctx: ctx.manager.get_players_with_idp_meetings('sep')),
+    ('get_players_with_secondary_age_group', None, lambda ctx: ctx.manager.get_players_with_secondary_age_group()),
+    ('verify_statistics', None, lambda ctx: ctx.manager.verify_statistics()),
+    ('audit_query_plans', None, lambda ctx: ctx.manager.audit_query_plans()),
+    ('add_player', None, add_benchmark_player),
+    ('update_player', None, lambda ctx: ctx.manager.update_player(ctx.player_id, jersey_number=str(next(ctx.counter)))),
+    ('delete_player', add_benchmark_player, lambda ctx: ctx.manager.delete_player(ctx.new_player_ids.pop())),
+    ('bulk_update_flags', None, lambda ctx: ctx.manager.bulk_update_flags(
+        {'age_group_ids': [ctx.age_group_id]}, chat=next(ctx.counter) % 2)),
+    ('add_age_group', None, add_benchmark_group),
+    ('update_age_group', None, lambda ctx: ctx.manager.update_age_group(ctx.new_group_ids[-1], budget=next(ctx.counter))),
+    ('delete_age_group', add_benchmark_group, lambda ctx: ctx.manager.delete_age_group(ctx.new_group_ids.pop())),
+    ('add_league_team', None, add_benchmark_team),
+    ('update_league_team', None, lambda ctx: ctx.manager.update_league_team(ctx.new_team_ids[-1], ctx.unique('Team'))),
+    ('delete_league_team', add_benchmark_team, lambda ctx: ctx.manager.delete_league_team(ctx.new_team_ids.pop())),
+    ('update_statistics', None, lambda ctx: ctx.manager.update_statistics(ctx.age_group_id)),
+    ('update_all_statistics', None, lambda ctx: ctx.manager.update_all_statistics()),
+    ('export_players_csv', None, lambda ctx: ctx.manager.export_players(os.path.join(ctx.workdir, 'players.csv'))),
+    ('export_players_jsonl', None, lambda ctx: ctx.manager.export_players(os.path.join(ctx.workdir, 'players.jsonl'))),
+    ('export_statistics_csv', None, lambda ctx: ctx.manager.export_statistics(os.path.join(ctx.workdir, 'statistics.csv'))),
+    ('export_birthday_calendar', None, lambda ctx: ctx.manager.export_birthday_calendar(
+        os.path.join(ctx.workdir, 'birthdays.ics'))),
+    ('get_upcoming_birthdays', None, lambda ctx: ctx.manager.get_upcoming_birthdays(days=30)),
+    ('get_upcoming_birthdays_year', None, lambda ctx: ctx.manager.get_upcoming_birthdays(days=366)),
+    ('changes_since', None, lambda ctx: consume(ctx.manager.changes_since(0))),
+    ('rollover_season_dry_run', None, lambda ctx: ctx.manager.rollover_season(dry_run=True)),
+    ('budget_planner_load', reset_snapshot, lambda ctx: BudgetPlanner.load(ctx.manager)),
+    ('federation_academy_statistics', open_federation, lambda ctx: ctx.federation.get_academy_statistics()),
+    ('federation_combined_statistics', open_federation, lambda ctx: ctx.federation.get_combined_statistics()),
+    ('federation_upcoming_birthdays', open_federation, lambda ctx: ctx.federation.get_upcoming_birthdays(days=30)),
+    ('import_players', None, lambda ctx: ctx.manager.import_players(ctx.import_rows)),
+    ('import_exports', None, lambda ctx: import_exports(ctx.manager, [ctx.export_path], workers=1)),
+)
+
+
+def run_benchmarks(db_path, players, seed, repeat, selected=None, report=print):
+    """Time every benchmark against the database at db_path; returns {name: {median_ms, min_ms}}"""
+    manager = FootballAcademyManager(db_path)
+    if not manager.connect():
+        raise sqlite3.Error(f"cannot open {db_path}")
+    results = {}
+    ctx = None
+    try:
+        ctx = BenchmarkContext(manager, os.path.dirname(db_path), players, seed)
+        for name, setup, run in BENCHMARKS:
+            if selected and name not in selected:
+                continue
+            timings = []
+            for _ in range(repeat):
+                if setup:
+                    setup(ctx)
+                manager.cache.clear()
+                start = time.perf_counter()
+                run(ctx)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {
+                'median_ms': round(statistics.median(timings), 3),
+                'min_ms': round(min(timings), 3),
+            }
+            report(f"{name:<40} {results[name]['median_ms']:10.3f} ms")
+    finally:
+        if ctx is not None and ctx.federation is not None:
+            ctx.federation.close()
+        manager.close()
+    return results
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+    """Benchmarks whose median is more than ratio times the baseline's: [(name, baseline_ms, median_ms)]"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        if max(result['median_ms'], previous['median_ms']) < MIN_COMPARABLE_MS:
+            continue
+        if result['median_ms'] > previous['median_ms'] * ratio:
+            regressions.append((name, previous['median_ms'], result['median_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the football academy manager on synthetic data")
+    parser.add_argument('--players', type=int, default=10000, help="synthetic roster size (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (default: %(default)s)")
+    parser.add_argument('--only', action='append', help="run only this benchmark (repeatable)")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline to compare with (default: %(default)s)")
+    parser.add_argument('--save-baseline', action='store_true', help="replace the baseline with these results")
+    parser.add_argument('--ratio', type=float, default=REGRESSION_RATIO,
+                        help="slowdown against the baseline that counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'benchmark.db')
+        start = time.perf_counter()
+        write_database(db_path, args.players, seed=args.seed)
+        print(f"Generated {args.players} players in {time.perf_counter() - start:.1f} s")
+        results = run_benchmarks(db_path, args.players, args.seed, args.repeat, args.only)
+
+    report = {
+        'players': args.players,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    if baseline.get('players') != args.players:
+        print(f"Baseline is for {baseline.get('players')} players; not comparing.")
+        return 0
+    regressions = compare(results, baseline, args.ratio)
+    for name, previous, current in regressions:
+        print(f"REGRESSION {name}: {previous:.3f} ms -> {current:.3f} ms")
+    if not regressions:
+        print(f"No benchmark is more than {args.ratio}x slower than the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+import heapq
+import sqlite3
+from collections import namedtuple
+
+from academy_schema import count_statistics
+
+# Player type code -> academy_statistics column counting it
+TYPE_COLUMNS = {'FT': 'ft_players', 'PT': 'pt_players', 'SC': 'sc_players', 'T': 'trial_players'}
+COUNT_COLUMNS = ('total', 'ft_players', 'pt_players', 'sc_players', 'trial_players')
+# Operations that change counts without naming players; a scenario using
+# them can be evaluated but not committed
+HYPOTHETICAL_OPERATIONS = {'sign', 'release', 'convert_trials'}
+
+# One age group's figures in a plan; net is budget - total
+GroupFigures = namedtuple('GroupFigures', ('age_group', 'budget') + COUNT_COLUMNS)
+
+
+def type_column(type_code):
+    column = TYPE_COLUMNS.get(type_code)
+    if column is None:
+        raise ValueError(f"Unknown player type '{type_code}'; use one of {', '.join(TYPE_COLUMNS)}.")
+    return column
+
+
+class BudgetPlanner:
+    """The academy's budgets and roster counts, loaded once, for what-if scenarios
+
+    planner.scenario() starts a Scenario from the loaded figures. Scenarios
+    are evaluated entirely in memory, so hundreds of them can be built and
+    ranked without a query; only commit() writes to the database. Changes
+    that name a player look them up in the roster snapshot taken by load().
+
+        planner = BudgetPlanner.load(manager)
+        plans = [planner.scenario(f"sign {n}").sign(3, 'FT', n) for n in range(10)]
+        best = rank(plans)[0]
+    """
+
+    def __init__(self, manager, groups, snapshot):
+        self.manager = manager
+        # {age_group_id: GroupFigures} as loaded, shared by every scenario
+        # until it changes a group
+        self.groups = groups
+        self.snapshot = snapshot
+
+    @classmethod
+    def load(cls, manager):
+        """Budgets, a fresh count of the roster and a roster snapshot for player lookups; None on error"""
+        budgets = manager.execute_query("""
+        SELECT s.age_group_id, ag.group_name, s.budget
+        FROM academy_statistics s
+        JOIN age_groups ag ON s.age_group_id = ag.group_id
+        """)
+        snapshot = manager.roster_snapshot()
+        if budgets is None or snapshot is None:
+            return None
+        try:
+            counts = count_statistics(manager.conn)
+        except sqlite3.Error as e:
+            print(f"Error counting the roster: {e}")
+            return None
+        groups = {
+            row['age_group_id']: GroupFigures(
+                row['group_name'], row['budget'] or 0, *counts.get(row['age_group_id'], (0,) * len(COUNT_COLUMNS))
+            )
+            for row in budgets
+        }
+        return cls(manager, groups, snapshot)
+
+    def scenario(self, name=''):
+        """A new Scenario starting from the loaded figures"""
+        return Scenario(self, name, self.groups, ())
+
+    def player(self, player_id):
+        """(primary_age_group_id, type_code) of a player, from the snapshot taken by load()"""
+        player = self.snapshot.player(player_id)
+        if player is None:
+            raise ValueError(f"Player with ID {player_id} not found.")
+        return player['primary_age_group_id'], player['type_code']
+
+    def changed_since_load(self):
+        """True if the academy's counts or budgets in the database differ from the loaded ones"""
+        live_counts = count_statistics(self.manager.conn)
+        budgets = self.manager.execute_query("SELECT age_group_id, budget FROM academy_statistics")
+        if budgets is None:
+            raise sqlite3.Error("reading the budgets failed")
+        live_budgets = {row['age_group_id']: row['budget'] or 0 for row in budgets}
+        if live_budgets.keys() != self.groups.keys():
+            return True
+        return any(
+            live_budgets[group_id] != figures.budget
+            or live_counts.get(group_id, (0,) * len(COUNT_COLUMNS)) != figures[2:]
+            for group_id, figures in self.groups.items()
+        )
+
+
+class Scenario:
+    """A copy-on-write overlay of changes on a BudgetPlanner's figures
+
+    Each change returns the scenario, so they can be chained, and raises
+    ValueError if it is impossible (an unknown group, or fewer than no
+    players of a type). fork() starts a variant that shares everything so
+    far; a group's figures are only copied when a scenario changes them.
+    """
+
+    def __init__(self, planner, name, groups, operations):
+        self.planner = planner
+        self.name = name
+        self.groups = groups
+        # Changes in the order they were made, as (operation, *args)
+        self.operations = operations
+        # groups belongs to the planner or another scenario until the first change
+        self.shared = True
+
+    def __repr__(self):
+        return f"Scenario({self.name!r}, {len(self.operations)} changes)"
+
+    def fork(self, name=''):
+        """A new scenario with this one's changes, which can then diverge from it"""
+        # The child shares groups, so neither may change it in place now
+        self.shared = True
+        return Scenario(self.planner, name, self.groups, self.operations)
+
+    def _change(self, group_id, operation, **deltas):
+        figures = self.groups.get(group_id)
+        if figures is None:
+            raise ValueError(f"Unknown age group {group_id}.")
+        changed = figures._replace(**{column: getattr(figures, column) + delta for column, delta in deltas.items()})
+        if any(getattr(changed, column) < 0 for column in COUNT_COLUMNS):
+            raise ValueError(f"Not enough players in {figures.age_group} for {operation[0]}.")
+        if self.shared:
+            self.groups = dict(self.groups)
+            self.shared = False
+        self.groups[group_id] = changed
+        self.operations += (operation,)
+        return self
+
+    def _named_player(self, player_id):
+        """(age group, type) of a roster player this scenario has not already released or converted"""
+        if any(operation[0] in ('release_player', 'convert_trial') and operation[1] == player_id
+               for operation in self.operations):
+            raise ValueError(f"Player {player_id} is already released or converted in this scenario.")
+        return self.planner.player(player_id)
+
+    # Changes
+    def sign(self, age_group_id, type_code='FT', count=1):
+        """Sign count unnamed players of a type (hypothetical: cannot be committed)"""
+        return self._change(age_group_id, ('sign', age_group_id, type_code, count),
+                            total=count, **{type_column(type_code): count})
+
+    def sign_player(self, player):
+        """Sign a player given as a dict of players columns, as for import_players"""
+        group_id = player.get('primary_age_group_id')
+        type_code = player.get('type_code')
+        return self._change(group_id, ('sign_player', dict(player)), total=1, **{type_column(type_code): 1})
+
+    def release(self, age_group_id, type_code='FT', count=1):
+        """Release count unnamed players of a type (hypothetical: cannot be committed)"""
+        return self._change(age_group_id, ('release', age_group_id, type_code, count),
+                            total=-count, **{type_column(type_code): -count})
+
+    def release_player(self, player_id):
+        """Release a player on the roster"""
+        group_id, type_code = self._named_player(player_id)
+        deltas = {'total': -1}
+        if type_code in TYPE_COLUMNS:
+            deltas[TYPE_COLUMNS[type_code]] = -1
+        return self._change(group_id, ('release_player', player_id), **deltas)
+
+    def convert_trials(self, age_group_id, count=1, type_code='FT'):
+        """Convert count unnamed trial players to another type (hypothetical: cannot be committed)"""
+        return self._change(age_group_id, ('convert_trials', age_group_id, count, type_code),
+                            trial_players=-count, **{type_column(type_code): count})
+
+    def convert_trial(self, player_id, type_code='FT'):
+        """Convert a trial player on the roster to another type"""
+        group_id, current_type = self._named_player(player_id)
+        if current_type != 'T':
+            raise ValueError(f"Player {player_id} is not on trial.")
+        return self._change(group_id, ('convert_trial', player_id, type_code),
+                            trial_players=-1, **{type_column(type_code): 1})
+
+    def set_budget(self, age_group_id, budget):
+        """Set an age group's player budget"""
+        figures = self.groups.get(age_group_id)
+        if figures is None:
+            raise ValueError(f"Unknown age group {age_group_id}.")
+        return self._change(age_group_id, ('set_budget', age_group_id, budget), budget=budget - figures.budget)
+
+    # Evaluation
+    def figures(self, age_group_id):
+        return self.groups[age_group_id]
+
+    def statistics(self):
+        """The scenario's academy statistics, as get_academy_statistics() would show them"""
+        return [
+            {
+                'age_group': figures.age_group,
+                'actual_players': figures.total,
+                'budgeted_players': figures.budget,
+                'difference': figures.budget - figures.total,
+                'full_time': figures.ft_players,
+                'part_time': figures.pt_players,
+                'scholarship': figures.sc_players,
+                'trial': figures.trial_players,
+            }
+            for figures in sorted(self.groups.values(), key=lambda figures: figures.age_group)
+        ]
+
+    def imbalance(self):
+        """Total distance from budget over every age group, in players (0 is on budget everywhere)"""
+        return sum(abs(figures.budget - figures.total) for figures in self.groups.values())
+
+    def over_budget(self):
+        """Players beyond budget, summed over the age groups that are over it"""
+        return sum(max(figures.total - figures.budget, 0) for figures in self.groups.values())
+
+    def under_budget(self):
+        """Unfilled budget places, summed over the age groups that are under it"""
+        return sum(max(figures.budget - figures.total, 0) for figures in self.groups.values())
+
+    # Commit
+    def commit(self):
+        """Apply the scenario's changes to the database in one transaction; True on success
+
+        Only scenarios whose signings, releases and conversions name players
+        can be committed. Nothing is changed if the academy's counts or
+        budgets are no longer those the planner loaded; load a new planner
+        and build the scenario again.
+        """
+        hypothetical = sorted({operation[0] for operation in self.operations} & HYPOTHETICAL_OPERATIONS)
+        if hypothetical:
+            print(f"Cannot commit scenario '{self.name}': {', '.join(hypothetical)} changes do not name players.")
+            return False
+        manager = self.planner.manager
+        try:
+            with manager.transaction():
+                if self.planner.changed_since_load():
+                    raise ValueError("the academy has changed since the plan was loaded.")
+                signings = []
+                for operation, *args in self.operations:
+                    if operation == 'sign_player':
+                        signings.append(args[0])
+                    elif operation == 'release_player':
+                        if not manager.delete_player(args[0]):
+                            raise ValueError(f"could not release player {args[0]}.")
+                    elif operation == 'convert_trial':
+                        if not manager.update_player(args[0], type_code=args[1]):
+                            raise ValueError(f"could not convert player {args[0]}.")
+                    elif operation == 'set_budget':
+                        if not manager.update_age_group(args[0], budget=args[1]):
+                            raise ValueError(f"could not set the budget of age group {args[0]}.")
+                if signings and manager.import_players(signings) is None:
+                    raise ValueError("could not add the signings.")
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Scenario '{self.name}' not committed: {e}")
+            return False
+        return True
+
+
+def rank(scenarios, key=Scenario.imbalance, limit=None):
+    """Scenarios ordered by key, smallest first; with limit, only the best limit of them"""
+    if limit is not None:
+        return heapq.nsmallest(limit, scenarios, key=key)
+    return sorted(scenarios, key=key)
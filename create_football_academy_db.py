@@ -3,9 +3,19 @@ import csv
 import os
 from datetime import datetime
 
-# Create or connect to the database
-conn = sqlite3.connect('football_academy.db')
-cursor = conn.cursor()
+from academy_schema import migrate, recount_statistics
+from opa_parser import iter_player_records, to_player_row
+
+# Connection used by the functions below, opened by open_database()
+conn = None
+cursor = None
+
+def open_database(db_path='football_academy.db'):
+    """Create or connect to the database the other functions write to"""
+    global conn, cursor
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    return conn
 
 # Create tables
 def create_tables():
@@ -113,108 +123,24 @@ def insert_initial_data():
 
 # Parse and insert player data from the text file
 def insert_player_data(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-    
     # Get age group IDs for reference
     cursor.execute('SELECT group_id, group_name FROM age_groups')
     age_group_map = {group_name: group_id for group_id, group_name in cursor.fetchall()}
     
-    # Get league team IDs for reference
-    cursor.execute('SELECT team_id, team_name FROM league_teams')
-    team_map = {team_name: team_id for team_id, team_name in cursor.fetchall()}
-    
-    # Process each line that contains player data
-    for line in lines:
-        # Skip header lines and empty lines
-        if not line.strip() or "PLAYER" in line or "TOT" in line:
-            continue
-            
-        # Parse player data - this is a simplified version and might need adjustments
-        parts = line.strip().split()
-        if len(parts) < 5:  # Skip lines with insufficient data
-            continue
-            
-        # Extract player name (which might contain multiple words)
-        name_parts = []
-        i = 0
-        while i < len(parts) and parts[i] not in ["FT", "SC", "PT", "T"]:
-            name_parts.append(parts[i])
-            i += 1
-        
-        if i == len(parts):  # Skip if we can't find the player type
-            continue
-            
-        full_name = " ".join(name_parts)
-        type_code = parts[i]
-        i += 1
-        
-        # Extract age group
-        if i < len(parts) and "B" in parts[i] or "G" in parts[i]:
-            primary_age_group = parts[i]
-            i += 1
-        else:
-            primary_age_group = None
-        
-        # Extract birth day, month, year
-        birth_day = None
-        birth_month = None
-        birth_year = None
-        
-        if i + 2 < len(parts):
-            try:
-                birth_day = int(parts[i])
-                birth_month = int(parts[i+1])
-                birth_year = int(parts[i+2])
-                i += 3
-            except (ValueError, IndexError):
-                # If conversion fails, just continue with None values
-                pass
-        
-        # Extract jersey number
-        jersey_number = None
-        if i < len(parts):
-            try:
-                jersey_number = parts[i]
-                i += 1
-            except (ValueError, IndexError):
-                pass
-        
-        # Extract secondary age group if present
-        secondary_age_group = None
-        if i < len(parts) and ("B" in parts[i] or "G" in parts[i]):
-            secondary_age_group = parts[i]
-            i += 1
-        
-        # Extract boolean flags
-        veo_member = "YES" in line[line.find(secondary_age_group if secondary_age_group else jersey_number):] if secondary_age_group or jersey_number else False
-        photos = "YES" in line[line.find("YES" if veo_member else "NO"):] if veo_member or "NO" in line else False
-        idp_meeting_sep = "YES" in line[line.find("YES" if photos else "NO"):] if photos or "NO" in line else False
-        idp_meeting_apr = "YES" in line[line.find("YES" if idp_meeting_sep else "NO"):] if idp_meeting_sep or "NO" in line else False
-        chat = "YES" in line[line.find("YES" if idp_meeting_apr else "NO"):] if idp_meeting_apr or "NO" in line else False
-        files = "YES" in line[line.find("YES" if chat else "NO"):] if chat or "NO" in line else False
-        
-        # Get IDs for foreign keys
-        primary_age_group_id = age_group_map.get(primary_age_group) if primary_age_group else None
-        secondary_age_group_id = age_group_map.get(secondary_age_group) if secondary_age_group else None
-        
-        # Determine league team (simplified logic - would need refinement)
-        league_team_id = None
-        
-        # Insert player data
-        cursor.execute('''
-        INSERT INTO players (
-            full_name, type_code, primary_age_group_id, secondary_age_group_id,
-            birth_day, birth_month, birth_year, jersey_number, league_team_id,
-            veo_member, photos, idp_meeting_sep, idp_meeting_apr, chat, files
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            full_name, type_code, primary_age_group_id, secondary_age_group_id,
-            birth_day, birth_month, birth_year, jersey_number, league_team_id,
-            1 if veo_member else 0, 1 if photos else 0, 
-            1 if idp_meeting_sep else 0, 1 if idp_meeting_apr else 0,
-            1 if chat else 0, 1 if files else 0
-        ))
+    # Stream parsed records straight into executemany so the export is never
+    # held in memory, whatever its size
+    rows = (to_player_row(record, age_group_map) for record in iter_player_records(file_path))
+    cursor.executemany('''
+    INSERT INTO players (
+        full_name, type_code, primary_age_group_id, secondary_age_group_id,
+        birth_day, birth_month, birth_year, jersey_number, league_team_id,
+        veo_member, photos, idp_meeting_sep, idp_meeting_apr, chat, files
+    ) VALUES (
+        :full_name, :type_code, :primary_age_group_id, :secondary_age_group_id,
+        :birth_day, :birth_month, :birth_year, :jersey_number, :league_team_id,
+        :veo_member, :photos, :idp_meeting_sep, :idp_meeting_apr, :chat, :files
+    )
+    ''', rows)
     
     conn.commit()
 
@@ -249,10 +175,15 @@ def insert_academy_statistics():
 
 # Main function to create and populate the database
 def main():
+    open_database()
     create_tables()
     insert_initial_data()
     insert_player_data('opa_database_content.txt')
     insert_academy_statistics()
+    # Install the statistics triggers and bring the counts in line with the imported players
+    migrate(conn)
+    recount_statistics(conn)
+    conn.commit()
     print("Database created and populated successfully!")
     
     # Display some sample data to verify
@@ -0,0 +1,175 @@
+from academy_schema import FLAG_COLUMNS
+
+# Positions of the set bits in every byte value, for listing a bitmap's ids
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+class Bitmap:
+    """A set of player ids stored as the bits of an integer
+
+    Combine bitmaps with & (and), | (or), - (and not) and ~ (not), then call
+    count() or ids(). ~ is relative to the players that exist, so
+    ~index.flag('photos') is every player without photos.
+    """
+
+    __slots__ = ('bits', 'universe')
+
+    def __init__(self, bits, universe):
+        self.bits = bits
+        self.universe = universe
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.universe)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.universe)
+
+    def __sub__(self, other):
+        return Bitmap(self.bits & ~other.bits, self.universe)
+
+    def __invert__(self):
+        return Bitmap(self.universe & ~self.bits, self.universe)
+
+    def __len__(self):
+        return self.count()
+
+    def __contains__(self, player_id):
+        return bool(self.bits >> player_id & 1)
+
+    def count(self):
+        """Number of players in the set"""
+        return self.bits.bit_count()
+
+    def ids(self):
+        """Player ids in the set, in ascending order"""
+        data = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        return [
+            offset * 8 + bit
+            for offset, value in enumerate(data) if value
+            for bit in BYTE_BITS[value]
+        ]
+
+
+class FlagBitmapIndex:
+    """One bitmap per status flag and per primary age group, indexed by player_id
+
+    Bit n of a bitmap is set when player n has the flag (or is in the group).
+    Player ids are dense row ids, so plain integers are as small as a
+    compressed bitmap would be here and every combination is a single
+    big-integer operation.
+    """
+
+    def __init__(self):
+        self.players = 0
+        self.flags = {flag: 0 for flag in FLAG_COLUMNS}
+        self.groups = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build an index from (player_id, primary_age_group_id, *FLAG_COLUMNS) rows"""
+        # Set bits in byte arrays and convert once; or-ing one bit at a time
+        # into an integer would copy the whole bitmap for every player
+        buffers = {}
+
+        def set_bit(key, player_id):
+            buffer = buffers.get(key)
+            if buffer is None:
+                buffer = buffers[key] = bytearray()
+            offset = player_id >> 3
+            if offset >= len(buffer):
+                buffer.extend(bytes(offset + 1 - len(buffer)))
+            buffer[offset] |= 1 << (player_id & 7)
+
+        for player_id, group_id, *flags in rows:
+            set_bit(None, player_id)
+            set_bit(('group', group_id), player_id)
+            for flag, value in zip(FLAG_COLUMNS, flags):
+                if value:
+                    set_bit(flag, player_id)
+
+        index = cls()
+        for key, buffer in buffers.items():
+            bits = int.from_bytes(buffer, 'little')
+            if key is None:
+                index.players = bits
+            elif isinstance(key, tuple):
+                index.groups[key[1]] = bits
+            else:
+                index.flags[key] = bits
+        return index
+
+    def __len__(self):
+        return self.players.bit_count()
+
+    def add(self, player_id, group_id, **flags):
+        """Add a player; flags not given are unset"""
+        bit = 1 << player_id
+        self.players |= bit
+        self.groups[group_id] = self.groups.get(group_id, 0) | bit
+        for flag, value in flags.items():
+            if value:
+                self.flags[flag] |= bit
+
+    def update(self, player_id, **fields):
+        """Apply changed primary_age_group_id or flag values for a player"""
+        bit = 1 << player_id
+        if not self.players & bit:
+            return
+        if 'primary_age_group_id' in fields:
+            self._clear_group(bit)
+            group_id = fields['primary_age_group_id']
+            self.groups[group_id] = self.groups.get(group_id, 0) | bit
+        for flag in FLAG_COLUMNS:
+            if flag in fields:
+                if fields[flag]:
+                    self.flags[flag] |= bit
+                else:
+                    self.flags[flag] &= ~bit
+
+    def remove(self, player_id):
+        """Remove a player from every bitmap"""
+        bit = 1 << player_id
+        if not self.players & bit:
+            return
+        self.players &= ~bit
+        self._clear_group(bit)
+        for flag, bits in self.flags.items():
+            if bits & bit:
+                self.flags[flag] = bits & ~bit
+
+    def _clear_group(self, bit):
+        for group_id, bits in self.groups.items():
+            if bits & bit:
+                self.groups[group_id] = bits & ~bit
+                return
+
+    def all(self):
+        """Every player"""
+        return Bitmap(self.players, self.players)
+
+    def flag(self, name):
+        """Players with a status flag set"""
+        return Bitmap(self.flags[name], self.players)
+
+    def group(self, group_id):
+        """Players whose primary age group is group_id"""
+        return Bitmap(self.groups.get(group_id, 0), self.players)
+
+    def cohort(self, age_group_ids=None, **flags):
+        """Players in any of age_group_ids (all groups if None) matching every flag
+
+        Flags are given as name=True (must be set) or name=False (must be
+        unset): cohort(photos=True, veo_member=False) is every player with
+        photos and no VEO membership.
+        """
+        bits = self.players
+        if age_group_ids is not None:
+            groups = 0
+            for group_id in age_group_ids:
+                groups |= self.groups.get(group_id, 0)
+            bits &= groups
+        for name, wanted in flags.items():
+            if name not in self.flags:
+                raise ValueError(f"Unknown status flag: {name}")
+            bits = bits & self.flags[name] if wanted else bits & ~self.flags[name]
+        return Bitmap(bits, self.players)
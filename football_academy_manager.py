@@ -1,67 +1,530 @@
+import functools
 import sqlite3
 import os
+import re
 import sys
-from datetime import datetime
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from itertools import chain, islice
+from operator import itemgetter
+
+from academy_db import ConnectionPool
+from academy_schema import (
+    FLAG_COLUMNS, LOGGED_PLAYER_COLUMNS, STATISTICS_COUNT_COLUMNS, count_statistics, deferred_insert_triggers,
+    has_column, has_table, migrate, recount_statistics, suspended_triggers
+)
+from query_cache import QueryCache
+from query_stats import QueryStats
+
+# Column order used by bulk imports (import_players accepts tuples in this order)
+PLAYER_COLUMNS = (
+    'full_name', 'type_code', 'primary_age_group_id', 'secondary_age_group_id',
+    'birth_day', 'birth_month', 'birth_year', 'jersey_number', 'league_team_id',
+    'veo_member', 'photos', 'idp_meeting_sep', 'idp_meeting_apr', 'chat', 'files'
+)
+
+# Players are read age group by age group (CROSS JOIN keeps age_groups as
+# the outer loop) through idx_players_age_group_name, so rows come back
+# already in order: no sort, and the first row is available immediately.
+ALL_PLAYERS_QUERY = """
+SELECT 
+    p.player_id,
+    p.full_name,
+    pt.type_name AS player_type,
+    ag.group_name AS age_group,
+    p.birth_day || '/' || p.birth_month || '/' || p.birth_year AS birth_date,
+    p.jersey_number
+FROM age_groups ag
+CROSS JOIN players p ON p.primary_age_group_id = ag.group_id
+JOIN player_types pt ON p.type_code = pt.type_code
+"""
+
+# Unordered, for export_query(); ACADEMY_STATISTICS_QUERY adds the ORDER BY
+ACADEMY_STATISTICS_SELECT = """
+SELECT 
+    ag.group_name AS age_group,
+    s.total AS actual_players,
+    s.budget AS budgeted_players,
+    s.net AS difference,
+    s.ft_players AS full_time,
+    s.pt_players AS part_time,
+    s.sc_players AS scholarship,
+    s.trial_players AS trial
+FROM academy_statistics s
+JOIN age_groups ag ON s.age_group_id = ag.group_id
+"""
+ACADEMY_STATISTICS_QUERY = ACADEMY_STATISTICS_SELECT + "ORDER BY ag.group_name\n"
+
+# Every player column, with names instead of IDs, for exports. Exports are
+# written in player_id order: a straight scan of the table, which for the
+# whole roster is about twice as fast as reading it in name order through
+# idx_players_age_group_name.
+EXPORT_PLAYERS_QUERY = """
+SELECT
+    p.player_id,
+    p.full_name,
+    p.type_code,
+    pt.type_name AS player_type,
+    ag.group_name AS age_group,
+    sg.group_name AS secondary_age_group,
+    p.birth_day,
+    p.birth_month,
+    p.birth_year,
+    p.jersey_number,
+    lt.team_name AS league_team,
+    p.veo_member,
+    p.photos,
+    p.idp_meeting_sep,
+    p.idp_meeting_apr,
+    p.chat,
+    p.files
+FROM players p
+JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
+JOIN player_types pt ON p.type_code = pt.type_code
+LEFT JOIN age_groups sg ON p.secondary_age_group_id = sg.group_id
+LEFT JOIN league_teams lt ON p.league_team_id = lt.team_id
+"""
+
+# json_object() and the other JSON functions are built into SQLite from 3.38
+SQLITE_HAS_JSON = sqlite3.sqlite_version_info >= (3, 38, 0)
+
+# Built-in queries that have to read every player by design; any other full
+# scan of players reported by audit_query_plans() is a regression
+EXPECTED_FULL_SCANS = {'get_all_players', 'search_players'}
+# Manager helpers that run queries for other methods; query statistics are
+# attributed to the first caller outside them
+QUERY_HELPERS = {'execute_query', 'cached_query', 'iter_query', 'iter_rows', 'record_query', 'wrapper'}
+# Tables a write to each table also changes through triggers, for result
+# cache invalidation
+TRIGGER_WRITES = {'players': ('academy_statistics', 'players_fts', 'player_changes')}
+# Age group names such as 'B 13 & 14': prefix, first and second number
+AGE_BAND_PATTERN = re.compile(r'^\s*(\w+)\s+(\d+)\s*&\s*(\d+)\s*$')
+# A player p's birth cohort for the rollover: the last two digits of their
+# birth year, or of the year before if they were born before the cutoff's
+# (month, day), given as two parameters
+PLAYER_COHORT = "(p.birth_year - ((p.birth_month, COALESCE(p.birth_day, 1)) < (?, ?))) % 100"
+WRITE_TABLE_PATTERN = re.compile(r'^\s*(?:INSERT|REPLACE|UPDATE|DELETE)\b(?:\s+OR\s+\w+)?(?:\s+INTO|\s+FROM)?\s+(\w+)', re.IGNORECASE)
+TABLE_ALIAS_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|JOIN|ON|ORDER|GROUP|LEFT|INNER)(\w+))?', re.IGNORECASE)
+
+# One entry of the player_changes log. before and after are dicts of column
+# values: the whole row for INSERT (after) and DELETE (before), the changed
+# columns only for UPDATE. Both are None for entries logged before values
+# were recorded.
+PlayerChange = namedtuple('PlayerChange', ('seq', 'player_id', 'operation', 'before', 'after'))
+
+def player_filter(filter):
+    """WHERE conditions and parameters for a bulk_update_flags filter dict"""
+    where, params = [], []
+    for key, value in filter.items():
+        if key in ('player_ids', 'age_group_ids'):
+            values = list(value)
+            if not values:
+                raise ValueError(f"Empty {key} filter.")
+            column = 'player_id' if key == 'player_ids' else 'primary_age_group_id'
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        elif key == 'type_code':
+            where.append("type_code = ?")
+            params.append(value)
+        elif key in FLAG_COLUMNS:
+            where.append(f"{key} = ?")
+            params.append(int(bool(value)))
+        else:
+            raise ValueError(f"Unknown player filter: {key}")
+    return where or ['1'], params
+
+def next_season_groups(age_groups):
+    """(age_group_id, new_age_group_id) pairs moving each age group up a season
+
+    'B 11 & 12' moves to 'B 12 & 13': the same prefix with both years one
+    higher. Groups whose names do not follow the pattern, or whose next
+    group does not exist, are left out.
+    """
+    group_ids = {}
+    bands = {}
+    for group_id, group_name in age_groups:
+        match = AGE_BAND_PATTERN.match(group_name)
+        if match:
+            band = (match.group(1), int(match.group(2)), int(match.group(3)))
+            bands[group_id] = band
+            group_ids.setdefault(band, group_id)
+    return [
+        (group_id, group_ids[(prefix, first + 1, second + 1)])
+        for group_id, (prefix, first, second) in bands.items()
+        if (prefix, first + 1, second + 1) in group_ids
+    ]
+
+def cohort_groups(age_groups, cohort_counts):
+    """(age_group_id, cohort, new_age_group_id) for every age group and birth cohort a player in it can move to
+
+    cohort is a birth year's last two digits, as PLAYER_COHORT works it out.
+    Group names count cohorts plus the seasons since the names were chosen,
+    so the offset between a group's first number and its players' cohorts
+    goes up by one every season. The current offset is read per prefix from
+    cohort_counts, (age_group_id, cohort, players) rows for where players
+    are now: the difference most players have. Next season a player goes to
+    the group of the same prefix whose first number is their cohort plus
+    one more than that, or, if none, the group whose second number is.
+    """
+    bands = {}
+    for group_id, group_name in age_groups:
+        match = AGE_BAND_PATTERN.match(group_name)
+        if match:
+            bands[group_id] = (match.group(1), int(match.group(2)), int(match.group(3)))
+    offsets = {}
+    for group_id, cohort, players in cohort_counts:
+        if group_id in bands:
+            prefix, first, _ = bands[group_id]
+            offsets.setdefault(prefix, Counter())[(first - cohort) % 100] += players
+    starting, ending = {}, {}
+    for group_id, (prefix, first, second) in sorted(bands.items()):
+        starting.setdefault((prefix, first), group_id)
+        ending.setdefault((prefix, second), group_id)
+    # A group starting at a number takes priority over one ending at it
+    targets = {**ending, **starting}
+    placements = []
+    for prefix, counts in offsets.items():
+        # Ties go to the smaller offset, so the same data always rolls over the same way
+        offset = min(counts, key=lambda offset: (-counts[offset], offset)) + 1
+        for group_id, (group_prefix, _, _) in bands.items():
+            if group_prefix == prefix:
+                placements.extend(
+                    (group_id, (number - offset) % 100, new_group_id)
+                    for (target_prefix, number), new_group_id in targets.items()
+                    if target_prefix == prefix
+                )
+    return placements
+
+def values_rows(rows, width):
+    """SQL for rows as the body of a CTE: a VALUES list with width parameters per row, or no rows"""
+    if not rows:
+        return f"SELECT {', '.join(['NULL'] * width)} WHERE 0"
+    row = f"({', '.join('?' * width)})"
+    return f"VALUES {', '.join([row] * len(rows))}"
+
+def query_caller(frame):
+    """Name of the manager method (or menu action) a query is run for, starting from frame"""
+    while frame.f_back and frame.f_code.co_name in QUERY_HELPERS:
+        frame = frame.f_back
+    return frame.f_code.co_name
+
+def transactional(method):
+    """Run a manager method inside manager.transaction(), as all or nothing
+
+    The method runs inside a savepoint. If it fails, by raising or by
+    returning False or None as the mutators do, its writes are rolled back
+    to the savepoint, so a method that fails halfway leaves nothing behind,
+    even inside a larger transaction that goes on to commit.
+
+    A database error the method does not handle itself, including a failed
+    BEGIN or COMMIT (e.g. "database is locked"), is reported and the
+    method returns False, as the mutators do for their own errors.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            with self.transaction() as conn:
+                conn.execute("SAVEPOINT transactional")
+                try:
+                    result = method(self, *args, **kwargs)
+                    if result is False or result is None:
+                        conn.execute("ROLLBACK TO transactional")
+                except BaseException:
+                    conn.execute("ROLLBACK TO transactional")
+                    raise
+                finally:
+                    conn.execute("RELEASE transactional")
+                return result
+        except sqlite3.Error as e:
+            print(f"Transaction error: {e}")
+            return False
+    return wrapper
+
 
 class FootballAcademyManager:
     def __init__(self, db_path='football_academy.db'):
         self.db_path = db_path
-        self.conn = None
-        self.cursor = None
+        self.pool = None
+        self.schema_checked = False
+        self.players_fts = False
+        # Trigram index for typo-tolerant lookups, built on first use
+        self.name_index = None
+        # Status flag bitmaps for cohort queries, built on first use
+        self.flag_bitmaps = None
+        # Guards both indexes. index_generation goes up with every write and
+        # transaction end, so an index built from reads that a write raced
+        # is used once but not installed (see load_index())
+        self.index_lock = threading.Lock()
+        self.index_generation = 0
+        # Explain mode: record EXPLAIN QUERY PLAN for every statement and
+        # only explain (never run) statements that modify data
+        self.explain = False
+        self.query_plans = []
+        # Results of the read-mostly report queries, invalidated by table version
+        self.cache = QueryCache()
+        # Per-query latency histograms and the slow-query log
+        self.query_stats = QueryStats()
+        # Columnar copy of the players table, built on first use and kept
+        # current from the player_changes log
+        self.snapshot = None
+        self.snapshot_lock = threading.Lock()
+        self.local = threading.local()
         
-    def connect(self):
-        """Connect to the database"""
+    @property
+    def conn(self):
+        """The calling thread's connection"""
+        return self.pool.connection() if self.pool else None
+        
+    @property
+    def cursor(self):
+        """The calling thread's cursor"""
+        return self.pool.cursor() if self.pool else None
+        
+    @property
+    def full_text_search(self):
+        """Whether the players_fts full-text index is available"""
+        if not self.schema_checked and self.pool:
+            self.pool.connection()
+        return self.players_fts
+        
+    def connect(self, lazy=False):
+        """Connect to the database
+
+        Each thread that uses the manager gets its own WAL-mode connection,
+        so reports and searches can run alongside an import. With lazy, the
+        first connection (and the schema check) waits until the first query,
+        so one-shot commands that fail early never open the database.
+        """
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row  # This enables column access by name
-            self.cursor = self.conn.cursor()
+            self.pool = ConnectionPool(self.db_path, on_first_connect=self.check_schema)
+            if not lazy:
+                self.pool.connection()
             return True
         except sqlite3.Error as e:
             print(f"Database connection error: {e}")
+            self.close()
             return False
             
+    def check_schema(self, conn):
+        """Bring the schema up to date; run once, on the pool's first connection"""
+        migrate(conn)
+        self.players_fts = has_table(conn, 'players_fts')
+        self.schema_checked = True
+            
     def close(self):
-        """Close the database connection"""
-        if self.conn:
-            self.conn.close()
+        """Close the database connections"""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+            
+    @contextmanager
+    def transaction(self):
+        """Unit of work: commit everything inside the block once, or roll it all back
+
+        Nested blocks (and the mutating methods, which each open one) join
+        the outermost transaction, so a scripted batch of changes costs a
+        single commit:
+
+            with manager.transaction():
+                for player_id in player_ids:
+                    manager.update_player(player_id, photos=1)
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+            
+        # IMMEDIATE takes the write lock up front, so two writers cannot
+        # deadlock upgrading from a read lock
+        conn.execute("BEGIN IMMEDIATE")
+        self.local.written_tables = set()
+        try:
+            yield conn
+            # A COMMIT that fails (e.g. still locked after the busy timeout)
+            # leaves the transaction open, so it is rolled back below too
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            # In-memory indexes may have seen writes that were just undone
+            self.reset_indexes()
+            raise
+        finally:
+            with self.index_lock:
+                # Indexes built from reads taken before the commit are stale
+                self.index_generation += 1
+            # Bump again now the writes are visible (or undone), so results
+            # other threads cached while the transaction was open are dropped
+            self.cache.bump(*self.local.written_tables)
+            self.local.written_tables = None
             
+    def tables_written(self, *tables):
+        """Invalidate cached results read from tables (and tables their triggers write)"""
+        affected = set(tables)
+        for table in tables:
+            affected.update(TRIGGER_WRITES.get(table, ()))
+        self.cache.bump(*affected)
+        written_tables = getattr(self.local, 'written_tables', None)
+        if written_tables is not None:
+            written_tables.update(affected)
+            
+    def check_data_version(self):
+        """Invalidate the result cache if another connection has committed since this thread last looked
+
+        PRAGMA data_version changes when any other connection, in this
+        process or another one (a second manager, the sqlite3 shell), commits
+        to the database. Which tables it wrote is unknown, so every entry is
+        invalidated. This connection's own writes are already recorded by
+        tables_written(). A connection seen for the first time has no
+        earlier version to compare with, so it invalidates too.
+        """
+        conn = self.conn
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = getattr(self.local, 'data_version', None)
+        if seen != (conn, version):
+            self.local.data_version = (conn, version)
+            self.cache.invalidate()
+            
+    def cached_query(self, query, params=(), tables=()):
+        """execute_query for read-mostly SELECTs, served from the result cache when tables are unchanged"""
+        if self.explain or self.conn.in_transaction:
+            # Uncommitted reads must not be shared with other threads
+            return self.execute_query(query, params)
+            
+        self.check_data_version()
+        key = (query, tuple(params))
+        rows = self.cache.get(key, tables)
+        if rows is None:
+            versions = self.cache.snapshot(tables)
+            rows = self.execute_query(query, params)
+            if rows is None:
+                return None
+            self.cache.put(key, tables, rows, versions)
+        return list(rows)
+        
+        
     def execute_query(self, query, params=None):
-        """Execute a query and return results"""
+        """Execute a query and return results
+
+        Statements outside manager.transaction() commit on their own; inside
+        one they are committed together when the block ends. Every call is
+        timed into query_stats.
+        """
+        start = time.perf_counter()
+        rows = 0
+        error = False
         try:
+            if self.explain:
+                plan = self.conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+                self.query_plans.append((query, [row['detail'] for row in plan]))
+                if not query.strip().upper().startswith(("SELECT", "PRAGMA")):
+                    return True
+                    
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
                 
             if query.strip().upper().startswith(("SELECT", "PRAGMA")):
-                return self.cursor.fetchall()
+                results = self.cursor.fetchall()
+                rows = len(results)
+                return results
             else:
-                self.conn.commit()
+                rows = max(self.cursor.rowcount, 0)
+                written = WRITE_TABLE_PATTERN.match(query)
+                if written:
+                    self.tables_written(written.group(1))
                 return True
         except sqlite3.Error as e:
+            error = True
             print(f"Query execution error: {e}")
             print(f"Query: {query}")
             if params:
                 print(f"Parameters: {params}")
             return None
+        finally:
+            self.record_query(query, params, (time.perf_counter() - start) * 1000, rows, error)
+            
+    def record_query(self, query, params, elapsed_ms, rows, error=False, caller=None):
+        """Add a statement to query_stats, logging it with its plan if it was slow"""
+        caller = caller or query_caller(sys._getframe(2))
+        if not self.query_stats.record(query, elapsed_ms, rows, error, caller) or error:
+            return
+        try:
+            plan = [row['detail'] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ())]
+        except sqlite3.Error:
+            plan = []
+        self.query_stats.log_slow(query, params, elapsed_ms, plan, caller)
+            
+    def iter_query(self, query, params=None, chunk_size=500):
+        """Execute a SELECT and yield its rows lazily, chunk_size rows at a time"""
+        # Rows are fetched later, from whatever consumes them, so note the
+        # method that asked for the query now
+        return self.iter_rows(query, params, chunk_size, query_caller(sys._getframe(1)))
+        
+    def iter_rows(self, query, params, chunk_size, caller, strict=False):
+        """Generator behind iter_query; with strict, SQLite errors are raised instead of printed"""
+        try:
+            # Only time spent in SQLite counts, not the consumer's processing
+            start = time.perf_counter()
+            cursor = self.conn.cursor()
+            cursor.execute(query, params or ())
+            elapsed = time.perf_counter() - start
+            count = 0
+            while True:
+                start = time.perf_counter()
+                rows = cursor.fetchmany(chunk_size)
+                elapsed += time.perf_counter() - start
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+            self.record_query(query, params, elapsed * 1000, count, caller=caller)
+        except sqlite3.Error as e:
+            if strict:
+                raise
+            print(f"Query execution error: {e}")
+            print(f"Query: {query}")
+            if params:
+                print(f"Parameters: {params}")
             
     # Player Management
-    def get_all_players(self):
-        """Get all players with their basic information"""
-        query = """
-        SELECT 
-            p.player_id,
-            p.full_name,
-            pt.type_name AS player_type,
-            ag.group_name AS age_group,
-            p.birth_day || '/' || p.birth_month || '/' || p.birth_year AS birth_date,
-            p.jersey_number
-        FROM players p
-        JOIN player_types pt ON p.type_code = pt.type_code
-        JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
-        ORDER BY ag.group_name, p.full_name
+    def get_all_players(self, page_size=None, after=None):
+        """Get all players with their basic information
+
+        With page_size, return one page of players using keyset pagination:
+        after is the (age_group, full_name, player_id) of the last row of the
+        previous page, or None for the first page.
+        """
+        if page_size is None:
+            query = ALL_PLAYERS_QUERY + "ORDER BY ag.group_name, p.full_name, p.player_id"
+            return self.cached_query(query, tables=('players', 'player_types', 'age_groups'))
+            
+        if after is None:
+            query = ALL_PLAYERS_QUERY + "ORDER BY ag.group_name, p.full_name, p.player_id LIMIT ?"
+            return self.execute_query(query, (page_size,))
+            
+        # The rest of the current age group, then the following age groups;
+        # both halves come out of the index in order and are merged, not sorted
+        query = f"""
+        SELECT * FROM (
+            {ALL_PLAYERS_QUERY}
+            WHERE ag.group_name = ? AND (p.full_name, p.player_id) > (?, ?)
+            UNION ALL
+            {ALL_PLAYERS_QUERY}
+            WHERE ag.group_name > ?
+        )
+        ORDER BY age_group, full_name, player_id
+        LIMIT ?
         """
-        return self.execute_query(query)
+        age_group, full_name, player_id = after
+        return self.execute_query(query, (age_group, full_name, player_id, age_group, page_size))
+        
+    def iter_all_players(self, chunk_size=500):
+        """Yield every player lazily, in the same order as get_all_players"""
+        query = ALL_PLAYERS_QUERY + "ORDER BY ag.group_name, p.full_name, p.player_id"
+        return self.iter_query(query, chunk_size=chunk_size)
         
     def get_players_by_age_group(self, age_group):
         """Get players in a specific age group"""
@@ -90,15 +553,43 @@ class FootballAcademyManager:
             p.birth_day || '/' || p.birth_month || '/' || p.birth_year AS birth_date,
             p.jersey_number
         FROM players p
-        JOIN player_types pt ON p.type_code = pt.type_code
         JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
-        WHERE pt.type_name = ?
+        WHERE p.type_code IN (SELECT type_code FROM player_types WHERE type_name = ?)
         ORDER BY ag.group_name, p.full_name
         """
         return self.execute_query(query, (player_type,))
         
-    def search_players(self, search_term):
-        """Search for players by name"""
+    def search_players(self, search_term, mode='like'):
+        """Search for players by name
+
+        mode='like' matches the term anywhere in the name. mode='fts' uses the
+        full-text index: every word of the term must match the start of a
+        word in the name (ignoring case and accents), best matches first. It
+        falls back to 'like' when the database has no full-text index.
+        """
+        if mode == 'fts' and self.full_text_search:
+            # Quote each word so punctuation in names is not read as FTS syntax
+            words = re.findall(r'\w+', search_term)
+            if not words:
+                return []
+            match = " ".join(f'"{word}"*' for word in words)
+            query = """
+            SELECT 
+                p.player_id,
+                p.full_name,
+                pt.type_name AS player_type,
+                ag.group_name AS age_group,
+                p.birth_day || '/' || p.birth_month || '/' || p.birth_year AS birth_date,
+                p.jersey_number
+            FROM players_fts
+            JOIN players p ON p.player_id = players_fts.rowid
+            JOIN player_types pt ON p.type_code = pt.type_code
+            JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
+            WHERE players_fts MATCH ?
+            ORDER BY players_fts.rank, p.full_name
+            """
+            return self.execute_query(query, (match,))
+            
         query = """
         SELECT 
             p.player_id,
@@ -115,6 +606,7 @@ class FootballAcademyManager:
         """
         return self.execute_query(query, (f"%{search_term}%",))
         
+    @transactional
     def add_player(self, full_name, type_code, age_group, birth_day, birth_month, birth_year, jersey_number):
         """Add a new player"""
         # Get age group ID
@@ -135,14 +627,152 @@ class FootballAcademyManager:
         ) VALUES (?, ?, ?, ?, ?, ?, ?)
         """
         params = (full_name, type_code, age_group_id, birth_day, birth_month, birth_year, jersey_number)
-        result = self.execute_query(query, params)
+        # Statistics are updated by the academy_statistics triggers
+        if not self.execute_query(query, params):
+            return False
+        player_id = self.cursor.lastrowid
+        with self.index_lock:
+            self.index_generation += 1
+            if self.name_index is not None:
+                self.name_index.add(player_id, full_name)
+            if self.flag_bitmaps is not None:
+                self.flag_bitmaps.add(player_id, age_group_id)
+        return True
         
-        if result:
-            # Update statistics
-            self.update_statistics(age_group_id)
-            return True
-        return False
+    def reset_indexes(self, *names):
+        """Drop the in-memory indexes (name_index and flag_bitmaps by default), to be rebuilt on next use"""
+        with self.index_lock:
+            self.index_generation += 1
+            for name in names or ('name_index', 'flag_bitmaps'):
+                setattr(self, name, None)
+                
+    def load_index(self, name, build):
+        """The in-memory index in attribute name, built with build() if there is none; None on error
+
+        Reader threads can call this while a writer changes or resets the
+        index. The attribute is read once, under index_lock. An index is
+        built outside the lock and only installed if no write or commit has
+        happened since the build started; otherwise it is returned for this
+        call alone and the next call builds again.
+        """
+        with self.index_lock:
+            index = getattr(self, name)
+            generation = self.index_generation
+        if index is not None:
+            return index
+        index = build()
+        if index is None:
+            return None
+        with self.index_lock:
+            if self.index_generation == generation and getattr(self, name) is None:
+                setattr(self, name, index)
+        return index
         
+    def fuzzy_search_players(self, search_term, k=5):
+        """Typo-tolerant name lookup returning up to k players, closest match first"""
+        def build():
+            rows = self.execute_query("SELECT player_id, full_name FROM players")
+            if rows is None:
+                return None
+            from fuzzy_index import FuzzyNameIndex
+            return FuzzyNameIndex.from_rows(rows)
+            
+        index = self.load_index('name_index', build)
+        if index is None:
+            return None
+        # Writers change the index in place under the same lock
+        with self.index_lock:
+            matches = index.lookup(search_term, k)
+        if not matches:
+            return []
+            
+        player_ids = [player_id for player_id, _ in matches]
+        query = f"""
+        SELECT 
+            p.player_id,
+            p.full_name,
+            pt.type_name AS player_type,
+            ag.group_name AS age_group,
+            p.birth_day || '/' || p.birth_month || '/' || p.birth_year AS birth_date,
+            p.jersey_number
+        FROM players p
+        JOIN player_types pt ON p.type_code = pt.type_code
+        JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
+        WHERE p.player_id IN ({', '.join('?' * len(player_ids))})
+        """
+        rows = {row['player_id']: row for row in self.execute_query(query, player_ids) or []}
+        return [rows[player_id] for player_id in player_ids if player_id in rows]
+        
+    def player_cohort(self, age_group_ids=None, **flags):
+        """Bitmap of players by status flags, e.g. player_cohort(photos=True, veo_member=False)
+
+        age_group_ids limits the cohort to those primary age groups. The
+        result supports count(), ids() and &, |, - and ~ with other cohorts.
+        """
+        def build():
+            rows = self.execute_query(f"SELECT player_id, primary_age_group_id, {', '.join(FLAG_COLUMNS)} FROM players")
+            if rows is None:
+                return None
+            from flag_index import FlagBitmapIndex
+            return FlagBitmapIndex.from_rows(rows)
+            
+        index = self.load_index('flag_bitmaps', build)
+        if index is None:
+            return None
+        try:
+            with self.index_lock:
+                return index.cohort(age_group_ids, **flags)
+        except ValueError as e:
+            print(e)
+            return None
+        
+    def import_players(self, rows, batch_size=5000, progress=None):
+        """Bulk import players in a single transaction.
+
+        rows is any iterable of dicts keyed by PLAYER_COLUMNS (missing keys
+        default to NULL, or 0 for the status flags) or of tuples in
+        PLAYER_COLUMNS order. Rows are streamed into executemany batches of
+        batch_size and progress(batch_number, batch_rows, total_rows) is
+        called after every batch. The per-row statistics and full-text
+        triggers are suspended during the import; both are caught up with one
+        set-based statement at the end. Returns the number of players imported, or None on error.
+        """
+        query = f"""
+        INSERT INTO players ({', '.join(PLAYER_COLUMNS)})
+        VALUES ({', '.join('?' * len(PLAYER_COLUMNS))})
+        """
+        defaults = {column: (0 if column in FLAG_COLUMNS else None) for column in PLAYER_COLUMNS}
+        ordered = itemgetter(*PLAYER_COLUMNS)
+
+        def as_params(row):
+            if isinstance(row, dict):
+                return ordered({**defaults, **row})
+            return row
+
+        params = map(as_params, rows)
+        total = 0
+        batch_number = 0
+        try:
+            with self.transaction():
+                self.tables_written('players')
+                with deferred_insert_triggers(self.conn):
+                    while True:
+                        self.cursor.executemany(query, islice(params, batch_size))
+                        if self.cursor.rowcount <= 0:
+                            break
+                        batch_number += 1
+                        total += self.cursor.rowcount
+                        if progress:
+                            progress(batch_number, self.cursor.rowcount, total)
+        except sqlite3.Error as e:
+            print(f"Bulk import error in batch {batch_number + 1}: {e}")
+            return None
+        finally:
+            # Rebuilt on the next fuzzy lookup or cohort query
+            self.reset_indexes()
+        return total
+        
+    @transactional
     def update_player(self, player_id, **kwargs):
         """Update player information"""
         allowed_fields = {
@@ -164,16 +794,13 @@ class FootballAcademyManager:
         }
         
         # Check if player exists
-        check_query = "SELECT player_id, primary_age_group_id FROM players WHERE player_id = ?"
+        check_query = "SELECT player_id FROM players WHERE player_id = ?"
         player = self.execute_query(check_query, (player_id,))
         
         if not player:
             print(f"Player with ID {player_id} not found.")
             return False
             
-        old_age_group_id = player[0]['primary_age_group_id']
-        new_age_group_id = kwargs.get('primary_age_group_id', old_age_group_id)
-        
         # Build update query
         set_clauses = []
         params = []
@@ -190,44 +817,175 @@ class FootballAcademyManager:
         query = f"UPDATE players SET {', '.join(set_clauses)} WHERE player_id = ?"
         params.append(player_id)
         
-        result = self.execute_query(query, params)
-        
-        if result:
-            # Update statistics if age group changed
-            if old_age_group_id != new_age_group_id:
-                self.update_statistics(old_age_group_id)
-                self.update_statistics(new_age_group_id)
-            return True
-        return False
+        # Statistics are updated by the academy_statistics triggers
+        if not self.execute_query(query, params):
+            return False
+        with self.index_lock:
+            self.index_generation += 1
+            if self.name_index is not None and 'full_name' in kwargs:
+                self.name_index.update(player_id, kwargs['full_name'])
+            if self.flag_bitmaps is not None:
+                self.flag_bitmaps.update(player_id, **kwargs)
+        return True
         
+    @transactional
     def delete_player(self, player_id):
         """Delete a player"""
-        # Check if player exists and get age group
-        check_query = "SELECT player_id, primary_age_group_id FROM players WHERE player_id = ?"
+        # Check if player exists
+        check_query = "SELECT player_id FROM players WHERE player_id = ?"
         player = self.execute_query(check_query, (player_id,))
         
         if not player:
             print(f"Player with ID {player_id} not found.")
             return False
             
-        age_group_id = player[0]['primary_age_group_id']
-        
-        # Delete player
+        # Delete player; statistics are updated by the academy_statistics triggers
         query = "DELETE FROM players WHERE player_id = ?"
-        result = self.execute_query(query, (player_id,))
+        if not self.execute_query(query, (player_id,)):
+            return False
+        with self.index_lock:
+            self.index_generation += 1
+            if self.name_index is not None:
+                self.name_index.remove(player_id)
+            if self.flag_bitmaps is not None:
+                self.flag_bitmaps.remove(player_id)
+        return True
         
-        if result:
-            # Update statistics
-            self.update_statistics(age_group_id)
-            return True
-        return False
+    def bulk_update_flags(self, filter, dry_run=False, **flags):
+        """Set status flags on every player matching filter with one UPDATE
+
+        filter is a dict that may contain player_ids, age_group_ids (primary
+        age groups), type_code and current flag values, all of which must
+        match; an empty dict matches every player. For example
+        bulk_update_flags({'age_group_ids': [3], 'idp_meeting_sep': 0}, idp_meeting_sep=1).
+        Returns the number of players changed (or that would be, with
+        dry_run), or None on error.
+        """
+        unknown = set(flags) - set(FLAG_COLUMNS)
+        if unknown or not flags:
+            print(f"Invalid status flags: {', '.join(sorted(unknown)) or 'none given'}")
+            return None
+        try:
+            where, params = player_filter(filter)
+        except ValueError as e:
+            print(e)
+            return None
+            
+        # Players that already have every requested value are not counted
+        where.append(f"NOT ({' AND '.join(f'{flag} IS ?' for flag in flags)})")
+        params.extend(int(bool(value)) for value in flags.values())
+        where_clause = ' AND '.join(where)
+        
+        if dry_run:
+            rows = self.execute_query(f"SELECT COUNT(*) FROM players WHERE {where_clause}", params)
+            return None if rows is None else rows[0][0]
+            
+        # Flags do not feed academy_statistics, so the statistics triggers
+        # skip these rows and no recount is needed
+        query = f"UPDATE players SET {', '.join(f'{flag} = ?' for flag in flags)} WHERE {where_clause}"
+        try:
+            with self.transaction():
+                if not self.execute_query(query, [int(bool(value)) for value in flags.values()] + params):
+                    raise sqlite3.Error("bulk flag update failed")
+                updated = self.cursor.rowcount
+        except sqlite3.Error:
+            return None
+        if updated:
+            # Rebuilt on the next cohort query
+            self.reset_indexes('flag_bitmaps')
+        return updated
+        
+    # Change Log
+    def last_change_seq(self):
+        """Sequence number of the newest player_changes entry (0 if there are none)"""
+        rows = self.execute_query("SELECT COALESCE(MAX(seq), 0) FROM player_changes")
+        return None if rows is None else rows[0][0]
+        
+    def changes_since(self, seq=0, chunk_size=500):
+        """Yield a PlayerChange for every change logged after seq, oldest first
+
+        Entries are read by seq straight off the primary key, so catching up
+        costs time in proportion to the changes, not the roster. Remember the
+        seq of the last change handled and pass it next time.
+        """
+        import json
+        query = """
+        SELECT seq, player_id, operation, old_values, new_values
+        FROM player_changes
+        WHERE seq > ?
+        ORDER BY seq
+        """
+        for row in self.iter_query(query, (seq,), chunk_size):
+            yield PlayerChange(
+                row['seq'], row['player_id'], row['operation'],
+                json.loads(row['old_values']) if row['old_values'] is not None else None,
+                json.loads(row['new_values']) if row['new_values'] is not None else None,
+            )
+            
+    def replay_changes(self, changes):
+        """Apply PlayerChanges (from another database's changes_since, say) to this database
+
+        All changes are applied in one transaction, and replaying a change
+        twice has no further effect, so a copy can be caught up by replaying
+        everything after the last seq it applied. Returns the number of changes
+        applied, or None (with nothing applied) on error.
+        """
+        count = 0
+        try:
+            with self.transaction():
+                for change in changes:
+                    values = change.before if change.operation == 'DELETE' else change.after
+                    if values is None:
+                        raise ValueError(f"Change {change.seq} was logged without its values.")
+                    if change.operation == 'INSERT':
+                        columns = [column for column in LOGGED_PLAYER_COLUMNS if column in values]
+                        query = f"""
+                        INSERT INTO players (player_id, {', '.join(columns)})
+                        VALUES (?, {', '.join('?' * len(columns))})
+                        ON CONFLICT (player_id) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in columns)}
+                        """
+                        params = [change.player_id] + [values[column] for column in columns]
+                    elif change.operation == 'UPDATE':
+                        columns = [column for column in LOGGED_PLAYER_COLUMNS if column in values]
+                        query = f"UPDATE players SET {', '.join(f'{column} = ?' for column in columns)} WHERE player_id = ?"
+                        params = [values[column] for column in columns] + [change.player_id]
+                    elif change.operation == 'DELETE':
+                        query = "DELETE FROM players WHERE player_id = ?"
+                        params = [change.player_id]
+                    else:
+                        raise ValueError(f"Change {change.seq} has unknown operation {change.operation}.")
+                    if self.execute_query(query, params) is None:
+                        raise sqlite3.Error(f"replaying change {change.seq} failed")
+                    count += 1
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Replay stopped: {e}")
+            return None
+        finally:
+            # Rebuilt on the next fuzzy lookup or cohort query
+            self.reset_indexes()
+        return count
+        
+    @transactional
+    def prune_changes(self, up_to_seq):
+        """Delete the change log entries up to and including up_to_seq
+
+        Consumers that have not yet read that far must reload from the
+        players table instead of catching up. Sequence numbers are never
+        reused.
+        """
+        with self.snapshot_lock:
+            if self.snapshot is not None and self.snapshot.last_change_seq < up_to_seq:
+                # Reloaded in full on the next roster_snapshot()
+                self.snapshot = None
+        return self.execute_query("DELETE FROM player_changes WHERE seq <= ?", (up_to_seq,))
         
     # Age Group Management
     def get_all_age_groups(self):
         """Get all age groups"""
         query = "SELECT group_id, group_name FROM age_groups ORDER BY group_name"
-        return self.execute_query(query)
+        return self.cached_query(query, tables=('age_groups',))
         
+    @transactional
     def add_age_group(self, group_name, budget=0):
         """Add a new age group"""
         # Insert age group
@@ -235,24 +993,19 @@ class FootballAcademyManager:
         result = self.execute_query(query, (group_name,))
         
         if result:
-            # Get the new age group ID
-            id_query = "SELECT group_id FROM age_groups WHERE group_name = ?"
-            id_result = self.execute_query(id_query, (group_name,))
+            age_group_id = self.cursor.lastrowid
             
-            if id_result:
-                age_group_id = id_result[0]['group_id']
-                
-                # Add statistics entry
-                stats_query = """
-                INSERT INTO academy_statistics (
-                    age_group_id, total, budget, net, 
-                    ft_players, pt_players, sc_players, trial_players
-                ) VALUES (?, 0, ?, ?, 0, 0, 0, 0)
-                """
-                self.execute_query(stats_query, (age_group_id, budget, budget))
-                return True
+            # Add statistics entry
+            stats_query = """
+            INSERT INTO academy_statistics (
+                age_group_id, total, budget, net, 
+                ft_players, pt_players, sc_players, trial_players
+            ) VALUES (?, 0, ?, ?, 0, 0, 0, 0)
+            """
+            return bool(self.execute_query(stats_query, (age_group_id, budget, budget)))
         return False
         
+    @transactional
     def update_age_group(self, group_id, group_name=None, budget=None):
         """Update an age group"""
         if group_name:
@@ -270,6 +1023,7 @@ class FootballAcademyManager:
             
         return True
         
+    @transactional
     def delete_age_group(self, group_id):
         """Delete an age group (only if no players are assigned to it)"""
         # Check if players are assigned
@@ -291,27 +1045,199 @@ class FootballAcademyManager:
         query = "DELETE FROM age_groups WHERE group_id = ?"
         return self.execute_query(query, (group_id,))
         
+    def rollover_season(self, cutoff_date=None, dry_run=False):
+        """Move every player up to next season's age group, placed by birth date: 'B 11 & 12' to 'B 12 & 13' and so on
+
+        Players with a birth year and month go to the group for their birth
+        cohort next season (see cohort_groups()); players born before
+        cutoff_date's month and day in their birth year count with the
+        previous year's births. The default cutoff, 1 January, makes the
+        cohorts calendar years. Only the month and day of cutoff_date are
+        used. Players without a birth year and month move up one group, as
+        next_season_groups() shifts it. Secondary age groups move up one
+        group too, and are cleared if they end up the same as the primary.
+
+        The moves are worked out by one set-based query and applied with one
+        UPDATE in a single transaction. The per-row statistics and change
+        log triggers are suspended: academy_statistics is recounted once
+        and the moves are logged with one INSERT. Players with no group to
+        move to keep theirs. Returns the moves (player_id, full_name,
+        from_age_group, to_age_group, from_secondary_age_group,
+        to_secondary_age_group), made or with dry_run only listed, or None
+        on error.
+        """
+        cutoff = (cutoff_date.month, cutoff_date.day) if cutoff_date else (1, 1)
+        age_groups = self.execute_query("SELECT group_id, group_name FROM age_groups")
+        # Players per age group and birth cohort, to read the groups' naming from
+        cohort_counts = self.execute_query(f"""
+        SELECT primary_age_group_id, {PLAYER_COHORT}, COUNT(*)
+        FROM players p
+        WHERE primary_age_group_id IS NOT NULL AND birth_year IS NOT NULL AND birth_month IS NOT NULL
+        GROUP BY 1, 2
+        """, cutoff)
+        if age_groups is None or cohort_counts is None:
+            return None
+        shifts = next_season_groups(age_groups)
+        cohorts = cohort_groups(age_groups, cohort_counts)
+        if not shifts and not cohorts:
+            print("No age group has a next season's group (such as 'B 12 & 13' after 'B 11 & 12'); nothing to roll over.")
+            return []
+            
+        # One row per player in an age group, with the groups they will be
+        # in; placed is 0 for players with no group to move to. Rows that
+        # change nothing are deleted once the unplaced are counted.
+        moves_query = f"""
+        WITH
+            shifts (age_group_id, new_age_group_id) AS ({values_rows(shifts, 2)}),
+            cohorts (age_group_id, cohort, new_age_group_id) AS ({values_rows(cohorts, 3)}),
+            placements AS (
+                SELECT
+                    p.player_id,
+                    p.primary_age_group_id AS age_group_id,
+                    CASE WHEN p.birth_year IS NULL OR p.birth_month IS NULL
+                        THEN s.new_age_group_id ELSE c.new_age_group_id END AS new_age_group_id,
+                    p.secondary_age_group_id,
+                    COALESCE(ss.new_age_group_id, p.secondary_age_group_id) AS new_secondary_age_group_id
+                FROM players p
+                LEFT JOIN shifts s ON s.age_group_id = p.primary_age_group_id
+                LEFT JOIN cohorts c ON c.age_group_id = p.primary_age_group_id AND c.cohort = {PLAYER_COHORT}
+                LEFT JOIN shifts ss ON ss.age_group_id = p.secondary_age_group_id
+                WHERE p.primary_age_group_id IS NOT NULL OR p.secondary_age_group_id IS NOT NULL
+            )
+        INSERT INTO rollover_moves (
+            player_id, age_group_id, new_age_group_id, secondary_age_group_id, new_secondary_age_group_id, placed
+        )
+        SELECT
+            player_id,
+            age_group_id,
+            COALESCE(new_age_group_id, age_group_id),
+            secondary_age_group_id,
+            NULLIF(new_secondary_age_group_id, COALESCE(new_age_group_id, age_group_id)),
+            age_group_id IS NULL OR new_age_group_id IS NOT NULL
+        FROM placements
+        """
+        moves_params = [value for row in shifts + cohorts for value in row] + list(cutoff)
+        diff_query = """
+        SELECT
+            m.player_id,
+            p.full_name,
+            ag.group_name AS from_age_group,
+            ng.group_name AS to_age_group,
+            sg.group_name AS from_secondary_age_group,
+            nsg.group_name AS to_secondary_age_group
+        FROM rollover_moves m
+        JOIN players p ON p.player_id = m.player_id
+        LEFT JOIN age_groups ag ON ag.group_id = m.age_group_id
+        LEFT JOIN age_groups ng ON ng.group_id = m.new_age_group_id
+        LEFT JOIN age_groups sg ON sg.group_id = m.secondary_age_group_id
+        LEFT JOIN age_groups nsg ON nsg.group_id = m.new_secondary_age_group_id
+        ORDER BY ag.group_name, p.full_name
+        """
+        try:
+            with self.transaction():
+                for query in (
+                    "DROP TABLE IF EXISTS temp.rollover_moves",
+                    """
+                    CREATE TEMP TABLE rollover_moves (
+                        player_id INTEGER PRIMARY KEY,
+                        age_group_id INTEGER,
+                        new_age_group_id INTEGER,
+                        secondary_age_group_id INTEGER,
+                        new_secondary_age_group_id INTEGER,
+                        placed INTEGER
+                    )
+                    """,
+                ):
+                    if self.execute_query(query) is None:
+                        raise sqlite3.Error("could not create the moves table")
+                if self.execute_query(moves_query, moves_params) is None:
+                    raise sqlite3.Error("working out the moves failed")
+                unplaced = self.execute_query("SELECT COUNT(*) FROM rollover_moves WHERE NOT placed")
+                unchanged = self.execute_query("""
+                DELETE FROM rollover_moves
+                WHERE new_age_group_id IS age_group_id AND new_secondary_age_group_id IS secondary_age_group_id
+                """)
+                moves = self.execute_query(diff_query)
+                if moves is None or unplaced is None or unchanged is None:
+                    raise sqlite3.Error("listing the moves failed")
+                if unplaced[0][0]:
+                    print(f"{unplaced[0][0]} player(s) have no age group to move to next season "
+                          f"and keep their age group.")
+                    
+                if not dry_run and moves:
+                    suspend = ('trg_players_statistics_update', 'trg_player_changes_update')
+                    with suspended_triggers(self.conn, suspend) as suspended:
+                        moved = self.execute_query("""
+                        UPDATE players
+                        SET (primary_age_group_id, secondary_age_group_id) = (
+                            SELECT m.new_age_group_id, m.new_secondary_age_group_id
+                            FROM rollover_moves m
+                            WHERE m.player_id = players.player_id
+                        )
+                        WHERE player_id IN (SELECT player_id FROM rollover_moves)
+                        """)
+                        if moved is None:
+                            raise sqlite3.Error("moving the players failed")
+                        recount_statistics(self.conn)
+                        if 'trg_player_changes_update' in suspended:
+                            self.log_rollover_moves()
+                self.execute_query("DROP TABLE temp.rollover_moves")
+        except sqlite3.Error as e:
+            print(f"Season rollover error: {e}")
+            return None
+        if not dry_run and moves:
+            # Rebuilt on the next cohort query
+            self.reset_indexes('flag_bitmaps')
+        return moves
+        
+    def log_rollover_moves(self):
+        """Log the moves in rollover_moves to player_changes as the update trigger would have"""
+        if has_column(self.conn, 'player_changes', 'new_values'):
+            query = """
+            INSERT INTO player_changes (player_id, operation, old_values, new_values)
+            SELECT player_id, 'UPDATE', json_group_object(name, old_value), json_group_object(name, new_value)
+            FROM (
+                SELECT player_id, 'primary_age_group_id' AS name, age_group_id AS old_value,
+                    new_age_group_id AS new_value
+                FROM rollover_moves
+                UNION ALL
+                SELECT player_id, 'secondary_age_group_id', secondary_age_group_id, new_secondary_age_group_id
+                FROM rollover_moves
+            )
+            WHERE old_value IS NOT new_value
+            GROUP BY player_id
+            ORDER BY player_id
+            """
+        else:
+            query = """
+            INSERT INTO player_changes (player_id, operation)
+            SELECT player_id, 'UPDATE' FROM rollover_moves ORDER BY player_id
+            """
+        if self.execute_query(query) is None:
+            raise sqlite3.Error("logging the moves failed")
+        
     # Statistics Management
     def get_academy_statistics(self):
         """Get academy statistics"""
-        query = """
-        SELECT 
-            ag.group_name AS age_group,
-            s.total AS actual_players,
-            s.budget AS budgeted_players,
-            s.net AS difference,
-            s.ft_players AS full_time,
-            s.pt_players AS part_time,
-            s.sc_players AS scholarship,
-            s.trial_players AS trial
-        FROM academy_statistics s
-        JOIN age_groups ag ON s.age_group_id = ag.group_id
-        ORDER BY ag.group_name
-        """
-        return self.execute_query(query)
+        return self.cached_query(ACADEMY_STATISTICS_QUERY, tables=('academy_statistics', 'age_groups'))
         
+    def roster_snapshot(self):
+        """In-memory RosterSnapshot of the players table, refreshed from the change log"""
+        with self.snapshot_lock:
+            try:
+                if self.snapshot is None:
+                    from roster_snapshot import RosterSnapshot
+                    self.snapshot = RosterSnapshot.load(self.conn)
+                else:
+                    self.snapshot.refresh(self.conn)
+            except sqlite3.Error as e:
+                print(f"Error building roster snapshot: {e}")
+                return None
+            return self.snapshot
+        
+    @transactional
     def update_statistics(self, age_group_id):
-        """Update statistics for an age group"""
+        """Recount statistics for an age group (the triggers normally keep them current)"""
         query = """
         UPDATE academy_statistics
         SET 
@@ -327,34 +1253,61 @@ class FootballAcademyManager:
         return self.execute_query(query, params)
         
     def update_all_statistics(self):
-        """Update statistics for all age groups"""
-        age_groups = self.get_all_age_groups()
-        for age_group in age_groups:
-            self.update_statistics(age_group['group_id'])
-        return True
+        """Recount statistics for all age groups in a single pass over players"""
+        try:
+            with self.transaction():
+                self.tables_written('academy_statistics')
+                recount_statistics(self.conn)
+            return True
+        except sqlite3.Error as e:
+            print(f"Statistics recount error: {e}")
+            return False
+            
+    def verify_statistics(self):
+        """Compare the incrementally maintained statistics with a full recount
+
+        Returns a list of (age_group_id, column, stored, expected) mismatches;
+        an empty list means academy_statistics is consistent.
+        """
+        counts = count_statistics(self.conn)
+        stats = self.execute_query(f"""
+        SELECT age_group_id, budget, net, {', '.join(STATISTICS_COUNT_COLUMNS)}
+        FROM academy_statistics
+        """)
+        mismatches = []
+        for row in stats or []:
+            expected = dict(zip(STATISTICS_COUNT_COLUMNS, counts.get(row['age_group_id'], (0, 0, 0, 0, 0))))
+            expected['net'] = row['budget'] - expected['total']
+            for column, value in expected.items():
+                if row[column] != value:
+                    mismatches.append((row['age_group_id'], column, row[column], value))
+        return mismatches
         
     # Player Type Management
     def get_all_player_types(self):
         """Get all player types"""
         query = "SELECT type_code, type_name FROM player_types ORDER BY type_name"
-        return self.execute_query(query)
+        return self.cached_query(query, tables=('player_types',))
         
     # League Team Management
     def get_all_league_teams(self):
         """Get all league teams"""
         query = "SELECT team_id, team_name FROM league_teams ORDER BY team_name"
-        return self.execute_query(query)
+        return self.cached_query(query, tables=('league_teams',))
         
+    @transactional
     def add_league_team(self, team_name):
         """Add a new league team"""
         query = "INSERT INTO league_teams (team_name) VALUES (?)"
         return self.execute_query(query, (team_name,))
         
+    @transactional
     def update_league_team(self, team_id, team_name):
         """Update a league team"""
         query = "UPDATE league_teams SET team_name = ? WHERE team_id = ?"
         return self.execute_query(query, (team_name, team_id))
         
+    @transactional
     def delete_league_team(self, team_id):
         """Delete a league team (only if no players are assigned to it)"""
         # Check if players are assigned
@@ -372,7 +1325,7 @@ class FootballAcademyManager:
     # Reports
     def get_players_with_birthdays_this_month(self):
         """Get players with birthdays in the current month"""
-        current_month = datetime.now().month
+        current_month = time.localtime().tm_mon
         query = """
         SELECT 
             p.full_name,
@@ -386,6 +1339,51 @@ class FootballAcademyManager:
         """
         return self.execute_query(query, (current_month,))
         
+    def get_upcoming_birthdays(self, days=14, start=None):
+        """Players whose birthday falls in the days days from start (default today), soonest first
+
+        A window that runs past 31 December continues from 1 January. Each
+        part of the window is a range of idx_players_birthday, read in
+        (month, day) order, so the cost is that of the matching players
+        only. Rows include the next_birthday date and the age the player is
+        turning.
+        """
+        import datetime
+        start = start or datetime.date.today()
+        days = max(1, min(days, 366))
+        end = start + datetime.timedelta(days=days - 1)
+        first, last = (start.month, start.day), (end.month, end.day)
+        if end.year > start.year and last >= first:
+            # A whole year: stop the day before start comes round again
+            day_before = start - datetime.timedelta(days=1)
+            last = (day_before.month, day_before.day)
+            
+        # (year, month/day range) per part of the window; a second part
+        # only when the window runs past 31 December
+        if last >= first:
+            parts = [(start.year, first, last)]
+        else:
+            parts = [(start.year, first, (12, 31)), (start.year + 1, (1, 1), last)]
+            
+        selects = []
+        params = []
+        for year, (first_month, first_day), (last_month, last_day) in parts:
+            selects.append("""
+            SELECT
+                p.player_id,
+                p.full_name,
+                ag.group_name AS age_group,
+                printf('%04d-%02d-%02d', ?, p.birth_month, p.birth_day) AS next_birthday,
+                ? - p.birth_year AS turning,
+                p.jersey_number
+            FROM players p
+            JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
+            WHERE (p.birth_month, p.birth_day) BETWEEN (?, ?) AND (?, ?)
+            """)
+            params.extend((year, year, first_month, first_day, last_month, last_day))
+        query = f"SELECT * FROM ({' UNION ALL '.join(selects)}) ORDER BY next_birthday, full_name"
+        return self.execute_query(query, params)
+        
     def get_players_with_idp_meetings(self, month='sep'):
         """Get players with IDP meetings"""
         field = 'idp_meeting_sep' if month.lower() == 'sep' else 'idp_meeting_apr'
@@ -399,7 +1397,59 @@ class FootballAcademyManager:
         WHERE p.{field} = 1
         ORDER BY ag.group_name, p.full_name
         """
-        return self.execute_query(query)
+        return self.cached_query(query, tables=('players', 'age_groups'))
+        
+    # Query Plan Audit
+    def audit_query_plans(self):
+        """Run every built-in query in explain mode and report its query plan
+
+        Returns a list of (method_name, query, plan_details, full_scan) tuples,
+        where full_scan is True if the plan scans the whole players table.
+        Statements that modify data are explained but not executed.
+        """
+        age_groups = self.get_all_age_groups() or []
+        player_types = self.get_all_player_types() or []
+        age_group = age_groups[0] if age_groups else {'group_id': 0, 'group_name': ''}
+        player_type = player_types[0]['type_name'] if player_types else ''
+
+        calls = [
+            ('get_all_players', self.get_all_players, ()),
+            ('get_players_by_age_group', self.get_players_by_age_group, (age_group['group_name'],)),
+            ('get_players_by_type', self.get_players_by_type, (player_type,)),
+            ('search_players', self.search_players, ('a',)),
+            ('search_players', self.search_players, ('a', 'fts')),
+            ('get_all_age_groups', self.get_all_age_groups, ()),
+            ('get_academy_statistics', self.get_academy_statistics, ()),
+            ('update_statistics', self.update_statistics, (age_group['group_id'],)),
+            ('get_all_player_types', self.get_all_player_types, ()),
+            ('get_all_league_teams', self.get_all_league_teams, ()),
+            # ID 0 never exists, so the assignment checks pass and the
+            # DELETE statements are explained as well
+            ('delete_age_group', self.delete_age_group, (0,)),
+            ('delete_league_team', self.delete_league_team, (0,)),
+            ('get_players_with_birthdays_this_month', self.get_players_with_birthdays_this_month, ()),
+            ('get_upcoming_birthdays', self.get_upcoming_birthdays, (14,)),
+            ('get_players_with_idp_meetings', self.get_players_with_idp_meetings, ('sep',)),
+            ('get_players_with_idp_meetings', self.get_players_with_idp_meetings, ('apr',)),
+            ('get_players_with_secondary_age_group', self.get_players_with_secondary_age_group, ()),
+        ]
+
+        partial_indexes = [
+            row['name'] for row in self.execute_query("PRAGMA index_list(players)") or [] if row['partial']
+        ]
+
+        report = []
+        self.explain = True
+        try:
+            for name, method, args in calls:
+                self.query_plans = []
+                method(*args)
+                for query, details in self.query_plans:
+                    report.append((name, query, details, scans_players(query, details, partial_indexes)))
+        finally:
+            self.explain = False
+            self.query_plans = []
+        return report
         
     def get_players_with_secondary_age_group(self):
         """Get players with secondary age group assignments"""
@@ -414,10 +1464,110 @@ class FootballAcademyManager:
         JOIN age_groups ag2 ON p.secondary_age_group_id = ag2.group_id
         ORDER BY ag1.group_name, p.full_name
         """
-        return self.execute_query(query)
+        return self.cached_query(query, tables=('players', 'age_groups'))
+        
+    # Exports
+    def export_query(self, query, params, path, fmt=None, compression=None, header=True, order_by=None,
+                     calendar_name=None):
+        """Stream a SELECT's rows to a file (see academy_export.export_rows); returns the row count
+
+        Rows go from SQLite to the file chunk by chunk, never all in memory.
+        Returns None, leaving no file behind, if the export fails. Give the
+        row order as order_by, in terms of the query's result columns, not
+        as an ORDER BY in query: JSON Lines exports wrap the query, and a
+        subquery's order is not guaranteed to survive that.
+        """
+        from academy_export import export_rows, json_object_query, resolve_format
+        caller = query_caller(sys._getframe(1))
+        try:
+            fmt, compression = resolve_format(path, fmt, compression)
+            json_text = fmt == 'jsonl' and SQLITE_HAS_JSON
+            if json_text:
+                # LIMIT 0 returns the column names without running the query
+                columns = self.conn.execute(f"SELECT * FROM ({query}) LIMIT 0", params).description
+                query = json_object_query(query, [column[0] for column in columns], order_by)
+            elif order_by:
+                query += f"\nORDER BY {order_by}"
+            rows = self.iter_rows(query, params, 1000, caller, strict=True)
+            return export_rows(rows, path, fmt, compression, header, json_text, calendar_name)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"Export failed: {e}")
+            return None
+            
+    def export_players(self, path, fmt=None, compression=None, age_group=None, header=True):
+        """Export every player, or one age group's, with all columns to path"""
+        if age_group is None:
+            return self.export_query(EXPORT_PLAYERS_QUERY, (), path, fmt, compression, header, order_by='player_id')
+        query = EXPORT_PLAYERS_QUERY + "WHERE ag.group_name = ?"
+        return self.export_query(query, (age_group,), path, fmt, compression, header, order_by='player_id')
+        
+    def export_statistics(self, path, fmt=None, compression=None, header=True):
+        """Export the academy statistics to path"""
+        return self.export_query(ACADEMY_STATISTICS_SELECT, (), path, fmt, compression, header, order_by='age_group')
+        
+    def export_birthday_calendar(self, path, age_group=None, fmt=None, compression=None):
+        """Export players' birthdays, or one age group's, as yearly all-day events (an .ics calendar)
+
+        Events start in the player's birth year, or this year if it is unknown.
+        The calendar is named after the age group, or "All age groups".
+        """
+        query = """
+        SELECT
+            'player-' || p.player_id || '-birthday@football-academy' AS uid,
+            p.full_name || ' birthday (' || ag.group_name || ')' AS summary,
+            printf('%04d-%02d-%02d', COALESCE(p.birth_year, strftime('%Y', 'now')), p.birth_month, p.birth_day) AS dtstart,
+            'FREQ=YEARLY' AS rrule
+        FROM players p
+        JOIN age_groups ag ON p.primary_age_group_id = ag.group_id
+        WHERE p.birth_month IS NOT NULL AND p.birth_day IS NOT NULL
+        """
+        # By birthday through the year: dtstart's month and day
+        order_by = "substr(dtstart, 6)"
+        if age_group is None:
+            return self.export_query(query, (), path, fmt, compression, order_by=order_by,
+                                     calendar_name="All age groups")
+        query += "AND ag.group_name = ?"
+        return self.export_query(query, (age_group,), path, fmt, compression, order_by=order_by,
+                                 calendar_name=age_group)
+        
+    def export_birthday_calendars(self, directory):
+        """Write one birthday calendar per age group into directory; returns {age_group: events}"""
+        age_groups = self.get_all_age_groups()
+        if age_groups is None:
+            return None
+        counts = {}
+        for row in age_groups:
+            file_name = '_'.join(re.findall(r'\w+', row['group_name'])) + '.ics'
+            counts[row['group_name']] = self.export_birthday_calendar(
+                os.path.join(directory, file_name), row['group_name']
+            )
+        return counts
+
+
+def scans_players(query, plan_details, partial_indexes=()):
+    """True if a query plan contains a full scan of the players table
+
+    Scans of a partial index only read the indexed subset, so they are not
+    counted as full scans.
+    """
+    player_aliases = {'players'}
+    for table, alias in TABLE_ALIAS_PATTERN.findall(query):
+        if table.lower() == 'players' and alias:
+            player_aliases.add(alias)
+            
+    for detail in plan_details:
+        words = detail.split()
+        # "SCAN p", "SCAN TABLE players AS p" (older SQLite) or "SCAN p USING INDEX ..."
+        if words and words[0] == 'SCAN':
+            names = {word for word in words[1:] if word not in ('TABLE', 'AS')}
+            if names & player_aliases and not names & set(partial_indexes):
+                return True
+    return False
 
 
 # Command-line interface for the Football Academy Manager
+PAGE_SIZE = 25
+
 def display_menu():
     print("\n===== Football Academy Database Manager =====")
     print("1. View all players")
@@ -433,6 +1583,8 @@ def display_menu():
     print("11. View players with secondary age group assignments")
     print("12. Manage age groups")
     print("13. Manage league teams")
+    print("14. Bulk update status flags")
+    print("15. Export players or statistics to a file")
     print("0. Exit")
     print("===========================================")
     
@@ -442,6 +1594,7 @@ def display_age_group_menu():
     print("2. Add a new age group")
     print("3. Update an age group")
     print("4. Delete an age group")
+    print("5. Roll over to the next season")
     print("0. Back to main menu")
     print("==============================")
     
@@ -454,13 +1607,20 @@ def display_league_team_menu():
     print("0. Back to main menu")
     print("================================")
     
-def display_results(results, headers=None):
-    if not results:
+def display_results(results, headers=None, page_size=None):
+    """Print rows from a list or any iterable of rows
+
+    Rows are printed as they arrive. With page_size, pause after every
+    page_size rows until the user asks for more.
+    """
+    rows = iter(results or ())
+    first = next(rows, None)
+    if first is None:
         print("No results found.")
         return
         
-    if not headers and isinstance(results[0], sqlite3.Row):
-        headers = results[0].keys()
+    if not headers and isinstance(first, sqlite3.Row):
+        headers = first.keys()
         
     if headers:
         # Print headers
@@ -469,12 +1629,16 @@ def display_results(results, headers=None):
         print("-" * len(header_str))
         
     # Print rows
-    for row in results:
+    for count, row in enumerate(chain((first,), rows), start=1):
         if isinstance(row, sqlite3.Row):
             print(" | ".join(str(row[h]) for h in headers))
         else:
             print(" | ".join(str(r) for r in row))
             
+        if page_size and count % page_size == 0:
+            if input("-- Press Enter for more, or q to stop: ").strip().lower() == 'q':
+                break
+                
 def get_input(prompt, required=True):
     while True:
         value = input(prompt).strip()
@@ -532,7 +1696,46 @@ def select_from_list(items, id_field, name_field, prompt):
         except ValueError:
             print("Please enter a valid number.")
             
-def main():
+def find_players(manager, search_term):
+    """Ranked full-text search, falling back to a substring match and then to close spellings"""
+    results = manager.search_players(search_term, mode='fts')
+    if not results:
+        results = manager.search_players(search_term)
+    if not results:
+        results = manager.fuzzy_search_players(search_term)
+        if results:
+            print(f"No exact matches for '{search_term}'. Showing the closest names instead.")
+    return results
+    
+def explain_main(db_path='football_academy.db'):
+    """Print the query plan of every built-in query; returns 1 if there are unexpected full scans"""
+    manager = FootballAcademyManager(db_path)
+    
+    if not manager.connect():
+        return 1
+        
+    regressions = []
+    for name, query, details, full_scan in manager.audit_query_plans():
+        print(f"\n=== {name} ===")
+        print(" ".join(query.split()))
+        for detail in details:
+            print(f"  {detail}")
+        if full_scan:
+            if name in EXPECTED_FULL_SCANS:
+                print("  (full scan of players, expected)")
+            else:
+                print("  WARNING: full scan of players")
+                regressions.append(name)
+                
+    manager.close()
+    
+    if regressions:
+        print(f"\nUnexpected full scans in: {', '.join(sorted(set(regressions)))}")
+        return 1
+    print("\nNo unexpected full scans.")
+    return 0
+    
+def main(query_stats_path=None):
     manager = FootballAcademyManager()
     
     if not manager.connect():
@@ -548,13 +1751,12 @@ def main():
             break
             
         elif choice == '1':  # View all players
-            results = manager.get_all_players()
             print("\n=== All Players ===")
-            display_results(results)
+            display_results(manager.iter_all_players(), page_size=PAGE_SIZE)
             
         elif choice == '2':  # Search for players
             search_term = get_input("Enter player name to search: ")
-            results = manager.search_players(search_term)
+            results = find_players(manager, search_term)
             print(f"\n=== Search Results for '{search_term}' ===")
             display_results(results)
             
@@ -607,7 +1809,7 @@ def main():
                 
         elif choice == '6':  # Update player information
             search_term = get_input("Enter player name to update: ")
-            players = manager.search_players(search_term)
+            players = find_players(manager, search_term)
             
             if not players:
                 print(f"No players found matching '{search_term}'.")
@@ -669,7 +1871,7 @@ def main():
                 
         elif choice == '7':  # Delete a player
             search_term = get_input("Enter player name to delete: ")
-            players = manager.search_players(search_term)
+            players = find_players(manager, search_term)
             
             if not players:
                 print(f"No players found matching '{search_term}'.")
@@ -692,7 +1894,7 @@ def main():
             
         elif choice == '9':  # View players with birthdays this month
             results = manager.get_players_with_birthdays_this_month()
-            current_month = datetime.now().strftime("%B")
+            current_month = time.strftime("%B")
             print(f"\n=== Players with Birthdays in {current_month} ===")
             display_results(results)
             
@@ -758,6 +1960,27 @@ def main():
                         else:
                             print("Age group deletion cancelled or failed.")
                             
+                elif age_choice == '5':  # Roll over to the next season
+                    import datetime
+                    month = get_int_input("Month birth cohorts start in (blank for January): ",
+                                          required=False, min_val=1, max_val=12)
+                    cutoff = datetime.date(datetime.date.today().year, month, 1) if month else None
+                    moves = manager.rollover_season(cutoff, dry_run=True)
+                    if not moves:
+                        print("No players need moving." if moves is not None else "Season rollover failed.")
+                        continue
+                    print("\n=== Moves to next season's age groups ===")
+                    display_results(moves)
+                    
+                    if get_bool_input(f"{len(moves)} player(s) will move age group. Continue?"):
+                        moved = manager.rollover_season(cutoff)
+                        if moved is None:
+                            print("Season rollover failed.")
+                        else:
+                            print(f"{len(moved)} player(s) moved.")
+                    else:
+                        print("Season rollover cancelled.")
+                            
         elif choice == '13':  # Manage league teams
             while True:
                 display_league_team_menu()
@@ -802,8 +2025,68 @@ def main():
                         else:
                             print("League team deletion cancelled or failed.")
                             
+        elif choice == '14':  # Bulk update status flags
+            flags = [{'flag': flag} for flag in FLAG_COLUMNS]
+            flag = select_from_list(flags, 'flag', 'flag', "Select status flag to set:")
+            if not flag:
+                continue
+            value = get_bool_input(f"Set {flag} to yes?")
+            
+            age_groups = manager.get_all_age_groups()
+            player_filter = {}
+            if get_bool_input("Limit to one age group?"):
+                age_group_id = select_from_list(age_groups, 'group_id', 'group_name', "Select age group:")
+                if not age_group_id:
+                    continue
+                player_filter['age_group_ids'] = [age_group_id]
+                
+            count = manager.bulk_update_flags(player_filter, dry_run=True, **{flag: value})
+            if count is None:
+                continue
+            if count == 0:
+                print("No players need updating.")
+                continue
+                
+            if get_bool_input(f"{count} player(s) will be updated. Continue?"):
+                updated = manager.bulk_update_flags(player_filter, **{flag: value})
+                if updated is None:
+                    print("Bulk update failed.")
+                else:
+                    print(f"{updated} player(s) updated.")
+            else:
+                print("Bulk update cancelled.")
+                
+        elif choice == '15':  # Export players or statistics
+            exports = [{'export': 'players'}, {'export': 'statistics'}]
+            export = select_from_list(exports, 'export', 'export', "Select what to export:")
+            if not export:
+                continue
+            path = get_input("Enter file name (.csv, .tsv, .jsonl or .parquet, optionally .gz or .zst): ")
+            
+            if export == 'players':
+                age_group = None
+                if get_bool_input("Limit to one age group?"):
+                    age_groups = manager.get_all_age_groups()
+                    age_group = select_from_list(age_groups, 'group_name', 'group_name', "Select age group:")
+                    if not age_group:
+                        continue
+                count = manager.export_players(path, age_group=age_group)
+            else:
+                count = manager.export_statistics(path)
+                
+            if count is not None:
+                print(f"Exported {count} row(s) to {path}.")
+                
     manager.close()
+    if query_stats_path:
+        # Query timings for this session, added to those already in the file
+        manager.query_stats.save(query_stats_path)
     print("Thank you for using the Football Academy Database Manager!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if '--explain' in sys.argv[1:]:
+        sys.exit(explain_main())
+    if '--query-stats' in sys.argv[1:-1]:
+        main(query_stats_path=sys.argv[sys.argv.index('--query-stats') + 1])
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,135 @@
+import re
+import unicodedata
+from array import array
+from collections import Counter
+
+# Trigrams that appear in more than this share of names ('san', ' ma', ...)
+# say little about a match, so they are skipped when gathering candidates as
+# long as rarer trigrams are available
+COMMON_TRIGRAM_SHARE = 0.1
+# Compact once stale postings outnumber live names this many times over
+# (names average around 25 trigrams, so this is roughly a third of the postings)
+STALE_POSTINGS_PER_NAME = 8
+
+
+def normalize_name(name):
+    """Lower-case a name and strip accents and punctuation ('Jiménez-Hadad' -> 'jimenez hadad')"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', stripped.casefold()))
+
+
+def trigrams(name):
+    """The set of trigrams of a normalized name, padded so word starts and ends count"""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(first, second):
+    """Dice coefficient of two trigram sets, from 0 (nothing shared) to 1 (the same)"""
+    return 2 * len(first & second) / (len(first) + len(second))
+
+
+def token_score(query_tokens, name):
+    """How well each query word matches its closest word of name, averaged over the query words"""
+    name_tokens = [trigrams(token) for token in name.split()]
+    return sum(max(dice(query, token) for token in name_tokens) for query in query_tokens) / len(query_tokens)
+
+
+class FuzzyNameIndex:
+    """In-memory trigram index for typo-tolerant player name lookup
+
+    Postings are compact integer arrays. Removing or renaming a player leaves
+    its old postings in place; they are skipped at lookup time (the current
+    name is always re-checked) and dropped by compact().
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.postings = {}
+        self.stale_postings = 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build an index from (player_id, full_name) rows"""
+        index = cls()
+        for player_id, full_name in rows:
+            index.add(player_id, full_name)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, player_id, full_name):
+        """Add a player, or re-index one whose name changed"""
+        if player_id in self.names:
+            self.remove(player_id)
+        name = normalize_name(full_name)
+        self.names[player_id] = name
+        for trigram in trigrams(name):
+            postings = self.postings.get(trigram)
+            if postings is None:
+                postings = self.postings[trigram] = array('l')
+            postings.append(player_id)
+
+    update = add
+
+    def remove(self, player_id):
+        """Remove a player from the index"""
+        name = self.names.pop(player_id, None)
+        if name is not None:
+            self.stale_postings += len(trigrams(name))
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.stale_postings > STALE_POSTINGS_PER_NAME * max(len(self.names), 100):
+            self.compact()
+
+    def compact(self):
+        """Rebuild the postings without entries left behind by removals and renames"""
+        names = self.names
+        self.names = {}
+        self.postings = {}
+        self.stale_postings = 0
+        for player_id, name in names.items():
+            self.add(player_id, name)
+
+    def lookup(self, term, k=5, min_score=0.3):
+        """Return up to k (player_id, score) pairs, best first
+
+        The score runs from 0 (nothing in common) to 1. It is the Dice
+        coefficient of the two names' trigram sets, or, if higher, that of
+        each word of term with its closest word of the name, averaged over
+        term's words: a full name only shares a few trigrams with one of its
+        words, so 'pabol' scores 0.5 against 'Pablo Mora Doronsoro' where
+        the whole-name score is 0.21. Ties go to the closer whole name.
+        """
+        normalized = normalize_name(term)
+        query = trigrams(normalized)
+        if not normalized or not self.names:
+            return []
+        query_tokens = [trigrams(token) for token in normalized.split()]
+
+        # Count shared trigrams per candidate. Very common trigrams are
+        # skipped while at least half of the query's trigrams are rare enough
+        # to find the candidates on their own.
+        common_limit = max(1, int(len(self.names) * COMMON_TRIGRAM_SHARE))
+        present = [self.postings[trigram] for trigram in query if trigram in self.postings]
+        informative = [postings for postings in present if len(postings) <= common_limit]
+        hits = Counter()
+        for postings in (informative if 2 * len(informative) >= len(present) else present):
+            hits.update(postings)
+
+        # Re-score the best candidates exactly against their current names
+        names = self.names
+        scored = []
+        for player_id, _ in hits.most_common(k * 4):
+            name = names.get(player_id)
+            if name is None:
+                continue
+            whole = dice(query, trigrams(name))
+            score = max(whole, token_score(query_tokens, name))
+            if score >= min_score:
+                scored.append((score, whole, player_id))
+        scored.sort(reverse=True)
+        return [(player_id, score) for score, _, player_id in scored[:k]]
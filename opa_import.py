@@ -0,0 +1,126 @@
+import argparse
+import glob
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from football_academy_manager import FootballAcademyManager
+from opa_parser import export_chunks, parse_chunk, to_player_row
+
+
+def find_export_files(sources):
+    """Expand directories and glob patterns into a sorted list of export files"""
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths.update(glob.glob(os.path.join(source, '*.txt')))
+        else:
+            paths.update(glob.glob(source, recursive=True))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def import_exports(manager, paths, workers=None, batch_size=5000):
+    """Parse export files in parallel and import them through a single writer
+
+    Files are split into chunks of lines (opa_parser.CHUNK_BYTES) parsed in a
+    process pool, with at most two chunks per worker in flight, so memory
+    stays bounded whatever the size of the files. The calling process is the
+    only one that writes to SQLite, and it imports the chunks in file and
+    line order, so the same files always get the same player IDs. Returns a
+    dict mapping each path to its player count, or to the exception raised
+    while reading it; None if the import failed and nothing was imported.
+    """
+    age_group_map = {row['group_name']: row['group_id'] for row in manager.get_all_age_groups()}
+    results = {}
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+
+    def chunks():
+        for path in paths:
+            try:
+                ranges = export_chunks(path)
+            except OSError as e:
+                results[path] = e
+                continue
+            results[path] = 0
+            for start, end in ranges:
+                yield path, start, end
+
+    def parsed_rows(executor):
+        pending = deque()
+        chunk_iter = chunks()
+        while True:
+            for path, start, end in chunk_iter:
+                pending.append((path, start, executor.submit(parse_chunk, path, start, end)))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                return
+            path, start, future = pending.popleft()
+            if isinstance(results[path], Exception):
+                continue
+            try:
+                records = future.result()
+            except Exception as e:
+                if start:
+                    # Earlier chunks of the file are already imported: give up on the whole import
+                    raise
+                results[path] = e
+                continue
+            results[path] += len(records)
+            for record in records:
+                yield to_player_row(record, age_group_map)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            imported = manager.import_players(parsed_rows(executor), batch_size=batch_size)
+    except Exception as e:
+        print(f"Import stopped: {e}")
+        return None
+
+    if imported is None:
+        return None
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import OPA export files into the football academy database")
+    parser.add_argument('sources', nargs='+', help="export files, directories or glob patterns")
+    parser.add_argument('--db', default='football_academy.db', help="database file (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="rows per insert batch (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    paths = find_export_files(args.sources)
+    if not paths:
+        print("No export files found.")
+        return 1
+
+    manager = FootballAcademyManager(args.db)
+    if not manager.connect():
+        return 1
+
+    try:
+        results = import_exports(manager, paths, workers=args.workers, batch_size=args.batch_size)
+    finally:
+        manager.close()
+
+    if results is None:
+        print("Import failed; no players were imported.")
+        return 1
+
+    failed = 0
+    for path in paths:
+        result = results.get(path)
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{path}: ERROR {result}")
+        else:
+            print(f"{path}: {result} players")
+    total = sum(result for result in results.values() if not isinstance(result, Exception))
+    print(f"Imported {total} players from {len(paths) - failed} of {len(paths)} files.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
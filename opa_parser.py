@@ -0,0 +1,145 @@
+import os
+import re
+from collections import namedtuple
+
+# Start column of each field in the OPA text export (as produced by the PDF
+# to text conversion). Values are matched to the column whose start is the
+# closest one at or before the value, allowing for a couple of characters of
+# drift because the export does not always line numbers up exactly.
+OPA_COLUMNS = (
+    (0, 'full_name'),
+    (42, 'type_code'),
+    (49, 'age_group'),
+    (67, 'birth_month'),
+    (75, 'birth_day'),
+    (81, 'birth_year'),
+    (88, 'jersey_number'),
+    (95, 'secondary_age_group'),
+    (113, 'veo_member'),
+    (126, 'chat'),
+    (133, 'photos'),
+    (145, 'files'),
+    (154, 'idp_meeting_sep'),
+    (174, 'idp_meeting_apr'),
+)
+COLUMN_DRIFT = 2
+# Bytes of an export parsed by one worker task, and so the most a worker
+# holds (and sends back) at once whatever the size of the file
+CHUNK_BYTES = 4 * 1024 * 1024
+
+PLAYER_TYPE_CODES = frozenset(('FT', 'SC', 'PT', 'T'))
+INT_FIELDS = ('birth_day', 'birth_month', 'birth_year')
+FLAG_FIELDS = ('veo_member', 'photos', 'idp_meeting_sep', 'idp_meeting_apr', 'chat', 'files')
+
+PlayerRecord = namedtuple('PlayerRecord', (
+    'full_name', 'type_code', 'age_group', 'secondary_age_group',
+    'birth_day', 'birth_month', 'birth_year', 'jersey_number',
+    'veo_member', 'photos', 'idp_meeting_sep', 'idp_meeting_apr', 'chat', 'files'
+))
+
+# A field is a run of words separated by single spaces; two or more spaces
+# separate fields (names and age groups such as 'B 11 & 12' contain spaces)
+FIELD_PATTERN = re.compile(r'\S+(?: \S+)*')
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_line(line, columns=OPA_COLUMNS):
+    """Parse one line of the OPA export into a PlayerRecord (None if it is not a player line)"""
+    fields = {}
+    column_index = 0
+    # Fields come out of finditer left to right, so the column pointer only
+    # ever moves forward and each line is scanned once
+    for match in FIELD_PATTERN.finditer(line.rstrip('\r\n')):
+        start = match.start() + COLUMN_DRIFT
+        while column_index + 1 < len(columns) and columns[column_index + 1][0] <= start:
+            column_index += 1
+        fields.setdefault(columns[column_index][1], match.group())
+
+    full_name = fields.get('full_name')
+    type_code = fields.get('type_code')
+    if not full_name or type_code not in PLAYER_TYPE_CODES:
+        return None
+
+    secondary_age_group = fields.get('secondary_age_group')
+    if secondary_age_group == 'NO':
+        secondary_age_group = None
+
+    return PlayerRecord(
+        full_name=full_name,
+        type_code=type_code,
+        age_group=fields.get('age_group'),
+        secondary_age_group=secondary_age_group,
+        birth_day=_to_int(fields.get('birth_day')),
+        birth_month=_to_int(fields.get('birth_month')),
+        birth_year=_to_int(fields.get('birth_year')),
+        jersey_number=fields.get('jersey_number'),
+        **{flag: 1 if fields.get(flag) == 'YES' else 0 for flag in FLAG_FIELDS}
+    )
+
+
+def iter_player_records(source, columns=OPA_COLUMNS):
+    """Lazily yield PlayerRecords from a file path or an iterable of lines"""
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as file:
+            yield from iter_player_records(file, columns)
+        return
+
+    for line in source:
+        record = parse_line(line, columns)
+        if record:
+            yield record
+
+
+def parse_export(path, columns=OPA_COLUMNS):
+    """Parse a whole export file into a list of PlayerRecords (pure, safe to run in a worker process)"""
+    return list(iter_player_records(path, columns))
+
+
+def export_chunks(path, chunk_bytes=None):
+    """(start, end) byte ranges of about chunk_bytes (default CHUNK_BYTES) covering the file, each ending at a line break"""
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as file:
+        for offset in range(chunk_bytes, size, chunk_bytes):
+            if offset <= boundaries[-1]:
+                continue
+            file.seek(offset)
+            file.readline()
+            boundaries.append(file.tell())
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def parse_chunk(path, start, end, columns=OPA_COLUMNS):
+    """Parse the lines in bytes start to end of an export into a list of PlayerRecords (safe in a worker process)"""
+    records = []
+    with open(path, 'rb') as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            record = parse_line(line.decode('utf-8'), columns)
+            if record:
+                records.append(record)
+    return records
+
+
+def to_player_row(record, age_group_map):
+    """Convert a PlayerRecord into a players row dict, resolving age group names to IDs"""
+    row = record._asdict()
+    row['primary_age_group_id'] = age_group_map.get(row.pop('age_group'))
+    row['secondary_age_group_id'] = age_group_map.get(row.pop('secondary_age_group'))
+    # League team assignments are not part of the export yet
+    row['league_team_id'] = None
+    return row
@@ -0,0 +1,93 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(rows):
+    """Rough memory footprint of a result set in bytes"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class QueryCache:
+    """LRU cache of query results with a byte budget
+
+    Every entry remembers the version of each table it was read from.
+    bump() increments a table's version whenever it is written, so an entry
+    is served only while none of its tables have changed since it was
+    cached; stale entries are dropped when they are next looked up.
+    invalidate() makes every entry stale at once, for writes whose tables
+    are not known (another process's, say).
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.versions = {}
+        # Bumped by invalidate(); part of every entry's versions
+        self.generation = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _snapshot(self, tables):
+        return (self.generation, *(self.versions.get(table, 0) for table in tables))
+
+    def get(self, key, tables):
+        """Cached rows for key, or None if missing or stale"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                versions, rows, size = entry
+                if versions == self._snapshot(tables):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return rows
+                del self.entries[key]
+                self.size -= size
+            self.misses += 1
+            return None
+
+    def put(self, key, tables, rows, versions=None):
+        """Cache rows for key; versions is the table snapshot taken before the query ran"""
+        size = estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if versions is not None and versions != self._snapshot(tables):
+                # A table changed while the query was running
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self.entries[key] = (self._snapshot(tables), rows, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def snapshot(self, tables):
+        """Current versions of tables, to pass to put() after running a query"""
+        with self.lock:
+            return self._snapshot(tables)
+
+    def bump(self, *tables):
+        """Record a write to tables, invalidating every entry read from them"""
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+    def invalidate(self):
+        """Record a write to unknown tables, invalidating every entry"""
+        with self.lock:
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
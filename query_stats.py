@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+
+# json is imported where it is used: every command loads this module, but
+# few write a dump or a slow-query log
+
+# Upper bounds (ms) of the latency histogram buckets; slower calls land in a
+# final overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# Queries slower than this are logged with their plan (None disables the log)
+SLOW_QUERY_MS = 250
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """Normalise a query so calls that differ only in literals, IN-list length or layout match
+
+    "SELECT * FROM players WHERE player_id IN (?, ?, ?) AND photos = 1"
+    becomes "SELECT * FROM players WHERE player_id IN (...) AND photos = ?".
+    """
+    text = STRING_LITERAL.sub('?', query)
+    text = NUMBER_LITERAL.sub('?', text)
+    text = ' '.join(text.split())
+    return PLACEHOLDER_LIST.sub('(...)', text)
+
+
+class QueryStat:
+    """Counters and latency histogram for one query fingerprint"""
+
+    __slots__ = ('calls', 'errors', 'rows', 'total_ms', 'max_ms', 'buckets', 'callers')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.callers = Counter()
+
+    def percentile_ms(self, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of calls"""
+        wanted = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return bound
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'buckets': self.buckets,
+            'callers': dict(self.callers),
+        }
+
+    def merge(self, data):
+        self.calls += data['calls']
+        self.errors += data['errors']
+        self.rows += data['rows']
+        self.total_ms += data['total_ms']
+        self.max_ms = max(self.max_ms, data['max_ms'])
+        if len(data['buckets']) == len(self.buckets):
+            self.buckets = [a + b for a, b in zip(self.buckets, data['buckets'])]
+        self.callers.update(data['callers'])
+
+
+class QueryStats:
+    """Per-fingerprint call counts, row counts and latency histograms, plus a slow-query log
+
+    Slow queries are kept (with their query plan) in a bounded in-memory log
+    and, if slow_log_path is set, appended to that file as JSON Lines.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_log_path=None, max_slow_queries=100):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self.entries = {}
+        self.slow_queries = deque(maxlen=max_slow_queries)
+        self.lock = threading.Lock()
+
+    def record(self, query, elapsed_ms, rows=0, error=False, caller=None):
+        """Count one execution; returns True if it was slow enough to log"""
+        key = fingerprint(query)
+        bucket = len(LATENCY_BUCKETS_MS)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                bucket = index
+                break
+        with self.lock:
+            stat = self.entries.get(key)
+            if stat is None:
+                stat = self.entries[key] = QueryStat()
+            stat.calls += 1
+            stat.errors += error
+            stat.rows += rows
+            stat.total_ms += elapsed_ms
+            stat.max_ms = max(stat.max_ms, elapsed_ms)
+            stat.buckets[bucket] += 1
+            if caller:
+                stat.callers[caller] += 1
+        return self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms
+
+    def log_slow(self, query, params, elapsed_ms, plan, caller=None):
+        """Add a slow query and its EXPLAIN QUERY PLAN details to the slow-query log"""
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'elapsed_ms': round(elapsed_ms, 3),
+            'caller': caller,
+            'query': ' '.join(query.split()),
+            'params': [repr(param) for param in params or ()],
+            'plan': plan,
+        }
+        with self.lock:
+            self.slow_queries.append(entry)
+            if self.slow_log_path:
+                import json
+                with open(self.slow_log_path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def summary(self, sort='total_ms'):
+        """One dict per fingerprint, heaviest first, with mean and p50/p95/p99 latencies"""
+        with self.lock:
+            rows = []
+            for key, stat in self.entries.items():
+                rows.append({
+                    'query': key,
+                    'calls': stat.calls,
+                    'errors': stat.errors,
+                    'rows': stat.rows,
+                    'total_ms': round(stat.total_ms, 3),
+                    'mean_ms': round(stat.total_ms / stat.calls, 3),
+                    'p50_ms': stat.percentile_ms(0.5),
+                    'p95_ms': stat.percentile_ms(0.95),
+                    'p99_ms': stat.percentile_ms(0.99),
+                    'max_ms': round(stat.max_ms, 3),
+                    'callers': ' '.join(f"{name}:{count}" for name, count in stat.callers.most_common()),
+                })
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'buckets_ms': list(LATENCY_BUCKETS_MS),
+                'queries': {key: stat.to_dict() for key, stat in self.entries.items()},
+                'slow_queries': list(self.slow_queries),
+            }
+
+    def merge(self, data):
+        """Add the counts from a to_dict() dump"""
+        with self.lock:
+            for key, values in data.get('queries', {}).items():
+                stat = self.entries.get(key)
+                if stat is None:
+                    stat = self.entries[key] = QueryStat()
+                stat.merge(values)
+            self.slow_queries.extend(data.get('slow_queries', ()))
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+            self.slow_queries.clear()
+
+    def save(self, path, accumulate=True):
+        """Write the statistics to a JSON file, adding to what it already holds if accumulate"""
+        import json
+        combined = QueryStats()
+        if accumulate and os.path.exists(path):
+            combined.merge(load_dump(path))
+        combined.merge(self.to_dict())
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(combined.to_dict(), file, indent=1, ensure_ascii=False)
+
+
+def load_dump(path):
+    """Read a file written by QueryStats.save()"""
+    import json
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
@@ -0,0 +1,230 @@
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import compress
+
+from academy_schema import FLAG_COLUMNS
+
+try:
+    import numpy
+except ImportError:  # optional: aggregations fall back to pure Python
+    numpy = None
+
+TYPE_CODES = ('FT', 'PT', 'SC', 'T')
+
+# Column name -> array typecode. Missing values are stored as -1 (0 for the
+# flags, matching their column default).
+SNAPSHOT_COLUMNS = {
+    'player_id': 'q',
+    'primary_age_group_id': 'h',
+    'secondary_age_group_id': 'h',
+    'type_code': 'b',  # index into TYPE_CODES
+    'birth_day': 'b',
+    'birth_month': 'b',
+    'birth_year': 'h',
+    **{flag: 'b' for flag in FLAG_COLUMNS},
+}
+
+SNAPSHOT_QUERY = f"""
+SELECT player_id, full_name, {', '.join(column for column in SNAPSHOT_COLUMNS if column != 'player_id')}
+FROM players
+"""
+
+
+class RosterSnapshot:
+    """Column-oriented, in-memory copy of the players table for analytics
+
+    Each column is a compact array (one to eight bytes per player) kept in
+    player_id order, and names are interned strings, which takes a fraction
+    of the memory of a list of sqlite3.Row objects. refresh() re-reads only
+    the players that appear in the player_changes log since the last load
+    or refresh.
+    """
+
+    def __init__(self):
+        self.columns = {column: array(typecode) for column, typecode in SNAPSHOT_COLUMNS.items()}
+        self.names = []
+        self.last_change_seq = 0
+
+    @classmethod
+    def load(cls, conn):
+        """Build a snapshot of every player"""
+        snapshot = cls()
+        # Read before the players: changes committed meanwhile are applied
+        # again by the next refresh, which is harmless
+        if _has_change_log(conn):
+            snapshot.last_change_seq = _last_change_seq(conn)
+        cursor = conn.execute(SNAPSHOT_QUERY + "ORDER BY player_id")
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for row in rows:
+                snapshot._append(row)
+        return snapshot
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _encode(column, value):
+        if column == 'type_code':
+            return TYPE_CODES.index(value) if value in TYPE_CODES else -1
+        if value is None:
+            return 0 if column in FLAG_COLUMNS else -1
+        return int(value)
+
+    def _position(self, player_id):
+        player_ids = self.columns['player_id']
+        position = bisect_left(player_ids, player_id)
+        if position < len(player_ids) and player_ids[position] == player_id:
+            return position
+        return None
+
+    def _append(self, row):
+        self.names.append(sys.intern(row[1]))
+        values = (row[0],) + tuple(row[2:])
+        for (column, values_array), value in zip(self.columns.items(), values):
+            values_array.append(self._encode(column, value))
+
+    def _insert(self, row):
+        position = bisect_left(self.columns['player_id'], row[0])
+        self.names.insert(position, sys.intern(row[1]))
+        values = (row[0],) + tuple(row[2:])
+        for (column, values_array), value in zip(self.columns.items(), values):
+            values_array.insert(position, self._encode(column, value))
+
+    def _set(self, position, row):
+        self.names[position] = sys.intern(row[1])
+        values = (row[0],) + tuple(row[2:])
+        for (column, values_array), value in zip(self.columns.items(), values):
+            values_array[position] = self._encode(column, value)
+
+    def _remove(self, position):
+        del self.names[position]
+        for values_array in self.columns.values():
+            del values_array[position]
+
+    def refresh(self, conn):
+        """Apply the players changed since the last load or refresh; returns how many"""
+        # The upper bound is read first, so a change committed between the
+        # two reads is left for the next refresh rather than skipped
+        last_seq = _last_change_seq(conn)
+        changed = [
+            player_id for (player_id,) in conn.execute(
+                "SELECT DISTINCT player_id FROM player_changes WHERE seq > ? AND seq <= ?",
+                (self.last_change_seq, last_seq)
+            ).fetchall()
+        ]
+        for start in range(0, len(changed), 500):
+            chunk = changed[start:start + 500]
+            rows = conn.execute(
+                SNAPSHOT_QUERY + f"WHERE player_id IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            current = {row[0]: row for row in rows}
+            for player_id in chunk:
+                row = current.get(player_id)
+                position = self._position(player_id)
+                if row is None:
+                    if position is not None:
+                        self._remove(position)
+                elif position is None:
+                    self._insert(row)
+                else:
+                    self._set(position, row)
+        self.last_change_seq = last_seq
+        return len(changed)
+
+    def memory_bytes(self):
+        """Approximate memory used by the snapshot's columns and name list"""
+        size = sum(sys.getsizeof(values_array) for values_array in self.columns.values())
+        size += sys.getsizeof(self.names)
+        return size + sum(sys.getsizeof(name) for name in set(self.names))
+
+    def _decode(self, column, value):
+        if column == 'type_code':
+            return TYPE_CODES[value] if value >= 0 else None
+        if value == -1 and column not in FLAG_COLUMNS:
+            return None
+        return value
+
+    def player(self, player_id):
+        """One player's snapshot columns and full_name as a dict, or None if they are not in the snapshot"""
+        position = self._position(player_id)
+        if position is None:
+            return None
+        player = {column: self._decode(column, values[position]) for column, values in self.columns.items()}
+        player['full_name'] = self.names[position]
+        return player
+
+    def count_by(self, *columns, **where):
+        """Count players grouped by columns, optionally filtered by equality on others
+
+        count_by('primary_age_group_id', 'type_code', photos=1) returns
+        {(age_group_id, type_code): count} for players who have photos.
+        """
+        if not self.names:
+            return {}
+        for column in columns + tuple(where):
+            if column not in SNAPSHOT_COLUMNS:
+                raise ValueError(f"Unknown snapshot column: {column}")
+        encoded_where = {column: self._encode(column, value) for column, value in where.items()}
+
+        if numpy is not None:
+            counts = self._count_by_numpy(columns, encoded_where)
+        else:
+            counts = self._count_by_python(columns, encoded_where)
+        return {
+            tuple(self._decode(column, value) for column, value in zip(columns, key)): count
+            for key, count in counts.items()
+        }
+
+    def _count_by_python(self, columns, where):
+        mask = None
+        for column, value in where.items():
+            matches = [item == value for item in self.columns[column]]
+            mask = matches if mask is None else [a and b for a, b in zip(mask, matches)]
+        keys = zip(*(self.columns[column] for column in columns)) if columns else iter(((),) * len(self.names))
+        if mask is not None:
+            keys = compress(keys, mask)
+        return Counter(keys)
+
+    def _count_by_numpy(self, columns, where):
+        mask = numpy.ones(len(self.names), dtype=bool)
+        for column, value in where.items():
+            mask &= numpy.frombuffer(self.columns[column], dtype=self.columns[column].typecode) == value
+        if not columns:
+            return {(): int(mask.sum())}
+
+        # Combine the grouping columns into a single integer key per player
+        # (mixed radix over each column's distinct values) and bincount it
+        key = numpy.zeros(int(mask.sum()), dtype=numpy.int64)
+        uniques = []
+        for column in columns:
+            values = numpy.frombuffer(self.columns[column], dtype=self.columns[column].typecode)[mask]
+            unique, inverse = numpy.unique(values, return_inverse=True)
+            key = key * len(unique) + inverse
+            uniques.append(unique)
+        counts = numpy.bincount(key)
+
+        result = {}
+        sizes = [len(unique) for unique in uniques]
+        for combined in numpy.nonzero(counts)[0]:
+            parts = []
+            remainder = int(combined)
+            for unique, size in zip(reversed(uniques), reversed(sizes)):
+                remainder, index = divmod(remainder, size)
+                parts.append(int(unique[index]))
+            result[tuple(reversed(parts))] = int(counts[combined])
+        return result
+
+
+def _has_change_log(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_changes'"
+    ).fetchone() is not None
+
+
+def _last_change_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM player_changes").fetchone()[0]
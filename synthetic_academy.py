@@ -0,0 +1,196 @@
+import argparse
+import os
+import random
+import re
+import sys
+
+import create_football_academy_db as create_db
+from academy_schema import migrate, recount_statistics
+from opa_parser import OPA_COLUMNS, PlayerRecord, to_player_row
+
+# Season the generated birth years are relative to: players in 'B 11 & 12'
+# are born in 2011 or 2012
+SEASON_YEAR = 2023
+
+FIRST_NAMES = (
+    'Alejandro', 'Andrés', 'Antonio', 'Axel', 'Bruno', 'Carlos', 'Daniel', 'Diego', 'Eduardo', 'Emiliano',
+    'Fernando', 'Gabriel', 'Hugo', 'Iker', 'Javier', 'Jorge', 'José', 'Juan', 'Leonardo', 'Luis',
+    'Manuel', 'Mateo', 'Miguel', 'Nicolás', 'Pablo', 'Patricio', 'Rafael', 'Ricardo', 'Rodrigo', 'Santiago',
+    'Sebastián', 'Tomás', 'Valentina', 'Sofía', 'Regina', 'Ximena', 'Camila', 'Mariana', 'Lucía', 'Renata',
+)
+SURNAMES = (
+    'Abad', 'Aguilar', 'Álvarez', 'Beristain', 'Castillo', 'Cruz', 'Delgado', 'Domínguez', 'Dorronsoro', 'Estrada',
+    'Fernández', 'Flores', 'Gasque', 'García', 'Gómez', 'González', 'Guerrero', 'Gutiérrez', 'Hernández', 'Herrera',
+    'Jiménez', 'Limón', 'López', 'Martínez', 'Medina', 'Mendoza', 'Mora', 'Morales', 'Navarro', 'Nogueira',
+    'Ortega', 'Ortiz', 'Peniche', 'Pérez', 'Ramírez', 'Ramos', 'Reyes', 'Rivera', 'Rodríguez', 'Romero',
+    'Ruiz', 'Salcedo', 'Sánchez', 'Silva', 'Torres', 'Vargas', 'Vázquez', 'Zapata',
+)
+# Player type mix of the real academy export
+TYPE_WEIGHTS = (('FT', 70), ('SC', 20), ('PT', 7), ('T', 3))
+# Share of players with each status flag set
+FLAG_RATES = {
+    'veo_member': 0.6, 'photos': 0.7, 'idp_meeting_sep': 0.5,
+    'idp_meeting_apr': 0.3, 'chat': 0.6, 'files': 0.4,
+}
+SECONDARY_AGE_GROUP_RATE = 0.05
+LEAGUE_TEAM_RATE = 0.3
+# Longest name that still leaves two spaces before the type column
+MAX_NAME_LENGTH = OPA_COLUMNS[1][0] - 2
+
+
+def age_group_names(count):
+    """The academy's age group names followed by more of the same pattern, count in all"""
+    names = ['B 11 & 12', 'B 12 & 13', 'B 13 & 14', 'B 14 & 15', 'B 15 & 16', 'B 16 & 17', 'B 17 & 18',
+             'G 10 & 11', 'G 12 & 13']
+    for age in range(6, 20):
+        for prefix in ('B', 'G'):
+            name = f"{prefix} {age} & {age + 1}"
+            if name not in names:
+                names.append(name)
+    if count > len(names):
+        raise ValueError(f"At most {len(names)} age groups can be generated.")
+    return names[:count]
+
+
+def iter_synthetic_players(count, age_groups, seed=0):
+    """Yield count PlayerRecords spread over the age_groups names, the same ones for the same seed"""
+    rng = random.Random(seed)
+    type_codes = [code for code, _ in TYPE_WEIGHTS]
+    type_weights = [weight for _, weight in TYPE_WEIGHTS]
+    youngest = {name: int(re.search(r'(\d+) &', name).group(1)) for name in age_groups}
+    for _ in range(count):
+        age_group = rng.choice(age_groups)
+        full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}"
+        secondary = rng.choice(age_groups) if rng.random() < SECONDARY_AGE_GROUP_RATE else None
+        yield PlayerRecord(
+            full_name=full_name[:MAX_NAME_LENGTH],
+            type_code=rng.choices(type_codes, type_weights)[0],
+            age_group=age_group,
+            secondary_age_group=secondary if secondary != age_group else None,
+            birth_day=rng.randint(1, 28),
+            birth_month=rng.randint(1, 12),
+            birth_year=SEASON_YEAR - youngest[age_group] - rng.randint(0, 1),
+            jersey_number=str(rng.randint(1, 99)),
+            **{flag: int(rng.random() < rate) for flag, rate in FLAG_RATES.items()}
+        )
+
+
+def format_opa_line(record):
+    """Lay a PlayerRecord out in the columns of the OPA text export (the inverse of parse_line)"""
+    values = {
+        'full_name': record.full_name,
+        'type_code': record.type_code,
+        'age_group': record.age_group,
+        'birth_month': f"{record.birth_month:02d}" if record.birth_month else None,
+        'birth_day': f"{record.birth_day:02d}" if record.birth_day else None,
+        'birth_year': str(record.birth_year) if record.birth_year else None,
+        'jersey_number': record.jersey_number,
+        'secondary_age_group': record.secondary_age_group or 'NO',
+        **{flag: 'YES' if getattr(record, flag) else 'NO' for flag in FLAG_RATES},
+    }
+    line = ''
+    for start, field in OPA_COLUMNS:
+        value = values[field]
+        if value:
+            line = (line.ljust(max(start, len(line) + 2)) if line else ' ' * start) + value
+    return line
+
+
+def write_opa_export(path, count, age_groups, seed=0):
+    """Write count synthetic players to path in OPA text format"""
+    with open(path, 'w', encoding='utf-8') as file:
+        for record in iter_synthetic_players(count, age_groups, seed):
+            file.write(format_opa_line(record) + '\n')
+
+
+def write_database(db_path, count, age_group_count=9, league_team_count=2, seed=0):
+    """Create a database at db_path holding count synthetic players
+
+    Uses the same tables and reference data as create_football_academy_db.py,
+    with extra age groups and league teams up to the requested counts and
+    per-group budgets scaled to the roster. Players are inserted before the
+    statistics triggers are installed, and the statistics are counted once.
+    """
+    rng = random.Random(seed)
+    conn = create_db.open_database(db_path)
+    cursor = conn.cursor()
+    create_db.create_tables()
+    create_db.insert_initial_data()
+
+    groups = age_group_names(age_group_count)
+    cursor.executemany('INSERT OR IGNORE INTO age_groups (group_name) VALUES (?)', [(name,) for name in groups])
+    cursor.executemany('INSERT OR IGNORE INTO league_teams (team_name) VALUES (?)',
+                       [(f"League Team {number}",) for number in range(1, league_team_count + 1)])
+    cursor.execute('SELECT group_id, group_name FROM age_groups')
+    age_group_map = {group_name: group_id for group_id, group_name in cursor.fetchall()}
+    groups = [name for name in age_group_map if name in groups]
+    team_ids = [team_id for (team_id,) in cursor.execute('SELECT team_id FROM league_teams')]
+
+    budget = max(1, count // len(groups))
+    cursor.executemany('''
+    INSERT INTO academy_statistics (age_group_id, budget) VALUES (?, ?)
+    ''', [(age_group_map[name], budget + rng.randint(-budget // 10, budget // 10)) for name in groups])
+
+    def rows():
+        for record in iter_synthetic_players(count, groups, seed):
+            row = to_player_row(record, age_group_map)
+            if team_ids and rng.random() < LEAGUE_TEAM_RATE:
+                row['league_team_id'] = rng.choice(team_ids)
+            yield row
+
+    query = '''
+    INSERT INTO players (
+        full_name, type_code, primary_age_group_id, secondary_age_group_id,
+        birth_day, birth_month, birth_year, jersey_number, league_team_id,
+        veo_member, photos, idp_meeting_sep, idp_meeting_apr, chat, files
+    ) VALUES (
+        :full_name, :type_code, :primary_age_group_id, :secondary_age_group_id,
+        :birth_day, :birth_month, :birth_year, :jersey_number, :league_team_id,
+        :veo_member, :photos, :idp_meeting_sep, :idp_meeting_apr, :chat, :files
+    )
+    '''
+    cursor.executemany(query, rows())
+    conn.commit()
+
+    migrate(conn)
+    recount_statistics(conn)
+    conn.commit()
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic football academy")
+    parser.add_argument('--players', type=int, default=10000, help="number of players (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument('--age-groups', type=int, default=9, help="number of age groups (default: %(default)s)")
+    parser.add_argument('--league-teams', type=int, default=2, help="number of league teams (default: %(default)s)")
+    parser.add_argument('--db', help="create this SQLite database")
+    parser.add_argument('--opa', help="write the players to this OPA text export")
+    parser.add_argument('--force', action='store_true', help="replace existing output files")
+    args = parser.parse_args(argv)
+
+    if not args.db and not args.opa:
+        parser.error("give --db, --opa or both")
+    for path in (args.db, args.opa):
+        if path and os.path.exists(path):
+            if not args.force:
+                print(f"{path} already exists; use --force to replace it.")
+                return 1
+            os.remove(path)
+
+    try:
+        groups = age_group_names(args.age_groups)
+    except ValueError as e:
+        print(e)
+        return 1
+    if args.opa:
+        write_opa_export(args.opa, args.players, groups, args.seed)
+        print(f"Wrote {args.players} players to {args.opa}")
+    if args.db:
+        write_database(args.db, args.players, args.age_groups, args.league_teams, args.seed)
+        print(f"Created {args.db} with {args.players} players")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
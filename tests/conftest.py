@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import create_football_academy_db as create_db  # noqa: E402
+from academy_schema import migrate, recount_statistics  # noqa: E402
+
+
+@pytest.fixture
+def fixture_db(tmp_path):
+    """Path to a fresh database built from the bundled OPA export, as create_football_academy_db.py builds it"""
+    db_path = str(tmp_path / 'football_academy.db')
+    conn = create_db.open_database(db_path)
+    create_db.create_tables()
+    create_db.insert_initial_data()
+    create_db.insert_player_data(os.path.join(ROOT, 'opa_database_content.txt'))
+    create_db.insert_academy_statistics()
+    migrate(conn)
+    recount_statistics(conn)
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+@pytest.fixture
+def manager(fixture_db):
+    from football_academy_manager import FootballAcademyManager
+    manager = FootballAcademyManager(fixture_db)
+    assert manager.connect()
+    yield manager
+    manager.close()
@@ -0,0 +1,34 @@
+import asyncio
+
+from academy_async import AsyncFootballAcademyManager
+from football_academy_manager import FootballAcademyManager
+
+
+def test_change_log_methods(fixture_db, tmp_path):
+    copy_path = str(tmp_path / 'copy.db')
+    with open(fixture_db, 'rb') as source, open(copy_path, 'wb') as copy:
+        copy.write(source.read())
+
+    async def run():
+        async with AsyncFootballAcademyManager(fixture_db) as manager, \
+                AsyncFootballAcademyManager(copy_path) as copy:
+            start = await manager.last_change_seq()
+            copy_start = await copy.last_change_seq()
+            for player_id in range(1, 8):
+                await manager.update_player(player_id, photos=1, jersey_number=str(player_id))
+            changes = [change async for change in manager.changes_since(start, chunk_size=3)]
+            assert [change.player_id for change in changes] == list(range(1, 8))
+            assert await copy.replay_changes(changes) == 7
+            assert await manager.prune_changes(await manager.last_change_seq()) is not None
+            assert [change async for change in manager.changes_since(0)] == []
+            return copy_start
+
+    copy_start = asyncio.run(run())
+    source, copy = FootballAcademyManager(fixture_db), FootballAcademyManager(copy_path)
+    source.connect()
+    copy.connect()
+    query = "SELECT * FROM players ORDER BY player_id"
+    assert [tuple(row) for row in source.execute_query(query)] == [tuple(row) for row in copy.execute_query(query)]
+    assert copy.last_change_seq() > copy_start
+    source.close()
+    copy.close()
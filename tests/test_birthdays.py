@@ -0,0 +1,33 @@
+import datetime
+
+
+def birthday_players(manager):
+    rows = manager.execute_query(
+        "SELECT player_id, birth_month, birth_day FROM players WHERE birth_month IS NOT NULL AND birth_day IS NOT NULL"
+    )
+    return {row['player_id']: (row['birth_month'], row['birth_day']) for row in rows}
+
+
+def test_whole_year_lists_every_player_once(manager):
+    expected = set(birthday_players(manager))
+    for start in (datetime.date(2026, 1, 1), datetime.date(2026, 3, 5)):
+        for days in (365, 366):
+            rows = manager.get_upcoming_birthdays(days=days, start=start)
+            ids = [row['player_id'] for row in rows]
+            assert len(ids) == len(set(ids)) == len(expected), (start, days)
+            assert set(ids) == expected
+
+
+def test_window_crossing_new_year(manager):
+    birthdays = birthday_players(manager)
+    rows = manager.get_upcoming_birthdays(days=30, start=datetime.date(2026, 12, 20))
+    expected = {
+        player_id for player_id, month_day in birthdays.items()
+        if month_day >= (12, 20) or month_day <= (1, 18)
+    }
+    assert {row['player_id'] for row in rows} == expected
+    dates = [row['next_birthday'] for row in rows]
+    assert dates == sorted(dates)
+    assert any(date.startswith('2026-12') for date in dates)
+    assert any(date.startswith('2027-01') for date in dates)
+    assert all(date.startswith(('2026-12', '2027-01')) for date in dates)
@@ -0,0 +1,23 @@
+from budget_planner import BudgetPlanner, rank
+
+
+def test_named_changes_do_not_query_sqlite(manager):
+    planner = BudgetPlanner.load(manager)
+    player_ids = [row['player_id'] for row in manager.execute_query("SELECT player_id FROM players LIMIT 20")]
+    statements = []
+    manager.conn.set_trace_callback(statements.append)
+    try:
+        plans = [planner.scenario(f"release {player_id}").release_player(player_id) for player_id in player_ids]
+        rank(plans)
+    finally:
+        manager.conn.set_trace_callback(None)
+    assert statements == []
+
+
+def test_committed_scenario_matches_its_statistics(manager):
+    planner = BudgetPlanner.load(manager)
+    player_id = manager.execute_query("SELECT player_id FROM players WHERE primary_age_group_id = 1 LIMIT 1")[0][0]
+    scenario = planner.scenario('summer').release_player(player_id).set_budget(1, 30)
+    expected = scenario.statistics()
+    assert scenario.commit()
+    assert [dict(row) for row in manager.get_academy_statistics()] == expected
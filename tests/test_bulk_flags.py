@@ -0,0 +1,41 @@
+def flag_counts(manager, flag, where="1", params=()):
+    return manager.execute_query(
+        f"SELECT COUNT(*) FILTER (WHERE {flag} = 1), COUNT(*) FROM players WHERE {where}", params
+    )[0][:]
+
+
+def group_id(manager, group_name):
+    return manager.execute_query("SELECT group_id FROM age_groups WHERE group_name = ?", (group_name,))[0][0]
+
+
+def test_sets_a_flag_for_a_whole_age_group(manager):
+    group = group_id(manager, 'B 13 & 14')
+    already, players = flag_counts(manager, 'idp_meeting_sep', "primary_age_group_id = ?", (group,))
+    others = flag_counts(manager, 'idp_meeting_sep', "primary_age_group_id IS NOT ?", (group,))
+
+    assert manager.bulk_update_flags({'age_group_ids': [group]}, dry_run=True, idp_meeting_sep=1) == players - already
+    assert flag_counts(manager, 'idp_meeting_sep', "primary_age_group_id = ?", (group,)) == (already, players)
+
+    assert manager.bulk_update_flags({'age_group_ids': [group]}, idp_meeting_sep=1) == players - already
+    assert flag_counts(manager, 'idp_meeting_sep', "primary_age_group_id = ?", (group,)) == (players, players)
+    assert flag_counts(manager, 'idp_meeting_sep', "primary_age_group_id IS NOT ?", (group,)) == others
+    # Already set everywhere: nothing left to change
+    assert manager.bulk_update_flags({'age_group_ids': [group]}, idp_meeting_sep=1) == 0
+
+
+def test_filters_combine_and_cohorts_follow(manager):
+    assert manager.bulk_update_flags({}, photos=0) is not None
+    assert manager.bulk_update_flags({'player_ids': [1, 2, 3], 'type_code': 'FT'}, photos=1) == \
+        flag_counts(manager, 'photos', "player_id IN (1, 2, 3) AND type_code = 'FT'")[1]
+    assert manager.player_cohort(photos=True).ids() == [
+        row[0] for row in manager.execute_query("SELECT player_id FROM players WHERE photos = 1 ORDER BY player_id")
+    ]
+    with_photos = flag_counts(manager, 'photos')[0]
+    assert manager.bulk_update_flags({'photos': 1}, photos=0, chat=1) == with_photos
+    assert flag_counts(manager, 'photos')[0] == 0
+
+
+def test_rejects_unknown_flags_and_filters(manager):
+    assert manager.bulk_update_flags({}, jersey_number=1) is None
+    assert manager.bulk_update_flags({'full_name': 'x'}, photos=1) is None
+    assert manager.bulk_update_flags({'player_ids': []}, photos=1) is None
@@ -0,0 +1,16 @@
+import academy_cli
+
+
+def test_missing_batch_file_is_a_usage_error(fixture_db, tmp_path, capsys):
+    missing = str(tmp_path / 'missing.txt')
+    assert academy_cli.main(['--db', fixture_db, 'batch', missing]) == 2
+    assert f"Cannot read {missing}" in capsys.readouterr().err
+
+
+def test_batch_file_runs_each_command(fixture_db, tmp_path, capsys):
+    commands = tmp_path / 'commands.txt'
+    commands.write_text("players flags --set photos=1 --player-id 1\nstats\n", encoding='utf-8')
+    assert academy_cli.main(['--db', fixture_db, 'batch', str(commands)]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith('updated ')
+    assert 'age_group\tactual_players' in out
@@ -0,0 +1,16 @@
+import threading
+
+from academy_db import ConnectionPool
+
+
+def test_connections_of_exited_threads_are_closed(fixture_db):
+    pool = ConnectionPool(fixture_db)
+    for _ in range(20):
+        thread = threading.Thread(target=lambda: pool.connection().execute("SELECT 1").fetchone())
+        thread.start()
+        thread.join()
+    # Opening this thread's connection closes the last exited thread's
+    pool.connection()
+    assert list(pool.connections) == [threading.current_thread()]
+    pool.close()
+    assert pool.connections == {}
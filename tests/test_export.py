@@ -0,0 +1,38 @@
+import json
+
+from football_academy_manager import EXPORT_PLAYERS_QUERY
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_jsonl_exports_keep_their_order(manager, tmp_path):
+    assert manager.export_players(tmp_path / 'players.jsonl')
+    ids = [player['player_id'] for player in read_jsonl(tmp_path / 'players.jsonl')]
+    assert ids and ids == sorted(ids)
+
+    assert manager.export_statistics(tmp_path / 'stats.jsonl')
+    groups = [row['age_group'] for row in read_jsonl(tmp_path / 'stats.jsonl')]
+    assert groups == sorted(groups)
+
+    assert manager.export_birthday_calendar(tmp_path / 'birthdays.jsonl')
+    birthdays = [row['dtstart'][5:] for row in read_jsonl(tmp_path / 'birthdays.jsonl')]
+    assert birthdays == sorted(birthdays)
+    assert manager.export_birthday_calendar(tmp_path / 'birthdays.ics') == len(birthdays)
+
+
+def test_ordered_player_export_is_still_a_table_scan(manager):
+    from academy_export import json_object_query
+    columns = [column[0] for column in manager.conn.execute(f"{EXPORT_PLAYERS_QUERY} LIMIT 0").description]
+    plan = manager.conn.execute(
+        "EXPLAIN QUERY PLAN " + json_object_query(EXPORT_PLAYERS_QUERY, columns, 'player_id')
+    ).fetchall()
+    assert not any('TEMP B-TREE' in row[-1] for row in plan)
+
+
+def test_birthday_calendar_is_named_after_its_age_group(manager, tmp_path):
+    assert manager.export_birthday_calendars(tmp_path)['B 13 & 14']
+    with open(tmp_path / 'B_13_14.ics', encoding='utf-8', newline='') as f:
+        assert 'X-WR-CALNAME:B 13 & 14\r\n' in f.read()
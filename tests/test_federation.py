@@ -0,0 +1,46 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from academy_federation import FederatedAcademyManager
+from football_academy_manager import FootballAcademyManager
+
+
+def make_federation(fixture_db, tmp_path, count=3):
+    shards = {}
+    for number in range(count):
+        path = str(tmp_path / f"academy{number}.db")
+        shutil.copy(fixture_db, path)
+        shards[f"Academy {number}"] = path
+    federation = FederatedAcademyManager(shards)
+    assert federation.connect()
+    return federation
+
+
+def test_birthdays_with_missing_dates(fixture_db, tmp_path):
+    # Every player has a birthday this month, and some have no birth day
+    import time
+    manager = FootballAcademyManager(fixture_db)
+    assert manager.connect()
+    manager.execute_query("UPDATE players SET birth_month = ?", (time.localtime().tm_mon,))
+    manager.execute_query("UPDATE players SET birth_day = NULL WHERE player_id % 5 = 0")
+    manager.close()
+
+    federation = make_federation(fixture_db, tmp_path)
+    try:
+        rows = federation.get_players_with_birthdays_this_month()
+        assert len(rows) == 3 * len(federation.route('Academy 0').get_players_with_birthdays_this_month())
+        days = [int(row['birth_date'].split('/')[0]) if row['birth_date'] else -1 for row in rows]
+        assert days == sorted(days)
+    finally:
+        federation.close()
+
+
+def test_statistics_from_several_threads(fixture_db, tmp_path):
+    federation = make_federation(fixture_db, tmp_path)
+    try:
+        expected = [tuple(row) for row in federation.get_combined_statistics()]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: federation.get_combined_statistics(), range(64)))
+        assert all([tuple(row) for row in result] == expected for result in results)
+    finally:
+        federation.close()
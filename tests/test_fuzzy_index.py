@@ -0,0 +1,29 @@
+from fuzzy_index import FuzzyNameIndex
+
+NAMES = [
+    (1, 'Pablo Mora Doronsoro'),
+    (2, 'Alejandro Mora'),
+    (3, 'Andrés Salcedo Zapata'),
+    (4, 'Carlos Amaury Gonzalez Resendiz'),
+    (5, 'Pedro Pablo Jiménez-Hadad'),
+]
+
+
+def test_single_word_typo_finds_multi_word_names():
+    index = FuzzyNameIndex.from_rows(NAMES)
+    assert [player_id for player_id, _ in index.lookup('pabol')][:2] == [1, 5]
+    assert index.lookup('doronsor')[0][0] == 1
+    assert index.lookup('Resendis')[0][0] == 4
+    assert index.lookup('hadad')[0] == (5, 1.0)
+
+
+def test_whole_name_typos_still_match():
+    index = FuzzyNameIndex.from_rows(NAMES)
+    assert index.lookup('Alejandro Mroa')[0][0] == 2
+    assert index.lookup('Andres Salcedo Zapta')[0][0] == 3
+
+
+def test_unrelated_terms_find_nothing():
+    index = FuzzyNameIndex.from_rows(NAMES)
+    assert index.lookup('xyzzy') == []
+    assert index.lookup('') == []
@@ -0,0 +1,48 @@
+import threading
+
+import fuzzy_index
+
+
+def test_index_built_across_a_write_is_not_installed(manager, monkeypatch):
+    from_rows = fuzzy_index.FuzzyNameIndex.from_rows
+
+    def from_rows_with_a_write(rows):
+        # A writer commits after the reader has read the players table
+        assert manager.add_player('Zacarias Quintanilla', 'FT', 'B 13 & 14', 1, 2, 2013, '99')
+        return from_rows(rows)
+
+    monkeypatch.setattr(fuzzy_index.FuzzyNameIndex, 'from_rows', from_rows_with_a_write)
+    assert manager.fuzzy_search_players('Zacarias Quintanilla') == []
+    assert manager.name_index is None
+    monkeypatch.setattr(fuzzy_index.FuzzyNameIndex, 'from_rows', from_rows)
+    assert manager.fuzzy_search_players('Zacarias Quintanilla')[0]['full_name'] == 'Zacarias Quintanilla'
+    assert manager.name_index is not None
+
+
+def test_readers_survive_concurrent_resets(manager):
+    errors = []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                assert manager.fuzzy_search_players('Pablo Mora') is not None
+                assert manager.player_cohort(photos=True) is not None
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    try:
+        for player_id in range(1, 40):
+            manager.update_player(player_id, photos=player_id % 2)
+            manager.reset_indexes()
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    # Whatever was installed matches the database
+    photos = manager.execute_query("SELECT COUNT(*) FROM players WHERE photos = 1")[0][0]
+    assert manager.player_cohort(photos=True).count() == photos
@@ -0,0 +1,41 @@
+import os
+
+import opa_parser
+from football_academy_manager import FootballAcademyManager
+from opa_import import import_exports
+from opa_parser import export_chunks, parse_chunk, parse_export
+from synthetic_academy import age_group_names, write_opa_export
+
+EXPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'opa_database_content.txt')
+
+
+def test_chunks_parse_to_the_whole_file():
+    expected = parse_export(EXPORT)
+    for chunk_bytes in (1, 500, 4096, 1 << 30):
+        records = []
+        for start, end in export_chunks(EXPORT, chunk_bytes):
+            records.extend(parse_chunk(EXPORT, start, end))
+        assert records == expected
+
+
+def test_import_is_deterministic(fixture_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(opa_parser, 'CHUNK_BYTES', 2048)
+    paths = []
+    for number in range(3):
+        path = str(tmp_path / f"export{number}.txt")
+        write_opa_export(path, 200, age_group_names(9), seed=number)
+        paths.append(path)
+
+    imported = []
+    for run in range(2):
+        db_path = str(tmp_path / f"run{run}.db")
+        with open(fixture_db, 'rb') as source, open(db_path, 'wb') as copy:
+            copy.write(source.read())
+        manager = FootballAcademyManager(db_path)
+        assert manager.connect()
+        results = import_exports(manager, paths, workers=3)
+        assert results == {path: 200 for path in paths}
+        imported.append([tuple(row) for row in manager.execute_query(
+            "SELECT player_id, full_name, birth_year FROM players ORDER BY player_id")])
+        manager.close()
+    assert imported[0] == imported[1]
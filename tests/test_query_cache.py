@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from football_academy_manager import FootballAcademyManager
+
+
+def test_repeated_report_is_served_from_the_cache(manager):
+    first = manager.get_academy_statistics()
+    hits = manager.cache.hits
+    assert [dict(row) for row in manager.get_academy_statistics()] == [dict(row) for row in first]
+    assert manager.cache.hits == hits + 1
+
+
+def test_own_writes_invalidate(manager):
+    count = len(manager.get_all_age_groups())
+    assert manager.add_age_group('G 20 & 21')
+    assert len(manager.get_all_age_groups()) == count + 1
+
+
+def test_writes_from_another_connection_invalidate(manager, fixture_db):
+    before = {row['age_group']: row['actual_players'] for row in manager.get_academy_statistics()}
+    group, players = max(before.items(), key=lambda item: item[1])
+    assert players > 0
+    conn = sqlite3.connect(fixture_db)
+    with conn:
+        conn.execute(
+            "DELETE FROM players WHERE primary_age_group_id = (SELECT group_id FROM age_groups WHERE group_name = ?)",
+            (group,)
+        )
+    conn.close()
+    after = {row['age_group']: row['actual_players'] for row in manager.get_academy_statistics()}
+    assert after[group] == 0
+
+
+def test_writes_from_another_manager_invalidate(manager, fixture_db):
+    count = len(manager.get_all_age_groups())
+    other = FootballAcademyManager(fixture_db)
+    assert other.connect()
+    try:
+        assert other.add_age_group('G 20 & 21')
+    finally:
+        other.close()
+    assert len(manager.get_all_age_groups()) == count + 1
+
+
+def test_player_writes_invalidate_tables_their_triggers_write(manager):
+    before = {row['age_group']: row['actual_players'] for row in manager.get_academy_statistics()}
+    assert manager.add_player('Zacarias Quintanilla', 'FT', 'B 13 & 14', 1, 2, 2013, '99')
+    after = {row['age_group']: row['actual_players'] for row in manager.get_academy_statistics()}
+    assert after['B 13 & 14'] == before['B 13 & 14'] + 1
+
+
+def test_reads_inside_a_transaction_are_not_cached(manager):
+    manager.get_all_age_groups()
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            assert manager.add_age_group('G 20 & 21')
+            assert 'G 20 & 21' in [row['group_name'] for row in manager.get_all_age_groups()]
+            raise RuntimeError("roll back")
+    assert 'G 20 & 21' not in [row['group_name'] for row in manager.get_all_age_groups()]
@@ -0,0 +1,93 @@
+import datetime
+
+from football_academy_manager import AGE_BAND_PATTERN
+
+
+def band(group_name):
+    match = AGE_BAND_PATTERN.match(group_name)
+    return match.group(1), int(match.group(2)), int(match.group(3))
+
+
+def players(manager):
+    return {row['player_id']: row for row in manager.execute_query("""
+    SELECT p.player_id, p.birth_year, p.birth_month, ag.group_name AS age_group, sg.group_name AS secondary_age_group
+    FROM players p
+    LEFT JOIN age_groups ag ON ag.group_id = p.primary_age_group_id
+    LEFT JOIN age_groups sg ON sg.group_id = p.secondary_age_group_id
+    """)}
+
+
+def test_dry_run_changes_nothing(manager):
+    before = {player_id: tuple(row) for player_id, row in players(manager).items()}
+    moves = manager.rollover_season(dry_run=True)
+    assert moves
+    assert {player_id: tuple(row) for player_id, row in players(manager).items()} == before
+
+
+def test_no_player_moves_to_a_lower_band(manager):
+    for move in manager.rollover_season(dry_run=True):
+        assert band(move['to_age_group'])[1] > band(move['from_age_group'])[1]
+
+
+def test_players_with_a_birth_date_are_placed_by_it(manager):
+    before = players(manager)
+    manager.rollover_season()
+    after = players(manager)
+    placed = 0
+    for player_id, row in before.items():
+        if row['age_group'] is None or row['birth_year'] is None or row['birth_month'] is None:
+            continue
+        # The bundled groups are named after calendar birth years, so next
+        # season a player belongs to the group starting a year after theirs
+        cohort = row['birth_year'] % 100 + 1
+        prefix = band(row['age_group'])[0]
+        new_band = band(after[player_id]['age_group'])
+        if new_band != band(row['age_group']):
+            assert new_band[0] == prefix and cohort in new_band[1:]
+            placed += 1
+    assert placed
+    assert manager.verify_statistics() == []
+
+
+def test_players_without_a_birth_date_move_up_one_group(manager):
+    bands = {band(row['group_name']) for row in manager.get_all_age_groups()}
+    before = players(manager)
+    moves = {move['player_id']: move for move in manager.rollover_season()}
+    undated = [player_id for player_id, row in before.items()
+               if row['age_group'] and (row['birth_year'] is None or row['birth_month'] is None)]
+    assert undated
+    for player_id in undated:
+        prefix, first, second = band(before[player_id]['age_group'])
+        if (prefix, first + 1, second + 1) in bands:
+            assert band(moves[player_id]['to_age_group']) == (prefix, first + 1, second + 1)
+        else:
+            assert player_id not in moves
+
+
+def test_cutoff_counts_earlier_births_with_the_previous_year(manager):
+    before = players(manager)
+    moves = {move['player_id']: move for move in
+             manager.rollover_season(cutoff_date=datetime.date(2026, 9, 1), dry_run=True)}
+    in_b12 = [player_id for player_id, row in before.items()
+              if row['age_group'] == 'B 12 & 13' and row['birth_year'] == 2012]
+    early = [player_id for player_id in in_b12 if before[player_id]['birth_month'] < 9]
+    late = [player_id for player_id in in_b12 if before[player_id]['birth_month'] >= 9]
+    assert early and late
+    assert {moves[player_id]['to_age_group'] for player_id in early} == {'B 13 & 14'}
+    assert {moves[player_id]['to_age_group'] for player_id in late} == {'B 14 & 15'}
+
+
+def test_secondary_groups_move_up_and_never_match_the_primary(manager):
+    before = players(manager)
+    manager.rollover_season()
+    after = players(manager)
+    with_secondary = [player_id for player_id, row in before.items() if row['secondary_age_group']]
+    assert with_secondary
+    for player_id in with_secondary:
+        row = after[player_id]
+        assert row['secondary_age_group'] != row['age_group']
+        if row['secondary_age_group'] is not None:
+            prefix, first, second = band(before[player_id]['secondary_age_group'])
+            assert band(row['secondary_age_group']) == (prefix, first + 1, second + 1)
+    changes = manager.changes_since(0)
+    assert any('secondary_age_group_id' in (change.after or {}) for change in changes)
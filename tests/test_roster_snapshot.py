@@ -0,0 +1,17 @@
+def test_group_columns_are_compact(manager):
+    snapshot = manager.roster_snapshot()
+    assert snapshot.columns['primary_age_group_id'].itemsize == 2
+    assert snapshot.columns['secondary_age_group_id'].itemsize == 2
+
+
+def test_refresh_applies_changes_since_load(manager):
+    snapshot = manager.roster_snapshot()
+    player_id = manager.execute_query("SELECT MIN(player_id) FROM players")[0][0]
+    manager.update_player(player_id, primary_age_group_id=2)
+    manager.delete_player(player_id + 1)
+    snapshot = manager.roster_snapshot()
+    assert snapshot.player(player_id)['primary_age_group_id'] == 2
+    assert snapshot.player(player_id + 1) is None
+    counts = {row[0]: row[1] for row in manager.execute_query(
+        "SELECT primary_age_group_id, COUNT(*) FROM players GROUP BY primary_age_group_id")}
+    assert {group_id: count for (group_id,), count in snapshot.count_by('primary_age_group_id').items()} == counts
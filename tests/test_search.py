@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.fixture
+def fts_manager(manager):
+    if not manager.full_text_search:
+        pytest.skip("SQLite built without FTS5")
+    return manager
+
+
+def fts_names(manager, term):
+    return [row['full_name'] for row in manager.search_players(term, mode='fts')]
+
+
+def test_fts_matches_word_prefixes_ignoring_accents(fts_manager):
+    assert fts_names(fts_manager, 'andres salc') == ['Andrés Salcedo Zapata']
+    assert fts_names(fts_manager, 'ANDRÉS') == fts_names(fts_manager, 'andres')
+
+
+def test_fts_follows_player_writes(fts_manager):
+    assert fts_manager.add_player('Zacarias Quintanilla', 'FT', 'B 13 & 14', 1, 2, 2013, '99')
+    player_id = fts_manager.cursor.lastrowid
+    assert fts_names(fts_manager, 'quintan') == ['Zacarias Quintanilla']
+
+    assert fts_manager.update_player(player_id, full_name='Zacarias Quiroga')
+    assert fts_names(fts_manager, 'quintan') == []
+    assert fts_names(fts_manager, 'quirog') == ['Zacarias Quiroga']
+
+    assert fts_manager.delete_player(player_id)
+    assert fts_names(fts_manager, 'quirog') == []
+    # The index holds exactly the players' names
+    assert fts_manager.execute_query(
+        "INSERT INTO players_fts (players_fts) VALUES ('integrity-check')"
+    ) is not None
+
+
+def test_like_and_fts_agree_on_whole_words(fts_manager):
+    like = {row['player_id'] for row in fts_manager.search_players('Mora')}
+    fts = {row['player_id'] for row in fts_manager.search_players('Mora', mode='fts')}
+    assert like and fts <= like
@@ -0,0 +1,36 @@
+def statistics(manager, group_name):
+    return dict(next(row for row in manager.get_academy_statistics() if row['age_group'] == group_name))
+
+
+def group_id(manager, group_name):
+    return manager.execute_query("SELECT group_id FROM age_groups WHERE group_name = ?", (group_name,))[0][0]
+
+
+def test_triggers_keep_statistics_in_step_with_player_writes(manager):
+    assert manager.verify_statistics() == []
+    before = statistics(manager, 'B 13 & 14')
+
+    assert manager.add_player('Zacarias Quintanilla', 'T', 'B 13 & 14', 1, 2, 2013, '99')
+    player_id = manager.cursor.lastrowid
+    added = statistics(manager, 'B 13 & 14')
+    assert added['actual_players'] == before['actual_players'] + 1
+    assert added['trial'] == before['trial'] + 1
+    assert added['difference'] == before['difference'] - 1
+    assert manager.verify_statistics() == []
+
+    # Converting the trial and moving the player change both groups' counts
+    assert manager.update_player(player_id, type_code='FT', primary_age_group_id=group_id(manager, 'B 14 & 15'))
+    assert statistics(manager, 'B 13 & 14') == before
+    assert manager.verify_statistics() == []
+
+    assert manager.delete_player(player_id)
+    assert statistics(manager, 'B 13 & 14') == before
+    assert manager.verify_statistics() == []
+
+
+def test_budget_changes_update_net(manager):
+    before = statistics(manager, 'B 13 & 14')
+    assert manager.update_age_group(group_id(manager, 'B 13 & 14'), budget=before['budgeted_players'] + 5)
+    after = statistics(manager, 'B 13 & 14')
+    assert after['difference'] == before['difference'] + 5
+    assert manager.verify_statistics() == []
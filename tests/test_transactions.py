@@ -0,0 +1,47 @@
+import sqlite3
+
+
+def test_locked_database_fails_the_write_instead_of_raising(manager, fixture_db, capsys):
+    manager.conn.execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(fixture_db, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert manager.add_league_team('Locked Out FC') is False
+        assert 'database is locked' in capsys.readouterr().out
+        assert not manager.conn.in_transaction
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert manager.add_league_team('Locked Out FC')
+    assert manager.execute_query("SELECT 1 FROM league_teams WHERE team_name = 'Locked Out FC'")
+
+
+def block_statistics_rows(fixture_db):
+    """Make inserting an academy_statistics row fail, as a constraint would"""
+    conn = sqlite3.connect(fixture_db)
+    conn.execute("""
+    CREATE TRIGGER block_statistics BEFORE INSERT ON academy_statistics
+    BEGIN SELECT RAISE(ABORT, 'statistics row refused'); END
+    """)
+    conn.commit()
+    conn.close()
+
+
+def group_exists(manager, name):
+    return bool(manager.execute_query("SELECT 1 FROM age_groups WHERE group_name = ?", (name,)))
+
+
+def test_method_failing_halfway_leaves_nothing(manager, fixture_db):
+    block_statistics_rows(fixture_db)
+    # add_age_group inserts the group, then fails on its statistics row
+    assert manager.add_age_group('G 20 & 21') is False
+    assert not group_exists(manager, 'G 20 & 21')
+
+
+def test_method_failing_inside_a_transaction_undoes_only_its_writes(manager, fixture_db):
+    block_statistics_rows(fixture_db)
+    with manager.transaction():
+        assert manager.add_league_team('Kept FC')
+        assert manager.add_age_group('G 20 & 21') is False
+    assert not group_exists(manager, 'G 20 & 21')
+    assert manager.execute_query("SELECT 1 FROM league_teams WHERE team_name = 'Kept FC'")